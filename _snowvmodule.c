@@ -0,0 +1,538 @@
+// _snowv: CPython extension exposing the C SNOW-V core to snowV.py
+//
+// The functions are stateless: the cipher state travels as the 112-byte
+// serialization of snowv_get_state/snowv_set_state, which is also how
+// snowV.SnowVCipher packs its registers. Bulk work runs without the GIL.
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#define SNOWV_NO_MAIN
+#include "snowv.c"
+
+// Load a serialized state argument into ctx; sets a Python error and returns 0 on failure
+static int load_state(Py_buffer* state, struct SnowV32* ctx) {
+    if (state->len != SNOWV_STATE_BYTES) {
+        PyErr_Format(PyExc_ValueError, "state must be %d bytes, got %zd",
+                     SNOWV_STATE_BYTES, state->len);
+        return 0;
+    }
+    snowv_set_state(ctx, (const u8*)state->buf);
+    return 1;
+}
+
+static PyObject* dump_state(const struct SnowV32* ctx) {
+    u8 state[SNOWV_STATE_BYTES];
+    snowv_get_state(ctx, state);
+    return PyBytes_FromStringAndSize((const char*)state, SNOWV_STATE_BYTES);
+}
+
+PyDoc_STRVAR(keyiv_setup_doc,
+"keyiv_setup(key, iv, is_aead_mode=False) -> state\n\n"
+"Run the SNOW-V initialization for a 32-byte key and 16-byte IV and\n"
+"return the resulting serialized state.");
+
+static PyObject* py_keyiv_setup(PyObject* module, PyObject* args, PyObject* kwargs) {
+    static char* kwlist[] = {"key", "iv", "is_aead_mode", NULL};
+    Py_buffer key, iv;
+    int is_aead_mode = 0;
+    struct SnowV32 ctx;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*y*|p:keyiv_setup", kwlist,
+                                     &key, &iv, &is_aead_mode))
+        return NULL;
+    if (key.len != 32 || iv.len != 16) {
+        PyErr_Format(PyExc_ValueError, "key must be 32 bytes and iv 16 bytes, got %zd and %zd",
+                     key.len, iv.len);
+        PyBuffer_Release(&key);
+        PyBuffer_Release(&iv);
+        return NULL;
+    }
+    keyiv_setup(&ctx, (u8*)key.buf, (u8*)iv.buf, is_aead_mode);
+    PyBuffer_Release(&key);
+    PyBuffer_Release(&iv);
+    return dump_state(&ctx);
+}
+
+PyDoc_STRVAR(encrypt_into_doc,
+"encrypt_into(state, src, dst) -> state\n\n"
+"XOR src with keystream into the writable buffer dst (which may be src)\n"
+"and return the state after the last keystream block used.");
+
+static PyObject* py_encrypt_into(PyObject* module, PyObject* args) {
+    Py_buffer state, src, dst;
+    struct SnowV32 ctx;
+    PyObject* result = NULL;
+
+    if (!PyArg_ParseTuple(args, "y*y*w*:encrypt_into", &state, &src, &dst))
+        return NULL;
+    if (!load_state(&state, &ctx))
+        goto done;
+    if (dst.len < src.len) {
+        PyErr_Format(PyExc_ValueError, "destination buffer too small: %zd < %zd bytes",
+                     dst.len, src.len);
+        goto done;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    snowv_encrypt(&ctx, (const u8*)src.buf, (u8*)dst.buf, (size_t)src.len);
+    Py_END_ALLOW_THREADS
+    result = dump_state(&ctx);
+done:
+    PyBuffer_Release(&state);
+    PyBuffer_Release(&src);
+    PyBuffer_Release(&dst);
+    return result;
+}
+
+PyDoc_STRVAR(keystream_into_doc,
+"keystream_into(state, buf) -> state\n\n"
+"Fill the writable buffer buf with keystream and return the state after\n"
+"the last keystream block used.");
+
+static PyObject* py_keystream_into(PyObject* module, PyObject* args) {
+    Py_buffer state, buf;
+    struct SnowV32 ctx;
+    PyObject* result = NULL;
+
+    if (!PyArg_ParseTuple(args, "y*w*:keystream_into", &state, &buf))
+        return NULL;
+    if (load_state(&state, &ctx)) {
+        Py_BEGIN_ALLOW_THREADS
+        snowv_keystream_bytes(&ctx, (u8*)buf.buf, (size_t)buf.len);
+        Py_END_ALLOW_THREADS
+        result = dump_state(&ctx);
+    }
+    PyBuffer_Release(&state);
+    PyBuffer_Release(&buf);
+    return result;
+}
+
+// Map a backend argument (None or a snowv_multi_backend name) to a supported kernel; -1 on error
+static int parse_multi_backend(PyObject* backend) {
+    static const char* const names[] = {"portable", "aesni-x2", "vaes-x4"};
+    const char* name;
+
+    if (backend == NULL || backend == Py_None)
+        return snowv_multi_best();
+    name = PyUnicode_AsUTF8(backend);
+    if (name == NULL)
+        return -1;
+    for (int kernel = 0; kernel < 3; kernel++)
+        if (strcmp(name, names[kernel]) == 0) {
+            if (snowv_multi_supported(kernel))
+                return kernel;
+            PyErr_Format(PyExc_ValueError, "backend %s is not supported on this CPU", name);
+            return -1;
+        }
+    PyErr_Format(PyExc_ValueError, "unknown backend %s", name);
+    return -1;
+}
+
+// Shared body of the *_into_many and *_into_packed functions; srcs_arg is NULL for keystream.
+// With packed set, states_arg is one writable buffer of serialized states, updated in place.
+static PyObject* crypt_into_many(PyObject* states_arg, PyObject* srcs_arg, PyObject* dsts_arg, PyObject* backend,
+                                 int packed) {
+    PyObject *states = NULL, *srcs = NULL, *dsts = NULL, *result = NULL;
+    Py_buffer packed_states = {NULL, NULL};
+    Py_buffer *views = NULL;  // srcs in views[0..n), dsts in views[n..2n)
+    struct SnowV32* ctx_array = NULL;
+    struct SnowV32** ctxs = NULL;
+    const u8** ins = NULL;
+    u8** outs = NULL;
+    size_t* lens = NULL;
+    Py_ssize_t n = 0, i, acquired_src = 0, acquired_dst = 0;
+    int kernel = parse_multi_backend(backend);
+
+    if (kernel < 0)
+        return NULL;
+    dsts = PySequence_Fast(dsts_arg, "buffers must be a sequence");
+    if (dsts == NULL)
+        goto done;
+    if (packed) {
+        if (PyObject_GetBuffer(states_arg, &packed_states, PyBUF_WRITABLE) < 0)
+            goto done;
+        n = PySequence_Fast_GET_SIZE(dsts);
+        if (packed_states.len != n * SNOWV_STATE_BYTES) {
+            PyErr_Format(PyExc_ValueError, "states must be %zd bytes for %zd streams, got %zd",
+                         n * SNOWV_STATE_BYTES, n, packed_states.len);
+            goto done;
+        }
+    } else {
+        states = PySequence_Fast(states_arg, "states must be a sequence");
+        if (states == NULL)
+            goto done;
+        n = PySequence_Fast_GET_SIZE(states);
+    }
+    if (srcs_arg != NULL) {
+        srcs = PySequence_Fast(srcs_arg, "srcs must be a sequence");
+        if (srcs == NULL)
+            goto done;
+        if (PySequence_Fast_GET_SIZE(srcs) != n) {
+            PyErr_SetString(PyExc_ValueError, "states, srcs and dsts must have the same length");
+            goto done;
+        }
+    }
+    if (PySequence_Fast_GET_SIZE(dsts) != n) {
+        PyErr_SetString(PyExc_ValueError, "states and buffers must have the same length");
+        goto done;
+    }
+    views = PyMem_New(Py_buffer, 2 * n + 1);
+    ctx_array = PyMem_New(struct SnowV32, n + 1);
+    ctxs = PyMem_New(struct SnowV32*, n + 1);
+    ins = PyMem_New(const u8*, n + 1);
+    outs = PyMem_New(u8*, n + 1);
+    lens = PyMem_New(size_t, n + 1);
+    if (views == NULL || ctx_array == NULL || ctxs == NULL || ins == NULL || outs == NULL || lens == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    for (i = 0; i < n; i++) {
+        Py_buffer state;
+        Py_buffer* dst = &views[n + i];
+        int ok;
+
+        if (packed) {
+            snowv_set_state(&ctx_array[i], (const u8*)packed_states.buf + i * SNOWV_STATE_BYTES);
+        } else {
+            if (PyObject_GetBuffer(PySequence_Fast_GET_ITEM(states, i), &state, PyBUF_SIMPLE) < 0)
+                goto done;
+            ok = load_state(&state, &ctx_array[i]);
+            PyBuffer_Release(&state);
+            if (!ok)
+                goto done;
+        }
+        ctxs[i] = &ctx_array[i];
+        if (PyObject_GetBuffer(PySequence_Fast_GET_ITEM(dsts, i), dst, PyBUF_WRITABLE) < 0)
+            goto done;
+        acquired_dst++;
+        outs[i] = (u8*)dst->buf;
+        lens[i] = (size_t)dst->len;
+        if (srcs != NULL) {
+            if (PyObject_GetBuffer(PySequence_Fast_GET_ITEM(srcs, i), &views[i], PyBUF_SIMPLE) < 0)
+                goto done;
+            acquired_src++;
+            if (dst->len < views[i].len) {
+                PyErr_Format(PyExc_ValueError, "destination buffer %zd too small: %zd < %zd bytes",
+                             i, dst->len, views[i].len);
+                goto done;
+            }
+            ins[i] = (const u8*)views[i].buf;
+            lens[i] = (size_t)views[i].len;
+        }
+    }
+    Py_BEGIN_ALLOW_THREADS
+    snowv_encrypt_xN_with(kernel, ctxs, srcs != NULL ? ins : NULL, outs, lens, (size_t)n);
+    if (packed)
+        for (i = 0; i < n; i++)
+            snowv_get_state(ctxs[i], (u8*)packed_states.buf + i * SNOWV_STATE_BYTES);
+    Py_END_ALLOW_THREADS
+    if (packed) {
+        result = Py_None;
+        Py_INCREF(result);
+        goto done;
+    }
+    result = PyList_New(n);
+    for (i = 0; result != NULL && i < n; i++) {
+        PyObject* state = dump_state(ctxs[i]);
+        if (state == NULL)
+            Py_CLEAR(result);
+        else
+            PyList_SET_ITEM(result, i, state);
+    }
+done:
+    for (i = 0; i < acquired_src; i++)
+        PyBuffer_Release(&views[i]);
+    for (i = 0; i < acquired_dst; i++)
+        PyBuffer_Release(&views[n + i]);
+    PyMem_Free(views);
+    PyMem_Free(ctx_array);
+    PyMem_Free(ctxs);
+    PyMem_Free(ins);
+    PyMem_Free(outs);
+    PyMem_Free(lens);
+    if (packed_states.obj != NULL)
+        PyBuffer_Release(&packed_states);
+    Py_XDECREF(states);
+    Py_XDECREF(srcs);
+    Py_XDECREF(dsts);
+    return result;
+}
+
+PyDoc_STRVAR(encrypt_into_many_doc,
+"encrypt_into_many(states, srcs, dsts, backend=None) -> list\n\n"
+"encrypt_into for many independent streams in one call: XOR srcs[i] with\n"
+"the keystream of states[i] into dsts[i] and return the list of new states.\n"
+"The streams are interleaved by the multi-buffer kernel named by backend\n"
+"(default: multi_backend()).");
+
+static PyObject* py_encrypt_into_many(PyObject* module, PyObject* args, PyObject* kwargs) {
+    static char* kwlist[] = {"states", "srcs", "dsts", "backend", NULL};
+    PyObject *states, *srcs, *dsts, *backend = Py_None;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOO|O:encrypt_into_many", kwlist,
+                                     &states, &srcs, &dsts, &backend))
+        return NULL;
+    return crypt_into_many(states, srcs, dsts, backend, 0);
+}
+
+PyDoc_STRVAR(keystream_into_many_doc,
+"keystream_into_many(states, bufs, backend=None) -> list\n\n"
+"keystream_into for many independent streams in one call: fill bufs[i]\n"
+"with the keystream of states[i] and return the list of new states.");
+
+static PyObject* py_keystream_into_many(PyObject* module, PyObject* args, PyObject* kwargs) {
+    static char* kwlist[] = {"states", "bufs", "backend", NULL};
+    PyObject *states, *bufs, *backend = Py_None;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|O:keystream_into_many", kwlist,
+                                     &states, &bufs, &backend))
+        return NULL;
+    return crypt_into_many(states, NULL, bufs, backend, 0);
+}
+
+PyDoc_STRVAR(encrypt_into_packed_doc,
+"encrypt_into_packed(states, srcs, dsts, backend=None) -> None\n\n"
+"encrypt_into_many with the states of all streams in one writable buffer of\n"
+"len(srcs) * STATE_BYTES bytes (e.g. a NumPy array), updated in place.");
+
+static PyObject* py_encrypt_into_packed(PyObject* module, PyObject* args, PyObject* kwargs) {
+    static char* kwlist[] = {"states", "srcs", "dsts", "backend", NULL};
+    PyObject *states, *srcs, *dsts, *backend = Py_None;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOO|O:encrypt_into_packed", kwlist,
+                                     &states, &srcs, &dsts, &backend))
+        return NULL;
+    return crypt_into_many(states, srcs, dsts, backend, 1);
+}
+
+PyDoc_STRVAR(keystream_into_packed_doc,
+"keystream_into_packed(states, bufs, backend=None) -> None\n\n"
+"keystream_into_many with the states of all streams in one writable buffer of\n"
+"len(bufs) * STATE_BYTES bytes, updated in place.");
+
+static PyObject* py_keystream_into_packed(PyObject* module, PyObject* args, PyObject* kwargs) {
+    static char* kwlist[] = {"states", "bufs", "backend", NULL};
+    PyObject *states, *bufs, *backend = Py_None;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|O:keystream_into_packed", kwlist,
+                                     &states, &bufs, &backend))
+        return NULL;
+    return crypt_into_many(states, NULL, bufs, backend, 1);
+}
+
+PyDoc_STRVAR(encrypt_many_doc,
+"encrypt_many(key, ivs, payloads, is_aead_mode=False) -> list\n\n"
+"Encrypt payloads[i] under key and ivs[i], each from a fresh keyiv_setup,\n"
+"and return the ciphertexts as a list of bytes.");
+
+static PyObject* py_encrypt_many(PyObject* module, PyObject* args, PyObject* kwargs) {
+    static char* kwlist[] = {"key", "ivs", "payloads", "is_aead_mode", NULL};
+    Py_buffer key;
+    PyObject *ivs_arg, *payloads_arg, *ivs = NULL, *payloads = NULL, *result = NULL;
+    Py_buffer *views = NULL;  // iv i in views[2i], payload i in views[2i + 1]
+    struct SnowV32* ctx_array = NULL;
+    struct SnowV32** ctxs = NULL;
+    const u8** ins = NULL;
+    u8** outs = NULL;
+    size_t* lens = NULL;
+    Py_ssize_t n, acquired = 0, i;
+    int is_aead_mode = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*OO|p:encrypt_many", kwlist,
+                                     &key, &ivs_arg, &payloads_arg, &is_aead_mode))
+        return NULL;
+    if (key.len != 32) {
+        PyErr_Format(PyExc_ValueError, "key must be 32 bytes, got %zd", key.len);
+        goto done;
+    }
+    ivs = PySequence_Fast(ivs_arg, "ivs must be a sequence");
+    payloads = PySequence_Fast(payloads_arg, "payloads must be a sequence");
+    if (ivs == NULL || payloads == NULL)
+        goto done;
+    n = PySequence_Fast_GET_SIZE(ivs);
+    if (PySequence_Fast_GET_SIZE(payloads) != n) {
+        PyErr_SetString(PyExc_ValueError, "ivs and payloads must have the same length");
+        goto done;
+    }
+    views = PyMem_New(Py_buffer, 2 * n + 1);
+    result = PyList_New(n);
+    if (views == NULL || result == NULL) {
+        PyErr_NoMemory();
+        Py_CLEAR(result);
+        goto done;
+    }
+    for (i = 0; i < n; i++) {
+        PyObject* out;
+        if (PyObject_GetBuffer(PySequence_Fast_GET_ITEM(ivs, i), &views[acquired], PyBUF_SIMPLE) < 0)
+            goto fail;
+        acquired++;
+        if (views[acquired - 1].len != 16) {
+            PyErr_Format(PyExc_ValueError, "iv %zd must be 16 bytes, got %zd", i, views[acquired - 1].len);
+            goto fail;
+        }
+        if (PyObject_GetBuffer(PySequence_Fast_GET_ITEM(payloads, i), &views[acquired], PyBUF_SIMPLE) < 0)
+            goto fail;
+        acquired++;
+        out = PyBytes_FromStringAndSize(NULL, views[acquired - 1].len);
+        if (out == NULL)
+            goto fail;
+        PyList_SET_ITEM(result, i, out);
+    }
+    // Set up every context, then encrypt the packets with the multi-buffer kernel
+    ctx_array = PyMem_New(struct SnowV32, n + 1);
+    ctxs = PyMem_New(struct SnowV32*, n + 1);
+    ins = PyMem_New(const u8*, n + 1);
+    outs = PyMem_New(u8*, n + 1);
+    lens = PyMem_New(size_t, n + 1);
+    if (ctx_array == NULL || ctxs == NULL || ins == NULL || outs == NULL || lens == NULL) {
+        PyErr_NoMemory();
+        goto fail;
+    }
+    for (i = 0; i < n; i++) {
+        ctxs[i] = &ctx_array[i];
+        ins[i] = (const u8*)views[2 * i + 1].buf;
+        outs[i] = (u8*)PyBytes_AS_STRING(PyList_GET_ITEM(result, i));
+        lens[i] = (size_t)views[2 * i + 1].len;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    for (i = 0; i < n; i++)
+        keyiv_setup(ctxs[i], (u8*)key.buf, (u8*)views[2 * i].buf, is_aead_mode);
+    snowv_encrypt_xN(ctxs, ins, outs, lens, (size_t)n);
+    Py_END_ALLOW_THREADS
+    goto done;
+fail:
+    Py_CLEAR(result);
+done:
+    for (i = 0; i < acquired; i++)
+        PyBuffer_Release(&views[i]);
+    PyMem_Free(views);
+    PyMem_Free(ctx_array);
+    PyMem_Free(ctxs);
+    PyMem_Free(ins);
+    PyMem_Free(outs);
+    PyMem_Free(lens);
+    Py_XDECREF(ivs);
+    Py_XDECREF(payloads);
+    PyBuffer_Release(&key);
+    return result;
+}
+
+PyDoc_STRVAR(gcm_crypt_doc,
+"gcm_crypt(key, iv, aad, src, dst, encrypt) -> tag\n\n"
+"One-shot SNOW-V-GCM: XOR src with the payload keystream into dst (which\n"
+"may be src) and return the 16-byte tag over aad and the ciphertext.");
+
+static PyObject* py_gcm_crypt(PyObject* module, PyObject* args) {
+    Py_buffer key, iv, aad, src, dst;
+    int encrypt;
+    u8 tag[16];
+    PyObject* result = NULL;
+
+    if (!PyArg_ParseTuple(args, "y*y*y*y*w*p:gcm_crypt", &key, &iv, &aad, &src, &dst, &encrypt))
+        return NULL;
+    if (key.len != 32 || iv.len != 16) {
+        PyErr_Format(PyExc_ValueError, "key must be 32 bytes and iv 16 bytes, got %zd and %zd",
+                     key.len, iv.len);
+    } else if (dst.len < src.len) {
+        PyErr_Format(PyExc_ValueError, "destination buffer too small: %zd < %zd bytes",
+                     dst.len, src.len);
+    } else {
+        Py_BEGIN_ALLOW_THREADS
+        snowv_gcm_crypt((const u8*)key.buf, (const u8*)iv.buf, (const u8*)aad.buf, (size_t)aad.len,
+                        (const u8*)src.buf, (u8*)dst.buf, (size_t)src.len, encrypt, tag);
+        Py_END_ALLOW_THREADS
+        result = PyBytes_FromStringAndSize((const char*)tag, 16);
+    }
+    PyBuffer_Release(&key);
+    PyBuffer_Release(&iv);
+    PyBuffer_Release(&aad);
+    PyBuffer_Release(&src);
+    PyBuffer_Release(&dst);
+    return result;
+}
+
+PyDoc_STRVAR(ghash_update_doc,
+"ghash_update(h, x, data) -> x\n\n"
+"Absorb data into the 16-byte running GHASH value x under hash key h and\n"
+"return the new value. A trailing partial block is zero-padded.");
+
+static PyObject* py_ghash_update(PyObject* module, PyObject* args) {
+    Py_buffer h, x, data;
+    struct GHashKey hkey;
+    u8 acc[16];
+    PyObject* result = NULL;
+
+    if (!PyArg_ParseTuple(args, "y*y*y*:ghash_update", &h, &x, &data))
+        return NULL;
+    if (h.len != 16 || x.len != 16) {
+        PyErr_SetString(PyExc_ValueError, "h and x must be 16 bytes");
+    } else {
+        memcpy(acc, x.buf, 16);
+        Py_BEGIN_ALLOW_THREADS
+        ghash_init_key(&hkey, (const u8*)h.buf);
+        ghash_update(&hkey, acc, (const u8*)data.buf, (size_t)data.len);
+        Py_END_ALLOW_THREADS
+        result = PyBytes_FromStringAndSize((const char*)acc, 16);
+    }
+    PyBuffer_Release(&h);
+    PyBuffer_Release(&x);
+    PyBuffer_Release(&data);
+    return result;
+}
+
+PyDoc_STRVAR(backend_doc,
+"backend() -> str\n\n"
+"Name of the keystream implementation used for bulk work on this CPU:\n"
+"'aesni' (AES-NI/SSE4.1 intrinsics) or 'portable'.");
+
+static PyObject* py_backend(PyObject* module, PyObject* unused) {
+    return PyUnicode_FromString(snowv_backend());
+}
+
+PyDoc_STRVAR(multi_backend_doc,
+"multi_backend() -> str\n\n"
+"Name of the multi-buffer kernel used by the *_many functions on this CPU:\n"
+"'vaes-x4' (four streams with VAES/AVX2), 'aesni-x2' (two streams with\n"
+"AES-NI) or 'portable' (one stream after the other).");
+
+static PyObject* py_multi_backend(PyObject* module, PyObject* unused) {
+    return PyUnicode_FromString(snowv_multi_backend());
+}
+
+static PyMethodDef snowv_methods[] = {
+    {"keyiv_setup", (PyCFunction)(void (*)(void))py_keyiv_setup, METH_VARARGS | METH_KEYWORDS, keyiv_setup_doc},
+    {"encrypt_into", py_encrypt_into, METH_VARARGS, encrypt_into_doc},
+    {"keystream_into", py_keystream_into, METH_VARARGS, keystream_into_doc},
+    {"encrypt_into_many", (PyCFunction)(void (*)(void))py_encrypt_into_many, METH_VARARGS | METH_KEYWORDS,
+     encrypt_into_many_doc},
+    {"keystream_into_many", (PyCFunction)(void (*)(void))py_keystream_into_many, METH_VARARGS | METH_KEYWORDS,
+     keystream_into_many_doc},
+    {"encrypt_into_packed", (PyCFunction)(void (*)(void))py_encrypt_into_packed, METH_VARARGS | METH_KEYWORDS,
+     encrypt_into_packed_doc},
+    {"keystream_into_packed", (PyCFunction)(void (*)(void))py_keystream_into_packed, METH_VARARGS | METH_KEYWORDS,
+     keystream_into_packed_doc},
+    {"encrypt_many", (PyCFunction)(void (*)(void))py_encrypt_many, METH_VARARGS | METH_KEYWORDS, encrypt_many_doc},
+    {"gcm_crypt", py_gcm_crypt, METH_VARARGS, gcm_crypt_doc},
+    {"ghash_update", py_ghash_update, METH_VARARGS, ghash_update_doc},
+    {"backend", py_backend, METH_NOARGS, backend_doc},
+    {"multi_backend", py_multi_backend, METH_NOARGS, multi_backend_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef snowv_module = {
+    PyModuleDef_HEAD_INIT,
+    "_snowv",
+    "Native SNOW-V core used by snowV.py when available.",
+    -1,
+    snowv_methods
+};
+
+PyMODINIT_FUNC PyInit__snowv(void) {
+    PyObject* module = PyModule_Create(&snowv_module);
+    if (module == NULL)
+        return NULL;
+    if (PyModule_AddIntConstant(module, "STATE_BYTES", SNOWV_STATE_BYTES) < 0) {
+        Py_DECREF(module);
+        return NULL;
+    }
+    return module;
+}
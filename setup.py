@@ -0,0 +1,24 @@
+# Builds the optional native core for snowV.py:
+#
+#     python setup.py build_ext --inplace
+#
+# snowV.py falls back to pure Python when _snowv is not built.
+
+from setuptools import Extension, setup
+
+setup(
+    name='snowv',
+    version='0.1.0',
+    description='SNOW-V stream cipher',
+    py_modules=['snowV', 'snowV_Lanes', 'snowV_Segments', 'snowV_Async', 'snowV_Prefetch', 'snowV_CLI',
+                'snowV_SpeedTest', 'snowV_LFSR'],
+    entry_points={'console_scripts': ['snowv = snowV_CLI:main']},
+    ext_modules=[
+        Extension(
+            '_snowv',
+            sources=['_snowvmodule.c'],
+            depends=['snowv.c'],
+            optional=True,  # A missing compiler leaves the pure-Python implementation
+        ),
+    ],
+)
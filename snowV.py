@@ -1,9 +1,183 @@
-from dataclasses import dataclass  # Import dataclass decorator for easy class initialization
+import contextlib  # Instrumented regions
+import hmac  # Constant-time tag comparison
+import io  # Base class for the encrypting file wrapper
+import struct  # Header of serialized checkpoint indexes
+import threading  # Lock of the setup cache
+import time  # Phase timers of the instrumentation
+from collections import OrderedDict  # LRU order of the setup cache
+
+try:
+    import _snowv  # Native core built from snowv.c (python setup.py build_ext --inplace)
+except ImportError:
+    _snowv = None  # Fall back to the pure-Python implementation
+
+
+def _mix_column(w):
+    """
+    Apply the AES MixColumns transformation to a single 32-bit column word.
+    :param w: 32-bit column word (ShiftRows byte order, see SnowVCipher.aes_enc_round).
+    :return: Mixed 32-bit column word.
+    """
+    t = ((w << 16) | (w >> 16)) & 0xFFFFFFFF  # Rotate left by 16 bits
+    t ^= ((w << 1) & 0xFEFEFEFE)  # XOR with shifted word
+    t ^= (((w >> 7) & 0x01010101) * 0x1B)  # Conditional XOR based on shifted bits
+    return (w ^ t ^ ((t << 8) | (t >> 24))) & 0xFFFFFFFF
+
+
+def _pack(values, bits):
+    """
+    Pack a sequence of fixed-width values into one integer, value i at bits bits*i.
+    :param values: Sequence of integers.
+    :param bits: Width of each value in bits (16 for LFSR cells, 32 for FSM words).
+    :return: Packed integer.
+    """
+    mask = (1 << bits) - 1
+    packed = 0
+    for i, value in enumerate(values):
+        packed |= (value & mask) << (bits*i)
+    return packed
+
+
+def _unpack(packed, count, bits):
+    """
+    Split a packed integer back into a list of fixed-width values.
+    :param packed: Packed integer, value i at bits bits*i.
+    :param count: Number of values to extract.
+    :param bits: Width of each value in bits.
+    :return: List of integers.
+    """
+    mask = (1 << bits) - 1
+    return [(packed >> (bits*i)) & mask for i in range(count)]
+
+
+# Lane masks for eight packed 16-bit LFSR cells
+_MASK128 = (1 << 128) - 1
+_LANES_0001 = 0x00010001000100010001000100010001  # Lowest bit of every lane
+_LANES_7FFF = _LANES_0001 * 0x7FFF  # Every bit but the highest of every lane
+_LANES_FFFE = _LANES_0001 * 0xFFFE  # Every bit but the lowest of every lane
+
+# Lane masks for four packed 32-bit FSM words
+_WORDS_7FFFFFFF = 0x7FFFFFFF7FFFFFFF7FFFFFFF7FFFFFFF  # Every bit but the highest of every word
+_WORDS_80000000 = 0x80000000800000008000000080000000  # Highest bit of every word
+
+# Byte masks for the two delta swaps of the Sigma transpose
+_SIGMA_SWAP1 = 0x00000000FF00FF0000000000FF00FF00  # Bytes 1, 3, 9, 11
+_SIGMA_SWAP2 = 0x0000000000000000FFFF0000FFFF0000  # Bytes 2, 3, 6, 7
+
+
+def _add32x4(x, y):
+    """
+    Add four packed 32-bit words lane by lane, modulo 2^32 in each lane.
+    :param x: Four 32-bit words packed into a 128-bit integer.
+    :param y: Four 32-bit words packed into a 128-bit integer.
+    :return: Packed lane-wise sums.
+    """
+    # Add the low 31 bits of every lane, then fix up the top bits without carrying across lanes
+    return ((x & _WORDS_7FFFFFFF) + (y & _WORDS_7FFFFFFF)) ^ ((x ^ y) & _WORDS_80000000)
+
+
+def _sigma128(x):
+    """
+    Apply the Sigma byte permutation to a packed 128-bit FSM register.
+    Sigma transposes the register viewed as a 4x4 byte matrix (one row per word),
+    which takes two delta swaps.
+    :param x: Four 32-bit words packed into a 128-bit integer.
+    :return: Permuted packed register.
+    """
+    t = ((x >> 24) ^ x) & _SIGMA_SWAP1  # Swap the off-diagonal bytes of each 2x2 block
+    x ^= t ^ (t << 24)
+    t = ((x >> 48) ^ x) & _SIGMA_SWAP2  # Swap the off-diagonal 2x2 blocks
+    return x ^ t ^ (t << 48)
+
+
+def _lfsr_step8(a, b):
+    """
+    Advance the packed LFSRs A and B by eight steps (see SnowVCipher.lfsr_update).
+    :param a: LFSR A, 16 16-bit cells packed into a 256-bit integer.
+    :param b: LFSR B, 16 16-bit cells packed into a 256-bit integer.
+    :return: Tuple of the new A and B.
+    """
+    a_lo = a & _MASK128  # Cells A[0..7]
+    a_hi = a >> 128  # Cells A[8..15]
+    b_lo = b & _MASK128  # Cells B[0..7]
+    b_hi = b >> 128  # Cells B[8..15]
+    # Feedback u_i = A[i]*x ^ A[i+1] ^ A[i+8]*x^-1 ^ B[i] for all eight lanes
+    u = (
+        ((a_lo << 1) & _LANES_FFFE) ^ (((a_lo >> 15) & _LANES_0001) * 0x990F)
+        ^ ((a >> 16) & _MASK128)
+        ^ ((a_hi >> 1) & _LANES_7FFF) ^ ((a_hi & _LANES_0001) * 0xCC87)
+        ^ b_lo
+    )
+    # Feedback v_i = B[i]*x ^ B[i+3] ^ B[i+8]*x^-1 ^ A[i] for all eight lanes
+    v = (
+        ((b_lo << 1) & _LANES_FFFE) ^ (((b_lo >> 15) & _LANES_0001) * 0xC963)
+        ^ ((b >> 48) & _MASK128)
+        ^ ((b_hi >> 1) & _LANES_7FFF) ^ ((b_hi & _LANES_0001) * 0xE4B1)
+        ^ a_lo
+    )
+    # Shift both registers down by eight cells and append the feedback
+    return a_hi | (u << 128), b_hi | (v << 128)
+
+
+def _init_rounds(a, b, k0, k1):
+    """
+    Run the 16 initialization rounds on packed registers, with the FSM starting at zero.
+    This is keyiv_setup without the method calls, for setups that do not record z values.
+    :param a: Initial LFSR A (IV and first key half).
+    :param b: Initial LFSR B (zeros or AEAD constants, and second key half).
+    :param k0: First key half as a 128-bit integer, masked into R1 after round 14.
+    :param k1: Second key half as a 128-bit integer, masked into R1 after round 15.
+    :return: Tuple (A, B, R1, R2, R3) of the initialized registers.
+    """
+    r1 = r2 = r3 = 0
+    for i in range(16):
+        z = _add32x4(b >> 128, r1) ^ r2  # Keystream block, fed back instead of output
+        r1, r2, r3 = _sigma128(_add32x4((a & _MASK128) ^ r3, r2)), _aes_round128(r1), _aes_round128(r2)
+        a, b = _lfsr_step8(a, b)
+        a ^= z << 128
+        if i == 14:
+            r1 ^= k0
+        elif i == 15:
+            r1 ^= k1
+    return a, b, r1, r2, r3
+
+
+def _aes_round128(x):
+    """
+    Perform an AES encryption round with an all-zero round key on a packed 128-bit register.
+    :param x: Four 32-bit words packed into a 128-bit integer.
+    :return: Packed register after the AES round.
+    """
+    s = x.to_bytes(16, 'little')  # Byte k of the AES state is byte k of the register
+    return (
+        (_TE0[s[0]] ^ _TE1[s[5]] ^ _TE2[s[10]] ^ _TE3[s[15]])
+        | (_TE0[s[4]] ^ _TE1[s[9]] ^ _TE2[s[14]] ^ _TE3[s[3]]) << 32
+        | (_TE0[s[8]] ^ _TE1[s[13]] ^ _TE2[s[2]] ^ _TE3[s[7]]) << 64
+        | (_TE0[s[12]] ^ _TE1[s[1]] ^ _TE2[s[6]] ^ _TE3[s[11]]) << 96
+    )
+
+
+def _build_aes_tables(sbox):
+    """
+    Build the four 256-entry AES encryption T-tables.
+    Table k holds SubBytes followed by MixColumns for a byte that ShiftRows moves
+    into position k of an output column, so a full round is a table lookup per byte.
+    :param sbox: AES S-Box as a list of 256 byte values.
+    :return: Tuple of four lists of 256 32-bit integers.
+    """
+    # Byte 0 of column j lands in the top byte of the intermediate word, bytes 1-3 in the low three
+    return tuple([_mix_column(sbox[x] << shift) for x in range(256)] for shift in (24, 0, 8, 16))
+
 
 # SNOW-V Cipher Class
-@dataclass
 class SnowVCipher:
 
+    # All state lives in slots: two 256-bit LFSR integers and three 128-bit FSM integers
+    __slots__ = ('_a', '_b', '_r1', '_r2', '_r3', 'is_aead_mode', 'init_z_values')
+
+    # Native core for setup and bulk work, or None to always run in pure Python
+    _native = _snowv
+
     # AES S-Box: Substitution box used for byte substitution in encryption
     SBox = [
         0x63,0x7C,0x77,0x7B,0xF2,0x6B,0x6F,0xC5,0x30,0x01,0x67,0x2B,0xFE,0xD7,0xAB,0x76,
@@ -27,18 +201,168 @@ class SnowVCipher:
     # Sigma permutation for byte ordering or mixing
     Sigma = [0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15]
 
-    def __init__(self):
+    def __init__(self, record_init_z=False):
         """
         Initialize the SnowVCipher with default values.
         Sets up Linear Feedback Shift Registers (LFSR) and Finite State Machines (FSM) states.
-        Initializes a list to store z values during the initialization phase.
+        :param record_init_z: If True, keyiv_setup stores the z values of its 16
+                              initialization rounds in init_z_values.
+        """
+        self._a = 0  # LFSR A: 16 16-bit cells packed into one integer, cell i at bits 16*i
+        self._b = 0  # LFSR B: 16 16-bit cells packed into one integer, cell i at bits 16*i
+        self._r1 = 0  # FSM R1: 4 32-bit words packed into one integer, word i at bits 32*i
+        self._r2 = 0  # FSM R2: 4 32-bit words packed into one integer, word i at bits 32*i
+        self._r3 = 0  # FSM R3: 4 32-bit words packed into one integer, word i at bits 32*i
+        self.is_aead_mode = False  # Mode of the last keyiv_setup, carried by export_state
+        # z values of the last initialization, or None when recording is disabled
+        self.init_z_values = [] if record_init_z else None
+
+    def _state_bytes(self):
+        """
+        Serialize the registers as in snowv.c: A and B as little-endian 16-bit cells,
+        then R1, R2 and R3 as little-endian 32-bit words (112 bytes).
+        :return: Serialized state.
+        """
+        return (self._a.to_bytes(32, 'little') + self._b.to_bytes(32, 'little')
+                + self._r1.to_bytes(16, 'little') + self._r2.to_bytes(16, 'little')
+                + self._r3.to_bytes(16, 'little'))
+
+    def _load_state_bytes(self, state):
+        """
+        Load registers serialized by _state_bytes (or by the native core).
+        :param state: 112-byte serialized state.
+        """
+        self._a = int.from_bytes(state[0:32], 'little')
+        self._b = int.from_bytes(state[32:64], 'little')
+        self._r1 = int.from_bytes(state[64:80], 'little')
+        self._r2 = int.from_bytes(state[80:96], 'little')
+        self._r3 = int.from_bytes(state[96:112], 'little')
+
+    def clone(self):
+        """
+        Copy the cipher state into a new cipher. The registers are immutable integers,
+        so this copies five references, not the state itself.
+        :return: New SnowVCipher (same class) that continues exactly like this one.
+        """
+        other = type(self)()
+        other.restore(self)
+        return other
+
+    def restore(self, source):
+        """
+        Replace this cipher's state with the state of another cipher, e.g. a clone
+        taken earlier. Init z values are not copied.
+        :param source: SnowVCipher to copy from.
+        """
+        self._a = source._a
+        self._b = source._b
+        self._r1 = source._r1
+        self._r2 = source._r2
+        self._r3 = source._r3
+        self.is_aead_mode = source.is_aead_mode
+
+    def export_state(self):
+        """
+        Export the registers and the AEAD flag as a fixed-size blob of STATE_BLOB_SIZE bytes,
+        e.g. to hand the cipher to another process. Native and pure-Python ciphers produce
+        and accept the same blobs. The blob is as sensitive as the key.
+        :return: Blob for from_state.
+        """
+        return _STATE_BLOB.pack(_BLOB_VERSION, _BLOB_AEAD if self.is_aead_mode else 0, 0, self._state_bytes(), 0)
+
+    def export_state_into(self, buffer, offset=0):
+        """
+        Write the export_state blob into a writable buffer, e.g. shared memory.
+        :param buffer: Writable buffer with STATE_BLOB_SIZE bytes free at offset.
+        :param offset: Byte offset of the blob in buffer.
+        :return: Number of bytes written.
+        """
+        _STATE_BLOB.pack_into(buffer, offset, _BLOB_VERSION, _BLOB_AEAD if self.is_aead_mode else 0, 0,
+                              self._state_bytes(), 0)
+        return _STATE_BLOB.size
+
+    @classmethod
+    def from_state(cls, blob, offset=0):
+        """
+        Create a cipher from an export_state blob. The registers are read straight from
+        the buffer, so a blob in shared memory is not copied first.
+        :param blob: Buffer holding the blob (bytes, bytearray, memoryview, mmap, ...).
+        :param offset: Byte offset of the blob in buffer.
+        :return: New cipher that continues exactly like the exported one.
+        """
+        view, flags, pending_len, _ = _unpack_blob(blob, offset)
+        if pending_len:
+            raise ValueError("blob holds leftover stream keystream; load it with SnowVStream.from_state")
+        cipher = cls()
+        cipher._load_state_bytes(view[_BLOB_REGISTERS:_BLOB_REGISTERS + _STATE_BYTES])
+        cipher.is_aead_mode = bool(flags & _BLOB_AEAD)
+        return cipher
+
+    def __reduce__(self):
+        # Pickle as a state blob; recorded init z values travel alongside
+        if self.init_z_values is None:
+            return type(self).from_state, (self.export_state(),)
+        return type(self).from_state, (self.export_state(),), (None, {'init_z_values': self.init_z_values})
+
+    @property
+    def A(self):
+        """
+        LFSR A as a tuple of 16 16-bit values, a snapshot of the packed register.
+        Assign a whole sequence to change it; item assignment is not possible.
         """
-        self.A = [0]*16  # LFSR A: Array of 16 16-bit values
-        self.B = [0]*16  # LFSR B: Array of 16 16-bit values
-        self.R1 = [0]*4  # FSM R1: Array of 4 32-bit values
-        self.R2 = [0]*4  # FSM R2: Array of 4 32-bit values
-        self.R3 = [0]*4  # FSM R3: Array of 4 32-bit values
-        self.init_z_values = []  # List to store z values during initialization
+        return tuple(_unpack(self._a, 16, 16))
+
+    @A.setter
+    def A(self, cells):
+        self._a = _pack(cells, 16)
+
+    @property
+    def B(self):
+        """
+        LFSR B as a tuple of 16 16-bit values, a snapshot of the packed register.
+        Assign a whole sequence to change it; item assignment is not possible.
+        """
+        return tuple(_unpack(self._b, 16, 16))
+
+    @B.setter
+    def B(self, cells):
+        self._b = _pack(cells, 16)
+
+    @property
+    def R1(self):
+        """
+        FSM register R1 as a tuple of 4 32-bit values, a snapshot of the packed register.
+        Assign a whole sequence to change it; item assignment is not possible.
+        """
+        return tuple(_unpack(self._r1, 4, 32))
+
+    @R1.setter
+    def R1(self, words):
+        self._r1 = _pack(words, 32)
+
+    @property
+    def R2(self):
+        """
+        FSM register R2 as a tuple of 4 32-bit values, a snapshot of the packed register.
+        Assign a whole sequence to change it; item assignment is not possible.
+        """
+        return tuple(_unpack(self._r2, 4, 32))
+
+    @R2.setter
+    def R2(self, words):
+        self._r2 = _pack(words, 32)
+
+    @property
+    def R3(self):
+        """
+        FSM register R3 as a tuple of 4 32-bit values, a snapshot of the packed register.
+        Assign a whole sequence to change it; item assignment is not possible.
+        """
+        return tuple(_unpack(self._r3, 4, 32))
+
+    @R3.setter
+    def R3(self, words):
+        self._r3 = _pack(words, 32)
 
     def mul_x(self, v, c):
         """
@@ -84,66 +408,54 @@ class SnowVCipher:
     def aes_enc_round(self, state, roundKey):
         """
         Perform an AES encryption round on the FSM state using the provided round key.
+        SubBytes, ShiftRows and MixColumns are folded into the four T-tables, so each
+        output word costs four table lookups and four XORs.
         :param state: List of four 32-bit integers representing the FSM state.
         :param roundKey: List of four 32-bit integers representing the round key.
         :return: Updated FSM state after the AES round.
         """
-        sb = [0]*16  # Substitute bytes array
-        for i in range(4):
-            for j in range(4):
-                # Apply SBox substitution to each byte of the state
-                sb[i*4 + j] = self.SBox[(state[i] >> (j*8)) & 0xFF]
-        
-        result = [0]*4  # Array to hold the result of the AES round
-        for j in range(4):
-            # Perform ShiftRows-like permutation on substituted bytes
-            w = (
-                (sb[(j*4 + 0) % 16] << 24) |
-                (sb[(j*4 + 5) % 16] << 0) |
-                (sb[(j*4 + 10) % 16] << 8) |
-                (sb[(j*4 + 15) % 16] << 16)
-            ) & 0xFFFFFFFF  # Combine bytes into a 32-bit word
-            
-            # Perform bitwise rotations and multiplications for MixColumns-like transformation
-            t = ((w << 16) | (w >> 16)) & 0xFFFFFFFF  # Rotate left by 16 bits
-            t ^= ((w << 1) & 0xFEFEFEFE)  # XOR with shifted word
-            t ^= (((w >> 7) & 0x01010101) * 0x1B)  # Conditional XOR based on shifted bits
-            t &= 0xFFFFFFFF  # Ensure t is 32 bits
-            
-            # Combine transformations with the round key
-            result[j] = (roundKey[j] ^ w ^ t ^ ((t << 8) | (t >> 24))) & 0xFFFFFFFF
-        
-        return result  # Return the updated FSM state after the AES round
+        s0, s1, s2, s3 = state  # Unpack the four state words
+        return [
+            roundKey[0] ^ _TE0[s0 & 0xFF] ^ _TE1[(s1 >> 8) & 0xFF] ^ _TE2[(s2 >> 16) & 0xFF] ^ _TE3[s3 >> 24],
+            roundKey[1] ^ _TE0[s1 & 0xFF] ^ _TE1[(s2 >> 8) & 0xFF] ^ _TE2[(s3 >> 16) & 0xFF] ^ _TE3[s0 >> 24],
+            roundKey[2] ^ _TE0[s2 & 0xFF] ^ _TE1[(s3 >> 8) & 0xFF] ^ _TE2[(s0 >> 16) & 0xFF] ^ _TE3[s1 >> 24],
+            roundKey[3] ^ _TE0[s3 & 0xFF] ^ _TE1[(s0 >> 8) & 0xFF] ^ _TE2[(s1 >> 16) & 0xFF] ^ _TE3[s2 >> 24],
+        ]
+
+    def aes_enc_round_zero(self, state):
+        """
+        Perform an AES encryption round with an all-zero round key.
+        This is the only round used by the FSM, so the key XOR is dropped entirely.
+        :param state: List of four 32-bit integers representing the FSM state.
+        :return: Updated FSM state after the AES round.
+        """
+        s0, s1, s2, s3 = state  # Unpack the four state words
+        return [
+            _TE0[s0 & 0xFF] ^ _TE1[(s1 >> 8) & 0xFF] ^ _TE2[(s2 >> 16) & 0xFF] ^ _TE3[s3 >> 24],
+            _TE0[s1 & 0xFF] ^ _TE1[(s2 >> 8) & 0xFF] ^ _TE2[(s3 >> 16) & 0xFF] ^ _TE3[s0 >> 24],
+            _TE0[s2 & 0xFF] ^ _TE1[(s3 >> 8) & 0xFF] ^ _TE2[(s0 >> 16) & 0xFF] ^ _TE3[s1 >> 24],
+            _TE0[s3 & 0xFF] ^ _TE1[(s0 >> 8) & 0xFF] ^ _TE2[(s1 >> 16) & 0xFF] ^ _TE3[s2 >> 24],
+        ]
 
     def fsm_update(self):
         """
         Update the Finite State Machines (FSM) R1, R2, and R3 based on current states.
         This involves arithmetic and bitwise operations to transition the FSM states.
         """
-        R1temp = self.R1[:]  # Create a copy of the current R1 state
-        for i in range(4):
-            # Combine two 16-bit A registers into a 32-bit value
-            T2 = ((self.A[2*i + 1] << 16) | self.A[2*i]) & 0xFFFFFFFF
-            # Update R1 by XORing with R3 and adding R2
-            self.R1[i] = ((T2 ^ self.R3[i]) + self.R2[i]) & 0xFFFFFFFF
-        self.permute_sigma(self.R1)  # Apply Sigma permutation to R1
-        self.R3 = self.aes_enc_round(self.R2, [0]*4)  # Update R3 using AES encryption round on R2 with zero round key
-        self.R2 = self.aes_enc_round(R1temp, [0]*4)  # Update R2 using AES encryption round on copied R1 with zero round key
+        r1 = self._r1  # Keep the current R1 for the R2 update
+        # R1 = Sigma((T2 ^ R3) + R2), where T2 is the low half of LFSR A (cells A[0..7])
+        self._r1 = _sigma128(_add32x4((self._a & _MASK128) ^ self._r3, self._r2))
+        self._r3 = _aes_round128(self._r2)  # Update R3 using AES encryption round on R2 with zero round key
+        self._r2 = _aes_round128(r1)  # Update R2 using AES encryption round on the previous R1 with zero round key
 
     def lfsr_update(self):
         """
-        Update the Linear Feedback Shift Registers (LFSR) A and B.
-        Performs multiple iterations of feedback and shifting to maintain the cipher state.
+        Update the Linear Feedback Shift Registers (LFSR) A and B by eight steps at once.
+        Eight steps only ever read cells that are already present before the first step,
+        so the eight new cells of each register are computed together, one 16-bit lane
+        each, and shifted in with a single operation.
         """
-        for _ in range(8):  # Perform 8 iterations for thorough LFSR state update
-            # Calculate the feedback value 'u' for LFSR A using multiplication and XOR operations
-            u = self.mul_x(self.A[0], 0x990f) ^ self.A[1] ^ self.mul_x_inv(self.A[8], 0xcc87) ^ self.B[0]
-            # Calculate the feedback value 'v' for LFSR B using multiplication and XOR operations
-            v = self.mul_x(self.B[0], 0xc963) ^ self.B[3] ^ self.mul_x_inv(self.B[8], 0xe4b1) ^ self.A[0]
-            # Shift the A register left by one and insert the new 'u' value
-            self.A = self.A[1:] + [u & 0xFFFF]
-            # Shift the B register left by one and insert the new 'v' value
-            self.B = self.B[1:] + [v & 0xFFFF]
+        self._a, self._b = _lfsr_step8(self._a, self._b)
 
     def keystream(self):
         """
@@ -151,17 +463,15 @@ class SnowVCipher:
         This is used for encrypting or decrypting data by XORing with plaintext or ciphertext.
         :return: List of 16 bytes representing the keystream block.
         """
-        z = [0]*16  # Initialize a list to hold 16 bytes of keystream
-        for i in range(4):
-            # Combine two 16-bit B registers into a 32-bit value T1
-            T1 = ((self.B[2*i + 9] << 16) | self.B[2*i + 8]) & 0xFFFFFFFF
-            # Compute intermediate value 'v' by XORing T1 with R1 and adding R2
-            v = ((T1 + self.R1[i]) ^ self.R2[i]) & 0xFFFFFFFF
-            # Extract individual bytes from the 32-bit value 'v' in little-endian order
-            z[i*4 + 0] = (v >> 0) & 0xFF
-            z[i*4 + 1] = (v >> 8) & 0xFF
-            z[i*4 + 2] = (v >> 16) & 0xFF
-            z[i*4 + 3] = (v >> 24) & 0xFF
+        return list(self._keystream_block().to_bytes(16, 'little'))
+
+    def _keystream_block(self):
+        """
+        Generate the next keystream block as a packed integer and advance the cipher state.
+        :return: 128-bit integer whose little-endian bytes are the keystream block.
+        """
+        # z = (T1 + R1) ^ R2, where T1 is the high half of LFSR B (cells B[8..15])
+        z = _add32x4(self._b >> 128, self._r1) ^ self._r2
         self.fsm_update()  # Update FSM states after generating keystream
         self.lfsr_update()  # Update LFSR states after generating keystream
         return z  # Return the generated keystream block
@@ -174,46 +484,97 @@ class SnowVCipher:
         :param iv: Byte sequence representing the initialization vector.
         :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
         """
-        for i in range(8):
-            # Initialize the first 8 elements of LFSR A with IV bytes (little-endian)
-            self.A[i] = ((iv[2*i + 1] << 8) | iv[2*i]) & 0xFFFF
-            # Initialize the next 8 elements of LFSR A with key bytes (little-endian)
-            self.A[i + 8] = ((key[2*i + 1] << 8) | key[2*i]) & 0xFFFF
-            self.B[i] = 0x0000  # Initialize the first 8 elements of LFSR B to zero
-            # Initialize the next 8 elements of LFSR B with key bytes (little-endian)
-            self.B[i + 8] = ((key[2*i + 17] << 8) | key[2*i + 16]) & 0xFFFF
-        
+        if self._native is not None and self.init_z_values is None:
+            # The native core runs all 16 rounds in one call
+            self._load_state_bytes(self._native.keyiv_setup(bytes(key), bytes(iv), bool(is_aead_mode)))
+            self.is_aead_mode = bool(is_aead_mode)
+            return
+
+        key, iv = bytes(key), bytes(iv)
+        if len(key) != 32 or len(iv) != 16:
+            raise ValueError(f"key must be 32 bytes and iv 16 bytes, got {len(key)} and {len(iv)}")
+        self.is_aead_mode = bool(is_aead_mode)
+        # Initialize LFSR A with the IV in its low half and the first key half in its high half
+        self._a = int.from_bytes(iv + key[:16], 'little')
+        # Initialize LFSR B with zeros in its low half and the second key half in its high half
+        self._b = int.from_bytes(key[16:], 'little') << 128
+
         if is_aead_mode:
-            # If in AEAD mode, set specific initial values for LFSR B
-            self.B[0] = 0x6C41
-            self.B[1] = 0x7865
-            self.B[2] = 0x6B45
-            self.B[3] = 0x2064
-            self.B[4] = 0x694A
-            self.B[5] = 0x676E
-            self.B[6] = 0x6854
-            self.B[7] = 0x6D6F
-        
+            # If in AEAD mode, set specific initial values for the low half of LFSR B
+            self._b |= _AEAD_B_LOW
+
+        if self.init_z_values is None:
+            # Without z values to record, run all rounds on local variables
+            k0 = int.from_bytes(key[:16], 'little')
+            k1 = int.from_bytes(key[16:], 'little')
+            self._a, self._b, self._r1, self._r2, self._r3 = _init_rounds(self._a, self._b, k0, k1)
+            return
+
         # Reset FSM states to zero
-        self.R1 = [0]*4
-        self.R2 = [0]*4
-        self.R3 = [0]*4
-        
+        self._r1 = 0
+        self._r2 = 0
+        self._r3 = 0
+        self.init_z_values = []
+
         # Perform initialization by generating keystream and updating registers
         for i in range(16):
-            z = self.keystream()  # Generate a keystream block
-            self.init_z_values.append(z)  # Store the generated z values for initialization
-            for j in range(8):
-                # XOR the upper and lower bytes of z with LFSR A registers
-                self.A[j + 8] ^= ((z[2*j + 1] << 8) | z[2*j]) & 0xFFFF
+            z = self._keystream_block()  # Generate a keystream block
+            self.init_z_values.append(list(z.to_bytes(16, 'little')))  # Store the generated z values
+            # XOR z into the high half of LFSR A (cells A[8..15], little-endian)
+            self._a ^= z << 128
             if i == 14:
-                for j in range(4):
-                    # XOR the FSM R1 with parts of the key at round 14
-                    self.R1[j] ^= ((key[4*j + 3] << 24) | (key[4*j + 2] << 16) | (key[4*j + 1] << 8) | key[4*j + 0]) & 0xFFFFFFFF
+                # XOR the FSM R1 with the first key half at round 14
+                self._r1 ^= int.from_bytes(bytes(key[:16]), 'little')
             if i == 15:
-                for j in range(4):
-                    # XOR the FSM R1 with parts of the key at round 15
-                    self.R1[j] ^= ((key[4*j + 19] << 24) | (key[4*j + 18] << 16) | (key[4*j + 17] << 8) | key[4*j + 16]) & 0xFFFFFFFF
+                # XOR the FSM R1 with the second key half at round 15
+                self._r1 ^= int.from_bytes(bytes(key[16:32]), 'little')
+
+    def keystream_into(self, buf):
+        """
+        Fill a writable buffer with keystream, 16-byte block by block.
+        The unused tail of the last block is discarded, as in generate_keystream.
+        :param buf: Writable buffer (bytearray, memoryview, mmap, ...) to fill.
+        :return: Number of keystream bytes written.
+        """
+        if self._native is not None:
+            self._load_state_bytes(self._native.keystream_into(self._state_bytes(), buf))
+            return memoryview(buf).nbytes
+        out = memoryview(buf).cast('B')  # Byte view of the destination, no copy
+        length = len(out)
+        full = length - length % 16  # Bytes covered by whole blocks
+        for i in range(0, full, 16):
+            out[i:i+16] = self._keystream_block().to_bytes(16, 'little')
+        if full < length:
+            out[full:] = self._keystream_block().to_bytes(16, 'little')[:length - full]
+        return length
+
+    def encrypt_into(self, src, dst):
+        """
+        Encrypt (or decrypt) src into the writable buffer dst.
+        Keystream is gathered into one integer per chunk of _XOR_CHUNK bytes and XORed
+        with the whole chunk at once. src and dst may be the same buffer.
+        :param src: Buffer holding the plaintext (or ciphertext).
+        :param dst: Writable buffer of at least len(src) bytes for the result.
+        :return: Number of bytes written to dst.
+        """
+        if self._native is not None:
+            # One C call for the whole buffer, without the GIL
+            self._load_state_bytes(self._native.encrypt_into(self._state_bytes(), src, dst))
+            return memoryview(src).nbytes
+        src = memoryview(src).cast('B')  # Byte views of both buffers, no copies
+        dst = memoryview(dst).cast('B')
+        length = len(src)
+        if len(dst) < length:
+            raise ValueError(f"destination buffer too small: {len(dst)} < {length} bytes")
+        for start in range(0, length, _XOR_CHUNK):
+            end = min(start + _XOR_CHUNK, length)
+            keystream = 0  # Keystream of this chunk, first byte in the lowest bits
+            for shift in range(0, (end - start) * 8, 128):
+                keystream |= self._keystream_block() << shift
+            keystream &= (1 << ((end - start) * 8)) - 1  # Drop the unused tail of the last block
+            chunk = int.from_bytes(src[start:end], 'little') ^ keystream
+            dst[start:end] = chunk.to_bytes(end - start, 'little')
+        return length
 
     def encrypt(self, plaintext):
         """
@@ -221,28 +582,17 @@ class SnowVCipher:
         :param plaintext: Byte sequence of plaintext to be encrypted.
         :return: Byte sequence of the resulting ciphertext.
         """
-        ciphertext = bytearray()  # Initialize ciphertext as a mutable bytearray
-        for i in range(0, len(plaintext), 16):  # Process plaintext in 16-byte blocks
-            keystream_block = self.keystream()  # Generate a keystream block
-            block = plaintext[i:i+16]  # Extract the current plaintext block
-            for j in range(len(block)):  # XOR each byte of the block with the keystream
-                ciphertext.append(block[j] ^ keystream_block[j])
+        ciphertext = bytearray(len(plaintext))  # Output buffer of the same size as the input
+        self.encrypt_into(bytes(plaintext), ciphertext)
         return bytes(ciphertext)  # Convert ciphertext to immutable bytes before returning
-    
+
     def encrypt_hex(self, hex_input):
         """
         Encrypt a plaintext provided as a hexadecimal string.
         :param hex_input: Hexadecimal string representing the plaintext.
         :return: Byte sequence of the resulting ciphertext.
         """
-        plaintext = bytes.fromhex(hex_input)  # Convert hex string to bytes
-        ciphertext = bytearray()  # Initialize ciphertext as a mutable bytearray
-        for i in range(0, len(plaintext), 16):  # Process plaintext in 16-byte blocks
-            keystream_block = self.keystream()  # Generate a keystream block
-            block = plaintext[i:i+16]  # Extract the current plaintext block
-            for j in range(len(block)):  # XOR each byte of the block with the keystream
-                ciphertext.append(block[j] ^ keystream_block[j])
-        return bytes(ciphertext)  # Convert ciphertext to immutable bytes before returning
+        return self.encrypt(bytes.fromhex(hex_input))  # Convert hex string to bytes and encrypt
 
     def generate_keystream(self, length):
         """
@@ -250,8 +600,1152 @@ class SnowVCipher:
         :param length: Number of keystream bytes to generate.
         :return: Byte sequence of the generated keystream.
         """
-        keystream_bytes = bytearray()  # Initialize keystream as a mutable bytearray
-        for _ in range(0, length, 16):  # Generate keystream in 16-byte blocks
-            keystream_block = self.keystream()  # Generate a keystream block
-            keystream_bytes.extend(keystream_block)  # Append the keystream block to the bytearray
-        return bytes(keystream_bytes[:length])  # Return the requested number of bytes as immutable bytes
+        keystream_bytes = bytearray(length)  # Output buffer of exactly the requested size
+        self.keystream_into(keystream_bytes)
+        return bytes(keystream_bytes)  # Return the keystream as immutable bytes
+
+
+
+# SNOW-V that never uses the native core, e.g. for comparisons against it
+class PySnowVCipher(SnowVCipher):
+
+    __slots__ = ()
+    _native = None
+
+
+
+def _unpack_blob(blob, offset):
+    """
+    Check an export_state blob and read its header without copying the registers.
+    :param blob: Buffer holding the blob.
+    :param offset: Byte offset of the blob in the buffer.
+    :return: Tuple (byte view of the blob, flags, leftover keystream length, stream position).
+    """
+    view = memoryview(blob).cast('B')[offset:offset + _STATE_BLOB.size]
+    if len(view) != _STATE_BLOB.size or view[0] != _BLOB_VERSION or view[2] > 15:
+        raise ValueError("not a SNOW-V state blob")
+    position = int.from_bytes(view[_BLOB_POSITION:], 'little')
+    return view, view[1], view[2], position
+
+
+# Bounded LRU cache of initialized cipher states, keyed by (key, IV, AEAD flag)
+class SnowVSetupCache:
+
+    def __init__(self, maxsize=1024):
+        """
+        :param maxsize: Maximum number of cached states; the least recently used is evicted.
+        """
+        if maxsize < 1:
+            raise ValueError("cache size must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0  # Setups served from the cache
+        self.misses = 0  # Setups that ran keyiv_setup
+        self._states = OrderedDict()  # (key, iv, is_aead_mode) -> SnowVCipher snapshot
+        self._lock = threading.Lock()
+
+    def setup(self, cipher, key, iv, is_aead_mode=False):
+        """
+        Initialize cipher for key and IV, restoring a cached state when there is one.
+        Cached entries keep the key in memory for as long as they live.
+        :param cipher: SnowVCipher to initialize.
+        :param key: Byte sequence representing the encryption key.
+        :param iv: Byte sequence representing the initialization vector.
+        :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+        :return: cipher, for chaining.
+        """
+        if cipher.init_z_values is not None:
+            cipher.keyiv_setup(key, iv, is_aead_mode)  # A cached state cannot reproduce the z values
+            return cipher
+        cache_key = (bytes(key), bytes(iv), bool(is_aead_mode))
+        with self._lock:
+            snapshot = self._states.get(cache_key)
+            if snapshot is not None:
+                self._states.move_to_end(cache_key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if snapshot is not None:
+            cipher.restore(snapshot)
+            return cipher
+
+        cipher.keyiv_setup(key, iv, is_aead_mode)  # Outside the lock; a concurrent miss just repeats the work
+        snapshot = cipher.clone()
+        with self._lock:
+            self._states[cache_key] = snapshot
+            self._states.move_to_end(cache_key)
+            while len(self._states) > self.maxsize:
+                self._states.popitem(last=False)
+        return cipher
+
+    def new_cipher(self, key, iv, is_aead_mode=False):
+        """
+        :return: New SnowVCipher initialized for key and IV through the cache.
+        """
+        return self.setup(SnowVCipher(), key, iv, is_aead_mode)
+
+    def stats(self):
+        """
+        :return: Dict with hits, misses, current size and maxsize, e.g. for a metrics system.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._states), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """
+        Drop all cached states; the counters are kept.
+        """
+        with self._lock:
+            self._states.clear()
+
+    def __len__(self):
+        return len(self._states)
+
+
+# Key-dependent setup material for one key, reused across many IVs (one IV per packet)
+class SnowVKeySchedule:
+
+    __slots__ = ('is_aead_mode', '_key', '_k0', '_k1', '_a_high', '_b')
+
+    def __init__(self, key, is_aead_mode=False):
+        """
+        Parse the key once: the high halves of LFSR A and B and the R1 masks of rounds 14 and 15.
+        :param key: Byte sequence representing the encryption key.
+        :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+        """
+        key = bytes(key)
+        if len(key) != 32:
+            raise ValueError(f"key must be 32 bytes, got {len(key)}")
+        self.is_aead_mode = bool(is_aead_mode)
+        self._key = key  # Kept for the native core, which takes the raw key
+        self._k0 = int.from_bytes(key[:16], 'little')  # First key half, also the round 14 mask
+        self._k1 = int.from_bytes(key[16:], 'little')  # Second key half, also the round 15 mask
+        self._a_high = self._k0 << 128  # Cells A[8..15]; only A[0..7] depends on the IV
+        self._b = self._k1 << 128  # Cells B[8..15] and, in AEAD mode, the constants in B[0..7]
+        if self.is_aead_mode:
+            self._b |= _AEAD_B_LOW
+
+    def setup(self, cipher, iv):
+        """
+        Initialize cipher for this key and iv, equivalent to cipher.keyiv_setup(key, iv, is_aead_mode).
+        :param cipher: SnowVCipher to initialize.
+        :param iv: Byte sequence representing the initialization vector.
+        :return: cipher, for chaining.
+        """
+        if cipher._native is not None or cipher.init_z_values is not None:
+            cipher.keyiv_setup(self._key, iv, self.is_aead_mode)
+            return cipher
+        iv = bytes(iv)
+        if len(iv) != 16:
+            raise ValueError(f"iv must be 16 bytes, got {len(iv)}")
+        a = self._a_high | int.from_bytes(iv, 'little')  # Only the IV is parsed per packet
+        cipher._a, cipher._b, cipher._r1, cipher._r2, cipher._r3 = _init_rounds(a, self._b, self._k0, self._k1)
+        cipher.is_aead_mode = self.is_aead_mode
+        return cipher
+
+    def new_cipher(self, iv):
+        """
+        :return: New SnowVCipher initialized for this key and iv.
+        """
+        return self.setup(SnowVCipher(), iv)
+
+    def new_stream(self, iv):
+        """
+        :return: New SnowVStream initialized for this key and iv.
+        """
+        return SnowVStream.from_cipher(self.new_cipher(iv))
+
+    def encrypt_many(self, ivs, payloads):
+        """
+        Encrypt (or decrypt) each payload with a fresh setup for its IV, e.g. one packet per IV.
+        :param ivs: Sequence of 16-byte IVs.
+        :param payloads: Sequence of byte sequences, one per IV.
+        :return: List of ciphertexts (bytes), in the order of payloads.
+        """
+        if len(ivs) != len(payloads):
+            raise ValueError("ivs and payloads must have the same length")
+        if _snowv is not None:
+            # Setup and encryption of every packet in one C call
+            return _snowv.encrypt_many(self._key, ivs, payloads, self.is_aead_mode)
+        cipher = SnowVCipher()  # One context, re-initialized for every packet
+        results = []
+        for iv, payload in zip(ivs, payloads):
+            out = bytearray(len(payload))
+            self.setup(cipher, iv).encrypt_into(payload, out)
+            results.append(bytes(out))
+        return results
+
+
+def bind_key(key, is_aead_mode=False):
+    """
+    Precompute the key-dependent setup material for key.
+    :param key: Byte sequence representing the encryption key.
+    :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+    :return: SnowVKeySchedule offering new_cipher, new_stream and encrypt_many.
+    """
+    return SnowVKeySchedule(key, is_aead_mode)
+
+
+def encrypt_into_many(ciphers, srcs, dsts):
+    """
+    Encrypt (or decrypt) srcs[i] into dsts[i] with ciphers[i], like calling encrypt_into on each.
+    The native core interleaves the independent streams in one call (see _snowv.multi_backend).
+    :param ciphers: Sequence of SnowVCipher objects, each after keyiv_setup; all are advanced.
+    :param srcs: Sequence of source buffers, one per cipher.
+    :param dsts: Sequence of writable buffers, each at least as long as its source.
+    :return: List of the numbers of bytes written.
+    """
+    if not len(ciphers) == len(srcs) == len(dsts):
+        raise ValueError("ciphers, srcs and dsts must have the same length")
+    if len({id(cipher) for cipher in ciphers}) != len(ciphers):
+        raise ValueError("ciphers contains the same cipher twice")
+    if _snowv is None or any(cipher._native is None for cipher in ciphers):
+        return [cipher.encrypt_into(src, dst) for cipher, src, dst in zip(ciphers, srcs, dsts)]
+    states = _snowv.encrypt_into_many([cipher._state_bytes() for cipher in ciphers], srcs, dsts)
+    for cipher, state in zip(ciphers, states):
+        cipher._load_state_bytes(state)
+    return [memoryview(src).nbytes for src in srcs]
+
+
+def keystream_into_many(ciphers, bufs):
+    """
+    Fill bufs[i] with keystream of ciphers[i], like calling keystream_into on each.
+    :param ciphers: Sequence of SnowVCipher objects, each after keyiv_setup; all are advanced.
+    :param bufs: Sequence of writable buffers, one per cipher.
+    :return: List of the numbers of keystream bytes written.
+    """
+    if len(ciphers) != len(bufs):
+        raise ValueError("ciphers and bufs must have the same length")
+    if len({id(cipher) for cipher in ciphers}) != len(ciphers):
+        raise ValueError("ciphers contains the same cipher twice")
+    if _snowv is None or any(cipher._native is None for cipher in ciphers):
+        return [cipher.keystream_into(buf) for cipher, buf in zip(ciphers, bufs)]
+    states = _snowv.keystream_into_many([cipher._state_bytes() for cipher in ciphers], bufs)
+    for cipher, state in zip(ciphers, states):
+        cipher._load_state_bytes(state)
+    return [memoryview(buf).nbytes for buf in bufs]
+
+
+# Streaming wrapper that keeps the keystream position across calls
+class SnowVStream:
+
+    __slots__ = ('cipher', 'position', 'checkpoints', '_pending', '_pending_len', '_block_start', '_finalized')
+
+    def __init__(self, key, iv, is_aead_mode=False):
+        """
+        Create a stream over a freshly initialized SnowVCipher.
+        :param key: Byte sequence representing the encryption key.
+        :param iv: Byte sequence representing the initialization vector.
+        :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+        """
+        cipher = SnowVCipher()
+        cipher.keyiv_setup(key, iv, is_aead_mode)
+        self._attach(cipher)
+
+    @classmethod
+    def from_cipher(cls, cipher):
+        """
+        Create a stream that continues from the current state of an initialized cipher.
+        :param cipher: SnowVCipher after keyiv_setup; the stream takes it over.
+        :return: New SnowVStream.
+        """
+        stream = cls.__new__(cls)
+        stream._attach(cipher)
+        return stream
+
+    def _attach(self, cipher):
+        """
+        Reset the stream bookkeeping around a cipher.
+        :param cipher: SnowVCipher that produces the keystream.
+        """
+        self.cipher = cipher  # Underlying keystream generator
+        self.position = 0  # Number of bytes processed so far
+        self.checkpoints = None  # SnowVCheckpoints used by seek() and filled as blocks are generated
+        self._pending = 0  # Unused keystream bytes of the last block, first byte in the lowest bits
+        self._pending_len = 0  # Number of unused keystream bytes
+        self._block_start = None  # Cipher registers before the block _pending comes from, for export_state
+        self._finalized = False  # Set by finalize()
+
+    def export_state(self):
+        """
+        Export the session as a fixed-size blob of STATE_BLOB_SIZE bytes: the cipher registers,
+        the AEAD flag, the number of keystream bytes left over from a partial block and the
+        position. Loading it with from_state continues the stream at that position without a
+        new keyiv_setup.
+        The checkpoint index is not included; attach it with track_checkpoints(checkpoints=...).
+        The blob is as sensitive as the key.
+        :return: Blob for from_state.
+        """
+        blob = bytearray(_STATE_BLOB.size)
+        self.export_state_into(blob)
+        return bytes(blob)
+
+    def export_state_into(self, buffer, offset=0):
+        """
+        Write the export_state blob into a writable buffer, e.g. one slot of shared memory.
+        :param buffer: Writable buffer with STATE_BLOB_SIZE bytes free at offset.
+        :param offset: Byte offset of the blob in buffer.
+        :return: Number of bytes written.
+        """
+        cipher = self.cipher
+        flags = (_BLOB_AEAD if cipher.is_aead_mode else 0) | (_BLOB_FINALIZED if self._finalized else 0)
+        if self._pending_len:
+            # Registers at the start of the partial block; from_state generates the block again
+            block_start = PySnowVCipher()
+            block_start._a, block_start._b, block_start._r1, block_start._r2, block_start._r3 = self._block_start
+            registers = block_start._state_bytes()
+        else:
+            registers = cipher._state_bytes()
+        _STATE_BLOB.pack_into(buffer, offset, _BLOB_VERSION, flags, self._pending_len, registers, self.position)
+        return _STATE_BLOB.size
+
+    @classmethod
+    def from_state(cls, blob, offset=0, cipher_class=None):
+        """
+        Create a stream from an export_state blob (of a stream or of a bare cipher).
+        The blob is read in place, so one in shared memory is not copied first.
+        :param blob: Buffer holding the blob (bytes, bytearray, memoryview, mmap, ...).
+        :param offset: Byte offset of the blob in buffer.
+        :param cipher_class: Class of the new cipher (default SnowVCipher).
+        :return: New SnowVStream that continues exactly like the exported one.
+        """
+        view, flags, pending_len, position = _unpack_blob(blob, offset)
+        cipher = (cipher_class or SnowVCipher)()
+        cipher._load_state_bytes(view[_BLOB_REGISTERS:_BLOB_POSITION])
+        cipher.is_aead_mode = bool(flags & _BLOB_AEAD)
+        stream = cls.__new__(cls)
+        stream._attach(cipher)
+        stream.position = position
+        if pending_len:
+            stream._keep_tail(16 - pending_len)
+        stream._finalized = bool(flags & _BLOB_FINALIZED)
+        return stream
+
+    def __reduce__(self):
+        # Pickle as a state blob, plus the checkpoint index when one is attached
+        args = (self.export_state(), 0, type(self.cipher))
+        if self.checkpoints is None:
+            return type(self).from_state, args
+        return type(self).from_state, args, (None, {'checkpoints': self.checkpoints})
+
+    def track_checkpoints(self, interval=1024, checkpoints=None):
+        """
+        Save the cipher state every interval blocks while the stream is processed,
+        or attach a previously built index. Either way seek() then costs at most
+        interval blocks of keystream generation.
+        :param interval: Blocks between checkpoints when building a new index.
+        :param checkpoints: Existing SnowVCheckpoints for this key and IV, e.g. loaded
+                            with SnowVCheckpoints.from_bytes, instead of a new one.
+        :return: The SnowVCheckpoints in use; store checkpoints.to_bytes() with the ciphertext.
+        """
+        if checkpoints is None:
+            if self.position or self._pending_len:
+                raise ValueError("a new checkpoint index must start at position 0")
+            checkpoints = SnowVCheckpoints(interval)
+        self.checkpoints = checkpoints
+        checkpoints._record(0, self.cipher)
+        return checkpoints
+
+    def _keep_tail(self, used):
+        """
+        Generate the next keystream block and keep all but its first used bytes for later calls.
+        :param used: Number of bytes of the block consumed now, 1 to 15.
+        :return: The whole keystream block.
+        """
+        cipher = self.cipher
+        self._block_start = (cipher._a, cipher._b, cipher._r1, cipher._r2, cipher._r3)
+        keystream = cipher._keystream_block()
+        self._pending = keystream >> (used * 8)
+        self._pending_len = 16 - used
+        return keystream
+
+    def _next_block(self):
+        """
+        :return: Index of the next keystream block the cipher will generate.
+        """
+        return (self.position + self._pending_len) // 16
+
+    def _run_blocks(self, block, length, src=None, dst=None):
+        """
+        Generate length bytes (whole blocks) of keystream starting at block, XORed from
+        src into dst, or discarded when src is None. Work is split at checkpoint
+        boundaries so that the state at each boundary can be saved.
+        :param block: Index of the first block.
+        :param length: Number of bytes, a multiple of 16.
+        :param src: Source buffer, or None to only advance the cipher.
+        :param dst: Destination buffer when src is given.
+        """
+        checkpoints = self.checkpoints
+        interval = checkpoints.interval if checkpoints is not None else length // 16
+        scratch = None  # Reused buffer for discarded keystream, at most _SKIP_CHUNK bytes
+        done = 0
+        while done < length:
+            if checkpoints is not None:
+                checkpoints._record(block, self.cipher)
+            n = min(length - done, (interval - block % interval) * 16)
+            if src is None:
+                if scratch is None:
+                    scratch = memoryview(bytearray(min(length, _SKIP_CHUNK)))
+                for skipped in range(0, n, _SKIP_CHUNK):
+                    self.cipher.keystream_into(scratch[:min(n - skipped, _SKIP_CHUNK)])
+            else:
+                self.cipher.encrypt_into(src[done:done + n], dst[done:done + n])
+            done += n
+            block += n // 16
+
+    def seek(self, offset):
+        """
+        Move the stream to an absolute byte offset. Without a checkpoint index only
+        forward moves are possible and cost the keystream in between.
+        :param offset: Byte offset from the start of the stream.
+        :return: The new position.
+        """
+        if self._finalized:
+            raise ValueError("stream has been finalized")
+        if offset < 0:
+            raise ValueError("negative seek offset")
+        block, within = divmod(offset, 16)
+        current = self._next_block()
+        checkpoints = self.checkpoints
+        if checkpoints is not None and checkpoints.states:
+            nearest = min(block // checkpoints.interval, len(checkpoints.states) - 1)
+            start = nearest * checkpoints.interval
+            if start > current or block < current:  # The checkpoint is closer than the current state
+                self.cipher._load_state_bytes(checkpoints.states[nearest])
+                current = start
+        if block < current:
+            raise ValueError("seeking backwards needs a checkpoint index (see track_checkpoints)")
+
+        self._run_blocks(current, (block - current) * 16)  # Skip to the block holding offset
+        self._pending = 0
+        self._pending_len = 0
+        if within:
+            if checkpoints is not None:
+                checkpoints._record(block, self.cipher)
+            self._keep_tail(within)
+        self.position = offset
+        return offset
+
+    def update_into(self, src, dst):
+        """
+        Encrypt (or decrypt) the next len(src) bytes of the stream into dst.
+        Keystream left over from the previous call is used first, so the result does
+        not depend on how the stream is split into calls.
+        :param src: Buffer holding the next plaintext (or ciphertext) bytes.
+        :param dst: Writable buffer of at least len(src) bytes; may be src itself.
+        :return: Number of bytes written to dst.
+        """
+        if self._finalized:
+            raise ValueError("stream has been finalized")
+        src = memoryview(src).cast('B')  # Byte views of both buffers, no copies
+        dst = memoryview(dst).cast('B')
+        length = len(src)
+        if len(dst) < length:
+            raise ValueError(f"destination buffer too small: {len(dst)} < {length} bytes")
+
+        block = self._next_block()  # Block the cipher generates next
+
+        # Use up the keystream left over from the previous call
+        start = min(length, self._pending_len)
+        if start:
+            keystream = self._pending & ((1 << (start * 8)) - 1)
+            dst[:start] = (int.from_bytes(src[:start], 'little') ^ keystream).to_bytes(start, 'little')
+            self._pending >>= start * 8
+            self._pending_len -= start
+
+        # Whole blocks go straight through the cipher
+        end = start + (length - start) // 16 * 16
+        if end > start:
+            self._run_blocks(block, end - start, src[start:end], dst[start:end])
+            block += (end - start) // 16
+
+        # A trailing partial block keeps the rest of its keystream for the next call
+        if end < length:
+            if self.checkpoints is not None:
+                self.checkpoints._record(block, self.cipher)
+            tail = length - end
+            keystream = self._keep_tail(tail)
+            chunk = int.from_bytes(src[end:], 'little') ^ (keystream & ((1 << (tail * 8)) - 1))
+            dst[end:length] = chunk.to_bytes(tail, 'little')
+
+        self.position += length
+        return length
+
+    def update(self, data):
+        """
+        Encrypt (or decrypt) the next chunk of the stream.
+        :param data: Byte sequence of any length.
+        :return: Bytes of the same length as data.
+        """
+        out = bytearray(len(data))
+        self.update_into(data, out)
+        return bytes(out)
+
+    def finalize(self):
+        """
+        Finish the stream. A stream cipher has nothing buffered, so no bytes are returned;
+        the leftover keystream is discarded and further updates are rejected.
+        :return: Empty bytes.
+        """
+        self._finalized = True
+        self._pending = 0
+        self._pending_len = 0
+        self._block_start = None
+        return b''
+
+    def iter_encrypt(self, chunks):
+        """
+        Encrypt (or decrypt) an iterable of chunks lazily, holding one chunk at a time.
+        :param chunks: Iterable of byte sequences.
+        :return: Generator yielding the processed chunks in order.
+        """
+        for chunk in chunks:
+            yield self.update(chunk)
+
+    def open_encrypted(self, fileobj, closefd=True):
+        """
+        Wrap a binary file object so that reads and writes pass through this stream.
+        Reading from ciphertext yields plaintext, writing plaintext stores ciphertext.
+        :param fileobj: Binary file object opened for reading or writing.
+        :param closefd: Whether closing the wrapper also closes fileobj.
+        :return: SnowVFile, a raw binary file; wrap it in io.BufferedReader/Writer if needed.
+        """
+        return SnowVFile(self, fileobj, closefd)
+
+
+# Raw binary file that encrypts or decrypts everything going through it
+class SnowVFile(io.RawIOBase):
+
+    def __init__(self, stream, fileobj, closefd=True):
+        """
+        :param stream: SnowVStream positioned at the start of fileobj's data.
+        :param fileobj: Underlying binary file object.
+        :param closefd: Whether close() also closes fileobj.
+        """
+        super().__init__()
+        self.stream = stream
+        self.fileobj = fileobj
+        self.closefd = closefd
+
+    def readable(self):
+        return self.fileobj.readable()
+
+    def writable(self):
+        return self.fileobj.writable()
+
+    def seekable(self):
+        return self.fileobj.seekable()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Seek the underlying file and move the stream to the same position.
+        Efficient random access needs a checkpoint index on the stream. If the stream
+        cannot move there, the file is put back where it was.
+        :param offset: Offset relative to whence.
+        :param whence: io.SEEK_SET, io.SEEK_CUR or io.SEEK_END.
+        :return: New absolute position.
+        """
+        previous = self.fileobj.tell()
+        position = self.fileobj.seek(offset, whence)
+        try:
+            self.stream.seek(position)
+        except BaseException:
+            self.fileobj.seek(previous)  # Keep the file and the keystream in step
+            raise
+        return position
+
+    def tell(self):
+        return self.stream.position
+
+    def readinto(self, buffer):
+        """
+        Read from the underlying file and decrypt in place.
+        :param buffer: Writable buffer to fill.
+        :return: Number of bytes read, 0 at end of file.
+        """
+        view = memoryview(buffer).cast('B')
+        count = self.fileobj.readinto(view)
+        if count:
+            self.stream.update_into(view[:count], view[:count])
+        return count
+
+    def write(self, data):
+        """
+        Encrypt data and write it to the underlying file.
+        :param data: Byte sequence to write.
+        :return: Number of bytes written.
+        """
+        encrypted = memoryview(self.stream.update(data))
+        view = encrypted
+        while view:  # Raw files may accept fewer bytes than offered
+            view = view[self.fileobj.write(view):]
+        return len(encrypted)
+
+    def close(self):
+        if not self.closed:
+            try:
+                if self.closefd:
+                    self.fileobj.close()
+            finally:
+                super().close()
+
+
+
+
+# Cipher states saved every few blocks, for random access into a stream
+class SnowVCheckpoints:
+
+    _HEADER = struct.Struct('<4sII')  # Magic, interval, number of states
+    _MAGIC = b'SNVC'
+
+    def __init__(self, interval=1024, states=None):
+        """
+        :param interval: Number of 16-byte blocks between checkpoints.
+        :param states: Serialized cipher states at blocks 0, interval, 2*interval, ...
+        """
+        if interval < 1:
+            raise ValueError("checkpoint interval must be at least one block")
+        self.interval = interval
+        self.states = list(states) if states is not None else []
+
+    def _record(self, block, cipher):
+        """
+        Save the cipher state if block is the next checkpoint to be recorded.
+        :param block: Index of the block the cipher generates next.
+        :param cipher: SnowVCipher positioned at that block.
+        """
+        if block % self.interval == 0 and block // self.interval == len(self.states):
+            self.states.append(cipher._state_bytes())
+
+    def to_bytes(self):
+        """
+        Serialize the index to store it next to the ciphertext. It contains raw
+        cipher states, so it is as sensitive as the key.
+        :return: Header followed by 112 bytes per checkpoint.
+        """
+        return self._HEADER.pack(self._MAGIC, self.interval, len(self.states)) + b''.join(self.states)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Load an index written by to_bytes().
+        :param data: Serialized index.
+        :return: SnowVCheckpoints.
+        """
+        magic, interval, count = cls._HEADER.unpack_from(data)
+        size = _STATE_BYTES
+        if magic != cls._MAGIC or len(data) != cls._HEADER.size + count * size:
+            raise ValueError("not a SNOW-V checkpoint index")
+        offset = cls._HEADER.size
+        return cls(interval, [bytes(data[offset + i*size:offset + (i + 1)*size]) for i in range(count)])
+
+
+# Running GHASH over zero-padded blocks, as in GCM
+class _GHash:
+
+    __slots__ = ('_h', '_table', '_x', '_buffer')
+
+    def __init__(self, h):
+        """
+        :param h: 16-byte hash key H.
+        """
+        self._h = bytes(h)
+        # Pure Python multiplies with Shoup's 8-bit table; the native core builds its own
+        self._table = _ghash_table(int.from_bytes(self._h, 'big')) if _snowv is None else None
+        self._x = bytes(16)  # Running hash value
+        self._buffer = b''  # Bytes of an incomplete block
+
+    def _absorb(self, data):
+        """
+        Multiply data into the running hash; a trailing partial block is zero-padded.
+        :param data: Byte sequence.
+        """
+        if self._table is None:
+            self._x = _snowv.ghash_update(self._h, self._x, data)
+            return
+        table = self._table
+        x = int.from_bytes(self._x, 'big')  # GCM bit order: x^0 is the top bit
+        for i in range(0, len(data), 16):
+            x ^= int.from_bytes(bytes(data[i:i+16]).ljust(16, b'\0'), 'big')
+            z = 0
+            for byte in x.to_bytes(16, 'little'):  # Horner's rule from the last byte to the first
+                z = (z >> 8) ^ _GHASH_REDUCE[z & 0xFF] ^ table[byte]
+            x = z
+        self._x = x.to_bytes(16, 'big')
+
+    def update(self, data):
+        """
+        Absorb more bytes of the current section (AAD or ciphertext).
+        :param data: Byte sequence.
+        """
+        data = self._buffer + bytes(data)
+        whole = len(data) - len(data) % 16
+        self._absorb(data[:whole])
+        self._buffer = data[whole:]
+
+    def pad(self):
+        """
+        End the current section, zero-padding its last block.
+        """
+        if self._buffer:
+            self._absorb(self._buffer)
+            self._buffer = b''
+
+    def digest(self):
+        """
+        :return: 16-byte hash of everything absorbed so far.
+        """
+        return self._x
+
+
+# SNOW-V-GCM authenticated encryption
+class SnowVGCM:
+
+    TAG_SIZE = 16  # Tag length in bytes
+
+    __slots__ = ('_stream', '_ghash', '_end_pad', '_aad_len', '_data_len', '_direction', '_finished')
+
+    def __init__(self, key, iv):
+        """
+        Initialize SNOW-V in AEAD mode. The first keystream block is the GHASH key H,
+        the second masks the tag, and the payload is encrypted from the third on.
+        :param key: 32-byte key.
+        :param iv: 16-byte IV; never reuse an IV with the same key.
+        """
+        cipher = SnowVCipher()
+        cipher.keyiv_setup(key, iv, is_aead_mode=True)
+        keystream = cipher.generate_keystream(32)
+        self._ghash = _GHash(keystream[:16])  # H = z0
+        self._end_pad = keystream[16:]  # endPad = z1
+        self._stream = SnowVStream.from_cipher(cipher)  # Payload keystream from z2 on
+        self._aad_len = 0  # Bytes of associated data so far
+        self._data_len = 0  # Bytes of ciphertext so far
+        self._direction = None  # 'encrypt' or 'decrypt' once payload has been processed
+        self._finished = False  # Set once the tag has been computed
+
+    def update_aad(self, data):
+        """
+        Authenticate associated data. All of it must come before the payload.
+        :param data: Byte sequence.
+        """
+        if self._finished:
+            raise ValueError("context has been finalized")
+        if self._direction is not None:
+            raise ValueError("associated data must precede the payload")
+        self._ghash.update(data)
+        self._aad_len += len(data)
+
+    def _start_payload(self, direction):
+        """
+        Close the associated data section on the first payload call.
+        :param direction: 'encrypt' or 'decrypt'.
+        """
+        if self._finished:
+            raise ValueError("context has been finalized")
+        if self._direction is None:
+            self._ghash.pad()
+            self._direction = direction
+        elif self._direction != direction:
+            raise ValueError(f"this context can only {self._direction}")
+
+    def encrypt(self, plaintext):
+        """
+        Encrypt the next chunk of the payload.
+        :param plaintext: Byte sequence of any length.
+        :return: Ciphertext of the same length.
+        """
+        self._start_payload('encrypt')
+        ciphertext = self._stream.update(plaintext)
+        self._ghash.update(ciphertext)
+        self._data_len += len(ciphertext)
+        return ciphertext
+
+    def decrypt(self, ciphertext):
+        """
+        Decrypt the next chunk of the payload. Do not use the plaintext before verify() succeeds.
+        :param ciphertext: Byte sequence of any length.
+        :return: Plaintext of the same length.
+        """
+        self._start_payload('decrypt')
+        self._ghash.update(ciphertext)
+        self._data_len += len(ciphertext)
+        return self._stream.update(ciphertext)
+
+    def _tag(self):
+        """
+        Finish GHASH with the length block and mask it with endPad; the context is done afterwards.
+        :return: 16-byte tag.
+        """
+        self._finished = True
+        self._ghash.pad()
+        self._ghash.update((self._aad_len * 8).to_bytes(8, 'big') + (self._data_len * 8).to_bytes(8, 'big'))
+        self._stream.finalize()
+        return bytes(x ^ y for x, y in zip(self._ghash.digest(), self._end_pad))
+
+    def finalize(self):
+        """
+        Finish encryption.
+        :return: 16-byte authentication tag.
+        """
+        self._start_payload('encrypt')
+        return self._tag()
+
+    def verify(self, tag):
+        """
+        Finish decryption and check the tag.
+        :param tag: 16-byte tag received with the ciphertext.
+        :raises ValueError: If the tag does not match.
+        """
+        self._start_payload('decrypt')
+        if not hmac.compare_digest(self._tag(), bytes(tag)):
+            raise ValueError("authentication tag mismatch")
+
+    @classmethod
+    def seal(cls, key, iv, aad, plaintext):
+        """
+        Encrypt and authenticate in one call.
+        :param key: 32-byte key.
+        :param iv: 16-byte IV.
+        :param aad: Associated data, authenticated but not encrypted.
+        :param plaintext: Byte sequence to encrypt.
+        :return: Ciphertext followed by the 16-byte tag.
+        """
+        if _snowv is not None:
+            out = bytearray(len(plaintext) + cls.TAG_SIZE)
+            view = memoryview(out)
+            view[len(plaintext):] = _snowv.gcm_crypt(bytes(key), bytes(iv), aad, plaintext, view[:len(plaintext)], True)
+            return bytes(out)
+        context = cls(key, iv)
+        context.update_aad(aad)
+        return context.encrypt(plaintext) + context.finalize()
+
+    @classmethod
+    def open(cls, key, iv, aad, sealed):
+        """
+        Check and decrypt the output of seal().
+        :param key: 32-byte key.
+        :param iv: 16-byte IV.
+        :param aad: Associated data passed to seal().
+        :param sealed: Ciphertext followed by the 16-byte tag.
+        :return: Plaintext.
+        :raises ValueError: If the input is too short or the tag does not match.
+        """
+        if len(sealed) < cls.TAG_SIZE:
+            raise ValueError("sealed data is shorter than the tag")
+        ciphertext = memoryview(sealed)[:len(sealed) - cls.TAG_SIZE]
+        tag = bytes(memoryview(sealed)[len(sealed) - cls.TAG_SIZE:])
+        if _snowv is not None:
+            plaintext = bytearray(len(ciphertext))
+            expected = _snowv.gcm_crypt(bytes(key), bytes(iv), aad, ciphertext, plaintext, False)
+            if not hmac.compare_digest(expected, tag):
+                raise ValueError("authentication tag mismatch")
+            return bytes(plaintext)
+        context = cls(key, iv)
+        context.update_aad(aad)
+        plaintext = context.decrypt(ciphertext)
+        context.verify(tag)
+        return plaintext
+
+# Optional instrumentation of the cipher hot paths
+class SnowVInstrumentation:
+    """
+    Process-wide counters and timers for SnowVCipher and the helpers built on it.
+    While off, the original methods are in place and nothing is counted. enable() swaps in
+    instrumented variants of the methods (and of the module-level round helpers), so the
+    cost is only paid while it is on.
+
+    Counters: setups, blocks (keystream blocks output, native and pure), bytes_encrypted
+    and bytes_keystream. Timers (calls and seconds): keyiv_setup always; fsm_update,
+    lfsr_update and aes_enc_round only with timing=True, since they wrap per-block work.
+    Phase timers nest (fsm_update includes its AES rounds) and the LFSR and AES timers also
+    cover the initialization rounds. Updates are not locked, so concurrent threads may lose
+    a few counts.
+    """
+
+    COUNTERS = ('setups', 'blocks', 'bytes_encrypted', 'bytes_keystream')
+    PHASES = ('keyiv_setup', 'fsm_update', 'lfsr_update', 'aes_enc_round')
+
+    def __init__(self):
+        self.mode = None  # None when off, 'counters' or 'timing'
+        self._swapped = []  # (owner, name, original) of everything swapped in
+        # The dicts are updated in place by the instrumented variants, never replaced
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.calls = dict.fromkeys(self.PHASES, 0)
+        self.seconds = dict.fromkeys(self.PHASES, 0.0)
+
+    def reset(self):
+        """
+        Zero all counters and timers.
+        """
+        for values in (self.counters, self.calls, self.seconds):
+            for name in values:
+                values[name] = 0
+
+    def as_dict(self):
+        """
+        :return: Flat dict of all counters, plus <phase>_calls and <phase>_seconds per phase.
+        """
+        result = dict(self.counters)
+        for phase in self.PHASES:
+            result[phase + '_calls'] = self.calls[phase]
+            result[phase + '_seconds'] = self.seconds[phase]
+        return result
+
+    def _swap(self, owner, name, replacement):
+        """
+        Replace a class attribute, or a module global when owner is globals().
+        """
+        if isinstance(owner, dict):
+            self._swapped.append((owner, name, owner[name]))
+            owner[name] = replacement
+        else:
+            self._swapped.append((owner, name, owner.__dict__[name]))
+            setattr(owner, name, replacement)
+
+    def _timed(self, phase, function):
+        """
+        :return: function wrapped to add its calls and run time to phase.
+        """
+        calls = self.calls
+        seconds = self.seconds
+        perf_counter = time.perf_counter
+
+        def timed(*args):
+            start = perf_counter()
+            result = function(*args)
+            seconds[phase] += perf_counter() - start
+            calls[phase] += 1
+            return result
+        return timed
+
+    def enable(self, timing=False):
+        """
+        Swap in the instrumented variants.
+        :param timing: Whether to also time fsm_update, lfsr_update and aes_enc_round.
+        """
+        mode = 'timing' if timing else 'counters'
+        if self.mode == mode:
+            return
+        self.disable()
+        counters = self.counters
+        module = globals()
+
+        keyiv_setup = SnowVCipher.keyiv_setup
+        timed_setup = self._timed('keyiv_setup', keyiv_setup)
+
+        def counted_keyiv_setup(cipher, key, iv, is_aead_mode=False):
+            timed_setup(cipher, key, iv, is_aead_mode)
+            counters['setups'] += 1
+            if cipher.init_z_values is not None:
+                counters['blocks'] -= 16  # The recorded initialization rounds output no keystream
+
+        keystream_block = SnowVCipher._keystream_block
+
+        def counted_keystream_block(cipher):
+            counters['blocks'] += 1
+            return keystream_block(cipher)
+
+        encrypt_into = SnowVCipher.encrypt_into
+
+        def counted_encrypt_into(cipher, src, dst):
+            length = encrypt_into(cipher, src, dst)
+            counters['bytes_encrypted'] += length
+            if cipher._native is not None:
+                counters['blocks'] += -(-length // 16)  # The pure path counts in _keystream_block
+            return length
+
+        keystream_into = SnowVCipher.keystream_into
+
+        def counted_keystream_into(cipher, buf):
+            length = keystream_into(cipher, buf)
+            counters['bytes_keystream'] += length
+            if cipher._native is not None:
+                counters['blocks'] += -(-length // 16)
+            return length
+
+        def counted_schedule_setup(schedule, cipher, iv):
+            cipher.keyiv_setup(schedule._key, iv, schedule.is_aead_mode)  # Counted and timed there
+            return cipher
+
+        encrypt_many = SnowVKeySchedule.encrypt_many
+
+        def counted_encrypt_many(schedule, ivs, payloads):
+            if _snowv is not None:  # One native call; the pure path is counted per packet
+                counters['setups'] += len(ivs)
+                for payload in payloads:
+                    length = memoryview(payload).nbytes
+                    counters['bytes_encrypted'] += length
+                    counters['blocks'] += -(-length // 16)
+            return encrypt_many(schedule, ivs, payloads)
+
+        def counted_many(original, counter):
+            def counted(ciphers, *buffers):
+                lengths = original(ciphers, *buffers)
+                if _snowv is not None and all(cipher._native is not None for cipher in ciphers):
+                    # One native call; the pure path is counted per cipher
+                    counters[counter] += sum(lengths)
+                    counters['blocks'] += sum(-(-length // 16) for length in lengths)
+                return lengths
+            return counted
+
+        def counted_gcm(original):
+            def counted(cls, key, iv, aad, data):
+                if _snowv is not None:  # One native call; the pure path is counted by SnowVCipher
+                    length = max(0, memoryview(data).nbytes - (0 if original is seal else cls.TAG_SIZE))
+                    counters['setups'] += 1
+                    counters['bytes_encrypted'] += length
+                    counters['blocks'] += 2 + -(-length // 16)  # H and endPad, then the payload
+                return original(cls, key, iv, aad, data)
+            return classmethod(counted)
+
+        seal = SnowVGCM.seal.__func__
+        self._swap(SnowVCipher, 'keyiv_setup', counted_keyiv_setup)
+        self._swap(SnowVCipher, '_keystream_block', counted_keystream_block)
+        self._swap(SnowVCipher, 'encrypt_into', counted_encrypt_into)
+        self._swap(SnowVCipher, 'keystream_into', counted_keystream_into)
+        self._swap(SnowVKeySchedule, 'setup', counted_schedule_setup)
+        self._swap(SnowVKeySchedule, 'encrypt_many', counted_encrypt_many)
+        self._swap(SnowVGCM, 'seal', counted_gcm(seal))
+        self._swap(SnowVGCM, 'open', counted_gcm(SnowVGCM.open.__func__))
+        self._swap(module, 'encrypt_into_many', counted_many(encrypt_into_many, 'bytes_encrypted'))
+        self._swap(module, 'keystream_into_many', counted_many(keystream_into_many, 'bytes_keystream'))
+
+        if timing:
+            self._swap(SnowVCipher, 'fsm_update', self._timed('fsm_update', SnowVCipher.fsm_update))
+            self._swap(SnowVCipher, 'aes_enc_round', self._timed('aes_enc_round', SnowVCipher.aes_enc_round))
+            self._swap(SnowVCipher, 'aes_enc_round_zero',
+                       self._timed('aes_enc_round', SnowVCipher.aes_enc_round_zero))
+            # The packed helpers are looked up as globals on every call, by the methods and _init_rounds
+            self._swap(module, '_aes_round128', self._timed('aes_enc_round', _aes_round128))
+            self._swap(module, '_lfsr_step8', self._timed('lfsr_update', _lfsr_step8))
+        self.mode = mode
+
+    def disable(self):
+        """
+        Put the original methods back. Counters keep their values.
+        """
+        while self._swapped:
+            owner, name, original = self._swapped.pop()
+            if isinstance(owner, dict):
+                owner[name] = original
+            else:
+                setattr(owner, name, original)
+        self.mode = None
+
+    @contextlib.contextmanager
+    def region(self, timing=True, profile=False):
+        """
+        Instrument a block of code:
+
+            with instrumentation.region(profile=True) as report:
+                ...
+            metrics.update(report.counters)
+            report.profile.print_stats('cumulative')
+
+        :param timing: Whether to time the per-block phases as well (see enable).
+        :param profile: Whether to run cProfile over the block.
+        :return: Context manager yielding a report whose counters (the as_dict() deltas of
+                 the block) and profile (cProfile.Profile or None) are set on exit.
+        """
+        previous = self.mode
+        before = self.as_dict()
+        report = _InstrumentationReport()
+        self.enable(timing=timing or previous == 'timing')
+        profiler = None
+        if profile:
+            import cProfile  # Only needed when profiling
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield report
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            after = self.as_dict()
+            if previous is None:
+                self.disable()
+            else:
+                self.enable(timing=previous == 'timing')
+            report.counters = {name: after[name] - before[name] for name in after}
+            report.profile = profiler
+
+
+# Result of SnowVInstrumentation.region
+class _InstrumentationReport:
+
+    __slots__ = ('counters', 'profile')
+
+    def __init__(self):
+        self.counters = {}
+        self.profile = None
+
+
+def _ghash_table(h):
+    """
+    Build Shoup's 8-bit GHASH table: entry b is the byte b (top bit = x^0) times H.
+    :param h: Hash key H as a 128-bit integer in GCM bit order.
+    :return: List of 256 128-bit integers.
+    """
+    table = [0]*256
+    v = h
+    for bit in (0x80, 0x40, 0x20, 0x10, 0x08, 0x04, 0x02, 0x01):
+        table[bit] = v
+        v = (v >> 1) ^ _GHASH_R if v & 1 else v >> 1  # Multiply by x
+    for i in (2, 4, 8, 16, 32, 64, 128):  # Fill in every sum of the single-bit entries
+        for j in range(1, i):
+            table[i + j] = table[i] ^ table[j]
+    return table
+
+
+def _ghash_reduce_table():
+    """
+    Build the table that folds the 8 bits shifted out by a multiplication by x^8 back in.
+    :return: List of 256 128-bit integers.
+    """
+    table = []
+    for b in range(256):
+        v = b
+        for _ in range(8):
+            v = (v >> 1) ^ _GHASH_R if v & 1 else v >> 1
+        table.append(v)
+    return table
+
+
+# Size of a serialized cipher state (SnowVCipher._state_bytes)
+_STATE_BYTES = 112
+
+# Exported state (export_state): format version, flags, number of leftover keystream bytes,
+# serialized registers, stream position. With leftover keystream the registers are those at
+# the start of its block, which the importer generates again, so the keystream is not stored
+_STATE_BLOB = struct.Struct('<BBB112sQ')
+STATE_BLOB_SIZE = _STATE_BLOB.size  # 123 bytes
+_BLOB_VERSION = 2  # Version 1 stored the leftover keystream itself in 16 more bytes
+_BLOB_AEAD = 1  # Flag: cipher initialized in AEAD mode
+_BLOB_FINALIZED = 2  # Flag: stream finalized
+_BLOB_REGISTERS = 3  # Offset of the registers in the blob
+_BLOB_POSITION = _BLOB_REGISTERS + _STATE_BYTES  # Offset of the stream position
+
+# Bytes XORed per big-integer operation in encrypt_into
+_XOR_CHUNK = 4096
+
+# Keystream generated and discarded per step when a stream skips ahead (a multiple of 16)
+_SKIP_CHUNK = 1 << 16
+
+
+# AEAD-mode initial values of cells B[0..7]
+_AEAD_B_LOW = _pack([0x6C41, 0x7865, 0x6B45, 0x2064, 0x694A, 0x676E, 0x6854, 0x6D6F], 16)
+
+# AES T-tables, built once at import from the SnowVCipher S-Box
+_TE0, _TE1, _TE2, _TE3 = _build_aes_tables(SnowVCipher.SBox)
+
+# GHASH reduction: x^128 = x^7 + x^2 + x + 1, in GCM bit order
+_GHASH_R = 0xE1 << 120
+_GHASH_REDUCE = _ghash_reduce_table()
+
+# Process-wide instrumentation, off until enabled
+instrumentation = SnowVInstrumentation()
+
+
+if __name__ == '__main__':
+    import sys
+    import snowV_CLI  # python -m snowV runs the snowv command-line tool
+    sys.exit(snowV_CLI.main())
@@ -0,0 +1,290 @@
+# asyncio integration: StreamReader/StreamWriter wrappers that encrypt with a SnowVStream
+# without blocking the event loop on large payloads
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import snowV
+from snowV_Prefetch import DEFAULT_CHUNK_SIZE, SnowVPrefetcher
+
+DEFAULT_OFFLOAD_THRESHOLD = 64 * 1024  # Payloads of at least this many bytes go to the executor
+
+
+def _update(stream, data):
+    """
+    Executor job: run stream.update(data).
+    The stream is returned as well, since a process executor works on a pickled copy of it.
+    :return: Tuple (stream, output bytes).
+    """
+    return stream, stream.update(data)
+
+
+class _PrefetchedStream:
+    """
+    Encrypts for a SnowVStream with keystream that a SnowVPrefetcher generates ahead on a
+    worker thread. The stream keeps counting processed bytes in position, but its cipher
+    belongs to the prefetcher until close(), which moves it back to that position.
+    Blocks taken from the prefetcher never pass the stream's checkpoint index, so streams
+    that track checkpoints are refused.
+    """
+
+    def __init__(self, stream, capacity):
+        if stream.checkpoints is not None:
+            raise ValueError("keystream prefetching cannot keep a checkpoint index")
+        self.stream = stream
+        self._prefetcher = SnowVPrefetcher(stream.cipher, capacity=capacity,
+                                           chunk_size=min(capacity, DEFAULT_CHUNK_SIZE))
+
+    def update(self, data):
+        """
+        :return: data passed through the stream; waits for the worker if too little keystream is ready.
+        """
+        stream = self.stream
+        if stream.checkpoints is not None:  # Attached after the prefetcher took over
+            raise ValueError("keystream prefetching cannot keep a checkpoint index")
+        head = min(len(data), stream._pending_len)  # Keystream left over in the stream comes first
+        out = stream.update(data[:head]) if head else b''
+        if head < len(data):
+            out += self._prefetcher.encrypt(data[head:])
+            stream.position += len(data) - head
+        return out
+
+    def close(self):
+        prefetcher = self._prefetcher
+        prefetcher.close()  # Rewinds the cipher to the block holding the prefetcher's position
+        if prefetcher.position:  # Otherwise the stream's own leftover keystream is still unused
+            stream = self.stream
+            stream._pending = 0
+            stream._pending_len = 0
+            within = prefetcher.position % 16
+            if within:
+                stream._keep_tail(within)
+
+
+class _Offloader:
+    """
+    Runs SnowVStream updates in call order, inline for small payloads and in an executor
+    for large ones. The stream is only ever used by one update at a time, so keystream
+    positions follow each other without gaps or overlaps however the work is split.
+    """
+
+    def __init__(self, stream, offload_threshold, executor, prefetch=0):
+        self.stream = stream  # SnowVStream; replaced by the returned copy after process executor jobs
+        self.offload_threshold = offload_threshold
+        self.executor = executor  # None for the loop's default thread pool
+        self.prefetched = None  # _PrefetchedStream when keystream is generated ahead
+        if prefetch:
+            if isinstance(executor, ProcessPoolExecutor):
+                raise ValueError("keystream prefetching needs a thread executor")
+            if prefetch % 16:
+                raise ValueError("prefetch must be a multiple of 16 bytes")
+            self.prefetched = _PrefetchedStream(stream, prefetch)
+
+    def update(self, data):
+        """
+        :return: data passed through the stream, computed inline.
+        """
+        return (self.prefetched or self.stream).update(data)
+
+    async def run(self, data):
+        """
+        :return: data passed through the stream.
+        """
+        if len(data) < self.offload_threshold:
+            return self.update(data)
+        loop = asyncio.get_running_loop()
+        if self.prefetched is not None:  # Shared with the prefetch worker, so never pickled
+            return await loop.run_in_executor(self.executor, self.prefetched.update, bytes(data))
+        self.stream, out = await loop.run_in_executor(self.executor, _update, self.stream, bytes(data))
+        return out
+
+    def close(self):
+        """
+        Stop the prefetch worker, if any.
+        """
+        if self.prefetched is not None:
+            self.prefetched.close()
+
+
+class SnowVStreamWriter:
+    """
+    Wraps an asyncio.StreamWriter so that everything written is encrypted first.
+    Small writes are encrypted and handed to the transport immediately. Larger ones are
+    encrypted in an executor and queued; writes issued meanwhile are queued behind them,
+    so the ciphertext keeps the order of the write calls.
+    With prefetch, a worker thread keeps that much keystream generated ahead of the writes
+    (see snowV_Prefetch), so encrypting a write is only an XOR. This pays off with the
+    pure-Python core; the native core generates keystream faster than Python XORs it.
+    """
+
+    def __init__(self, writer, stream, offload_threshold=DEFAULT_OFFLOAD_THRESHOLD, executor=None, prefetch=0):
+        """
+        :param writer: asyncio.StreamWriter carrying the ciphertext.
+        :param stream: SnowVStream used for encryption, at the position of the next byte.
+        :param offload_threshold: Writes of at least this many bytes are encrypted in the executor.
+        :param executor: concurrent.futures executor, or None for the loop's default thread pool.
+        :param prefetch: Bytes of keystream to keep ready (a multiple of 16), or 0 to generate it
+                         on demand. Needs a thread executor and a stream without a checkpoint
+                         index; the stream's cipher is then used by the worker thread until close().
+        """
+        self._writer = writer
+        self._offloader = _Offloader(stream, offload_threshold, executor, prefetch)
+        self._tail = None  # Task of the last queued write, None when nothing is queued
+
+    @property
+    def stream(self):
+        return self._offloader.stream
+
+    @property
+    def transport(self):
+        return self._writer.transport
+
+    def write(self, data):
+        """
+        Encrypt and write data, like StreamWriter.write. Call drain() to apply back-pressure
+        and to wait for queued writes.
+        :param data: Byte sequence of plaintext.
+        """
+        if self._tail is None and len(data) < self._offloader.offload_threshold:
+            self._writer.write(self._offloader.update(data))
+            return
+        self._tail = asyncio.ensure_future(self._queued_write(self._tail, bytes(data)))
+
+    async def _queued_write(self, previous, data):
+        """
+        Encrypt and write data once the write queued before it is done.
+        """
+        if previous is not None:
+            await previous
+        self._writer.write(await self._offloader.run(data))
+        if self._tail is asyncio.current_task():
+            self._tail = None  # The queue is empty again, later small writes go inline
+
+    def writelines(self, data):
+        for chunk in data:
+            self.write(chunk)
+
+    async def drain(self):
+        """
+        Wait until all queued writes have been encrypted and the transport buffer has drained.
+        Errors from queued writes are raised here.
+        """
+        if self._tail is not None:
+            await self._tail
+        await self._writer.drain()
+
+    def can_write_eof(self):
+        return self._writer.can_write_eof()
+
+    async def write_eof(self):
+        """
+        Close the write end after all queued writes.
+        """
+        if self._tail is not None:
+            await self._tail
+        self._writer.write_eof()
+
+    def is_closing(self):
+        return self._writer.is_closing()
+
+    def close(self):
+        """
+        Close the underlying writer after all queued writes.
+        """
+        if self._tail is None:
+            self._close()
+        else:
+            self._tail.add_done_callback(lambda task: self._close())
+
+    def _close(self):
+        self._offloader.close()
+        self._writer.close()
+
+    async def wait_closed(self):
+        if self._tail is not None:
+            await self._tail
+        await self._writer.wait_closed()
+
+    def get_extra_info(self, name, default=None):
+        return self._writer.get_extra_info(name, default)
+
+
+class SnowVStreamReader:
+    """
+    Wraps an asyncio.StreamReader so that everything read is decrypted.
+    Large reads are decrypted in an executor; reads must not be issued concurrently,
+    as with StreamReader itself.
+    """
+
+    def __init__(self, reader, stream, offload_threshold=DEFAULT_OFFLOAD_THRESHOLD, executor=None):
+        """
+        :param reader: asyncio.StreamReader delivering the ciphertext.
+        :param stream: SnowVStream used for decryption, at the position of the next byte.
+        :param offload_threshold: Reads of at least this many bytes are decrypted in the executor.
+        :param executor: concurrent.futures executor, or None for the loop's default thread pool.
+        """
+        self._reader = reader
+        self._offloader = _Offloader(stream, offload_threshold, executor)
+
+    @property
+    def stream(self):
+        return self._offloader.stream
+
+    async def read(self, n=-1):
+        """
+        :return: Up to n decrypted bytes (until EOF if n is -1), empty at EOF.
+        """
+        return await self._offloader.run(await self._reader.read(n))
+
+    async def readexactly(self, n):
+        """
+        :return: Exactly n decrypted bytes; raises asyncio.IncompleteReadError at an early EOF.
+        """
+        return await self._offloader.run(await self._reader.readexactly(n))
+
+    def at_eof(self):
+        return self._reader.at_eof()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self.read(self._offloader.offload_threshold)
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+
+def wrap_streams(reader, writer, key, read_iv, write_iv, is_aead_mode=False,
+                 offload_threshold=DEFAULT_OFFLOAD_THRESHOLD, executor=None, prefetch=0):
+    """
+    Wrap a StreamReader/StreamWriter pair, one SNOW-V stream per direction.
+    :param reader: asyncio.StreamReader of the connection.
+    :param writer: asyncio.StreamWriter of the connection.
+    :param key: Byte sequence representing the encryption key.
+    :param read_iv: IV of the incoming direction.
+    :param write_iv: IV of the outgoing direction; must differ from read_iv.
+    :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+    :param offload_threshold: Payloads of at least this many bytes are processed in the executor.
+    :param executor: concurrent.futures executor, or None for the loop's default thread pool.
+        Threads suffice with the native core, which releases the GIL; the pure-Python core needs
+        a ProcessPoolExecutor. Its workers must be started before connections are opened (or use
+        the 'forkserver' start method), since forked workers would keep the sockets open.
+    :param prefetch: Bytes of keystream the writer keeps generated ahead (see SnowVStreamWriter).
+    :return: Tuple (SnowVStreamReader, SnowVStreamWriter).
+    """
+    schedule = snowV.bind_key(key, is_aead_mode)
+    return (
+        SnowVStreamReader(reader, schedule.new_stream(read_iv), offload_threshold, executor),
+        SnowVStreamWriter(writer, schedule.new_stream(write_iv), offload_threshold, executor, prefetch),
+    )
+
+
+async def open_connection(key, read_iv, write_iv, host=None, port=None, is_aead_mode=False,
+                          offload_threshold=DEFAULT_OFFLOAD_THRESHOLD, executor=None, prefetch=0, **kwargs):
+    """
+    asyncio.open_connection returning an encrypting reader/writer pair (see wrap_streams).
+    Remaining keyword arguments are passed to asyncio.open_connection.
+    """
+    reader, writer = await asyncio.open_connection(host, port, **kwargs)
+    return wrap_streams(reader, writer, key, read_iv, write_iv, is_aead_mode, offload_threshold, executor, prefetch)
@@ -0,0 +1,282 @@
+# snowv command-line tool: python -m snowV encrypt/decrypt/keystream/bench
+#
+#     export SNOWV_KEY=<64 hex digits> SNOWV_IV=<32 hex digits>
+#     python -m snowV encrypt data.bin -o data.bin.enc      # file to file through mmap
+#     python -m snowV decrypt --in-place data.bin.enc       # rewrite a file in place
+#     producer | python -m snowV encrypt - | consumer       # stdin to stdout
+#     python -m snowV encrypt --jobs 64 big.tar -o big.snvs # segmented container, in parallel
+
+import argparse
+import mmap
+import os
+import sys
+
+import snowV
+
+BUFFER_SIZE = 1 << 20  # Stream buffer, a multiple of the 16-byte block
+KEY_ENV = 'SNOWV_KEY'
+IV_ENV = 'SNOWV_IV'
+
+
+def _parse_secret(data, size, what, allow_raw=False):
+    """
+    Decode hexadecimal text, or with allow_raw also accept raw bytes of the right size.
+    Raw bytes are only allowed for files: in an option or environment variable, text of
+    the raw size (e.g. 32 hex digits for a key) would otherwise be taken as the key itself.
+    :param data: Bytes read from an option, a file or the environment.
+    :param size: Expected length in bytes.
+    :param what: 'key' or 'IV', for error messages.
+    :param allow_raw: Whether data of exactly size bytes is used as is.
+    :return: The decoded bytes.
+    """
+    if allow_raw and len(data) == size:
+        return bytes(data)
+    try:
+        value = bytes.fromhex(data.decode('ascii').strip().replace(' ', '').replace('\n', ''))
+    except (UnicodeDecodeError, ValueError):
+        if allow_raw:
+            raise SystemExit(f"snowv: {what} is neither {size} raw bytes nor hexadecimal")
+        raise SystemExit(f"snowv: {what} is not hexadecimal")
+    if len(value) != size:
+        raise SystemExit(f"snowv: {what} must be {size} bytes, got {len(value)}")
+    return value
+
+
+def load_secret(value, path, env, default_env, size, what):
+    """
+    Resolve a key or IV from, in order: the option value (hex), a file (raw bytes or hex),
+    a named environment variable (hex), the default environment variable (hex).
+    :return: Bytes of the given size.
+    """
+    if value is not None:
+        return _parse_secret(value.encode('ascii'), size, what)
+    if path is not None:
+        with open(path, 'rb') as secret_file:
+            return _parse_secret(secret_file.read(), size, what, allow_raw=True)
+    name = env or default_env
+    if name in os.environ:
+        return _parse_secret(os.environ[name].encode('ascii'), size, what)
+    raise SystemExit(f"snowv: no {what} given (use --{what.lower()}-file, --{what.lower()}-env or ${default_env})")
+
+
+def _stream_copy(stream, src, dst):
+    """
+    Pass src through stream into dst with one reusable buffer.
+    :param stream: SnowVStream at the position of the first byte.
+    :param src: Binary file object to read from.
+    :param dst: Binary file object to write to.
+    :return: Number of bytes processed.
+    """
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    total = 0
+    while True:
+        n = src.readinto(buffer)
+        if not n:
+            return total
+        stream.update_into(view[:n], view[:n])  # In place; short reads keep their keystream position
+        dst.write(view[:n])
+        total += n
+
+
+def crypt_file(cipher, src_path, dst_path):
+    """
+    Encrypt (or decrypt) a file into another through memory maps, or in place if the paths match.
+    '-' stands for stdin or stdout, which are streamed instead.
+    :param cipher: SnowVCipher after keyiv_setup.
+    :return: Number of bytes processed.
+    """
+    if src_path == '-' or dst_path == '-':
+        src = sys.stdin.buffer if src_path == '-' else open(src_path, 'rb')
+        dst = sys.stdout.buffer if dst_path == '-' else open(dst_path, 'wb')
+        try:
+            return _stream_copy(snowV.SnowVStream.from_cipher(cipher), src, dst)
+        finally:
+            if src is not sys.stdin.buffer:
+                src.close()
+            if dst is not sys.stdout.buffer:
+                dst.close()
+            else:
+                dst.flush()
+
+    if os.path.exists(dst_path) and os.path.samefile(src_path, dst_path):
+        with open(src_path, 'r+b') as data:
+            length = os.fstat(data.fileno()).st_size
+            if length:
+                with mmap.mmap(data.fileno(), 0) as mapped:
+                    cipher.encrypt_into(mapped, mapped)
+        return length
+
+    length = os.path.getsize(src_path)
+    with open(src_path, 'rb') as src, open(dst_path, 'w+b') as dst:
+        dst.truncate(length)
+        if length:
+            with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as src_map, \
+                    mmap.mmap(dst.fileno(), 0) as dst_map:
+                cipher.encrypt_into(src_map, dst_map)
+    return length
+
+
+def _positive_int(text):
+    """
+    argparse type for sizes and lengths that must be at least 1.
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return value
+
+
+def _non_negative_int(text):
+    """
+    argparse type for counts where 0 means "choose automatically".
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {text!r}")
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be a non-negative integer, got {value}")
+    return value
+
+
+def _secrets(args, need_iv=True):
+    """
+    :return: Tuple (key, IV) from the parsed options; the IV is None when not needed.
+    """
+    key = load_secret(args.key, args.key_file, args.key_env, KEY_ENV, 32, 'key')
+    iv = load_secret(args.iv, args.iv_file, args.iv_env, IV_ENV, 16, 'IV') if need_iv else None
+    return key, iv
+
+
+def cmd_crypt(args):
+    """
+    encrypt and decrypt: the same XOR for raw streams, container-aware with --jobs.
+    """
+    if args.in_place:
+        if args.output is not None or args.input == '-':
+            raise SystemExit("snowv: --in-place takes one input file and no --output")
+        args.output = args.input
+    output = args.output if args.output is not None else '-'
+    segmented = args.jobs is not None
+    key, iv = _secrets(args, need_iv=not (segmented and args.command == 'decrypt'))
+
+    if not segmented:
+        cipher = snowV.SnowVCipher()
+        cipher.keyiv_setup(key, iv, args.aead_mode)
+        crypt_file(cipher, args.input, output)
+        return 0
+
+    import snowV_Segments  # Only needed for the segmented container
+    if '-' in (args.input, output) or args.in_place or \
+            (os.path.exists(output) and os.path.samefile(args.input, output)):
+        raise SystemExit("snowv: --jobs needs an input file and a different output file")
+    try:
+        if args.command == 'encrypt':
+            snowV_Segments.encrypt_file(key, iv, args.input, output, args.segment_size, args.jobs or None,
+                                        args.aead_mode)
+        else:
+            snowV_Segments.decrypt_file(key, args.input, output, args.jobs or None)
+    except ValueError as error:  # An unsuitable base IV or a malformed container
+        raise SystemExit(f"snowv: {error}")
+    return 0
+
+
+def cmd_keystream(args):
+    """
+    keystream: write the first --length bytes of keystream.
+    """
+    key, iv = _secrets(args)
+    cipher = snowV.SnowVCipher()
+    cipher.keyiv_setup(key, iv, args.aead_mode)
+    out = sys.stdout.buffer if args.output in (None, '-') else open(args.output, 'wb')
+    try:
+        buffer = bytearray(BUFFER_SIZE)
+        remaining = args.length
+        while remaining:
+            n = min(remaining, BUFFER_SIZE)  # Whole blocks until the last write
+            view = memoryview(buffer)[:n]
+            cipher.keystream_into(view)
+            out.write(view)
+            remaining -= n
+    finally:
+        if out is sys.stdout.buffer:
+            out.flush()
+        else:
+            out.close()
+    return 0
+
+
+def cmd_bench(args):
+    """
+    bench: run the benchmark suite (snowV_SpeedTest.py) with the remaining arguments.
+    """
+    import snowV_SpeedTest
+    return snowV_SpeedTest.main(args.bench_args)
+
+
+def _add_secret_options(parser):
+    """
+    Add the key, IV and AEAD options shared by the subcommands.
+    """
+    parser.add_argument('--key', help='key as 64 hex digits (visible in the process list; prefer a file)')
+    parser.add_argument('--key-file', help='file holding the key, 32 raw bytes or hex')
+    parser.add_argument('--key-env', help=f'environment variable holding the key in hex (default: {KEY_ENV})')
+    parser.add_argument('--iv', help='IV as 32 hex digits')
+    parser.add_argument('--iv-file', help='file holding the IV, 16 raw bytes or hex')
+    parser.add_argument('--iv-env', help=f'environment variable holding the IV in hex (default: {IV_ENV})')
+    parser.add_argument('--aead-mode', action='store_true', help='initialize the cipher in AEAD mode')
+
+
+def build_parser():
+    """
+    :return: argparse parser with the encrypt, decrypt, keystream and bench subcommands.
+    """
+    parser = argparse.ArgumentParser(prog='snowv', description='SNOW-V stream cipher')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for name in ('encrypt', 'decrypt'):
+        command = commands.add_parser(name, help=f'{name} a file or stdin')
+        command.add_argument('input', help="input file, or '-' for stdin")
+        command.add_argument('-o', '--output', help="output file, or '-' for stdout (default)")
+        command.add_argument('--in-place', action='store_true', help='overwrite the input file')
+        command.add_argument('--jobs', type=_non_negative_int,
+                             help='use the segmented container format with this many workers (0: one per CPU); '
+                             'the last 4 bytes of the IV are its segment counter and must be zero')
+        command.add_argument('--segment-size', type=_positive_int, default=1 << 20,
+                             help='segment size for --jobs encryption (default: 1 MiB)')
+        _add_secret_options(command)
+        command.set_defaults(handler=cmd_crypt)
+
+    command = commands.add_parser('keystream', help='write raw keystream')
+    command.add_argument('-n', '--length', type=_positive_int, required=True, help='number of bytes')
+    command.add_argument('-o', '--output', help="output file, or '-' for stdout (default)")
+    _add_secret_options(command)
+    command.set_defaults(handler=cmd_keystream)
+
+    command = commands.add_parser('bench', help='run the benchmark suite (options as for snowV_SpeedTest.py)',
+                                  add_help=False)
+    command.set_defaults(handler=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point of the snowv console script and of python -m snowV.
+    :param argv: Arguments without the program name; None for sys.argv.
+    :return: Exit status.
+    """
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == 'bench':
+        args.bench_args = extra  # Passed through to the benchmark suite
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
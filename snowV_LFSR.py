@@ -0,0 +1,215 @@
+# Bulk LFSR generation and GF(2) jump-ahead for SNOW-V
+#
+# After initialization the LFSR pair (A, B) evolves on its own: the FSM only reads A[0..7]
+# (T2) and the keystream only reads B[8..15] (T1). Every lfsr_update is a GF(2)-linear map
+# of the 512-bit state A | B << 256, so k updates are one multiplication by T^k, where T is
+# the 512x512 transition matrix. This jumps the LFSR only: the FSM is not linear and has no
+# jump, so keystream at a distant offset still needs the FSM state there (see
+# SnowVStream.track_checkpoints).
+
+import threading
+
+from snowV import _MASK128, _add32x4, _aes_round128, _lfsr_step8, _sigma128
+
+STATE_BITS = 512  # 16 16-bit cells in each of A and B
+_MASK256 = (1 << 256) - 1
+_CHUNK_BITS = 4  # Four-Russians chunk width: 128 tables of 16 entries per matrix
+
+
+def _join(a, b):
+    """
+    :return: The 512-bit LFSR state A | B << 256.
+    """
+    return a | b << 256
+
+
+def _split(x):
+    """
+    :return: Tuple (A, B) of a 512-bit LFSR state.
+    """
+    return x & _MASK256, x >> 256
+
+
+class GF2Matrix:
+    """
+    Square matrix over GF(2) acting on STATE_BITS-bit integers, stored by columns.
+    apply() uses four-Russians tables (every XOR of up to _CHUNK_BITS adjacent columns),
+    built on first use.
+    """
+
+    __slots__ = ('columns', '_tables')
+
+    def __init__(self, columns):
+        """
+        :param columns: List of STATE_BITS integers, column i being the image of bit i.
+        """
+        self.columns = columns
+        self._tables = None
+
+    @classmethod
+    def from_linear_map(cls, function):
+        """
+        :param function: GF(2)-linear function on STATE_BITS-bit integers.
+        :return: Its matrix.
+        """
+        return cls([function(1 << i) for i in range(STATE_BITS)])
+
+    def _build_tables(self):
+        tables = []
+        size = 1 << _CHUNK_BITS
+        for start in range(0, STATE_BITS, _CHUNK_BITS):
+            table = [0] * size
+            for v in range(1, size):
+                low = v & -v  # Lowest set bit; the rest of v is already in the table
+                table[v] = table[v ^ low] ^ self.columns[start + low.bit_length() - 1]
+            tables.append(table)
+        self._tables = tables
+        return tables
+
+    def apply(self, x):
+        """
+        :param x: STATE_BITS-bit integer.
+        :return: The matrix times x.
+        """
+        tables = self._tables or self._build_tables()
+        mask = (1 << _CHUNK_BITS) - 1
+        result = 0
+        for table in tables:
+            result ^= table[x & mask]
+            x >>= _CHUNK_BITS
+        return result
+
+    def __matmul__(self, other):
+        """
+        :return: The product self @ other (apply other first).
+        """
+        return GF2Matrix([self.apply(column) for column in other.columns])
+
+
+_lock = threading.Lock()
+_powers = []  # _powers[j] = T^(2^j), extended on demand
+
+
+def _power_of_two(j):
+    """
+    :return: T^(2^j), computing and caching the missing squarings.
+    """
+    with _lock:
+        if not _powers:
+            _powers.append(GF2Matrix.from_linear_map(lambda x: _join(*_lfsr_step8(*_split(x)))))
+        while len(_powers) <= j:
+            _powers.append(_powers[-1] @ _powers[-1])
+        return _powers[j]
+
+
+def transition_matrix():
+    """
+    :return: The GF2Matrix of one lfsr_update (eight LFSR steps).
+    """
+    return _power_of_two(0)
+
+
+def jump_matrix(blocks):
+    """
+    :param blocks: Number of lfsr_update calls (keystream blocks), at least 1.
+    :return: GF2Matrix T^blocks.
+    """
+    if blocks < 1:
+        raise ValueError("jump distance must be at least one block")
+    matrix = None
+    for j in range(blocks.bit_length()):
+        if blocks >> j & 1:
+            power = _power_of_two(j)
+            matrix = power if matrix is None else power @ matrix
+    return matrix
+
+
+def lfsr_jump(a, b, blocks):
+    """
+    Advance packed LFSRs as if lfsr_update had been called blocks times.
+    Costs one matrix application per set bit of blocks, plus building the powers once.
+    :param a: LFSR A as packed by SnowVCipher (256-bit integer).
+    :param b: LFSR B as packed by SnowVCipher (256-bit integer).
+    :param blocks: Number of lfsr_update calls to skip, 0 or more.
+    :return: Tuple of the new A and B.
+    """
+    if blocks < 0:
+        raise ValueError("cannot jump backwards")
+    x = _join(a, b)
+    for j in range(blocks.bit_length()):
+        if blocks >> j & 1:
+            x = _power_of_two(j).apply(x)
+    return _split(x)
+
+
+def lfsr_sequence(a, b, count):
+    """
+    Generate the FSM inputs of count blocks in one pass over the LFSR alone.
+    :param a: LFSR A as packed by SnowVCipher.
+    :param b: LFSR B as packed by SnowVCipher.
+    :param count: Number of blocks.
+    :return: Tuple (t1, t2, a, b): lists of the packed T1 = B[8..15] and T2 = A[0..7]
+             of every block, and the LFSRs after the last block.
+    """
+    t1 = [0] * count
+    t2 = [0] * count
+    step = _lfsr_step8
+    for i in range(count):
+        t1[i] = b >> 128
+        t2[i] = a & _MASK128
+        a, b = step(a, b)
+    return t1, t2, a, b
+
+
+def keystream_from_sequence(t1, t2, r1, r2, r3):
+    """
+    Run the FSM over precomputed LFSR words (see lfsr_sequence).
+    :param t1: Packed T1 words, one per block.
+    :param t2: Packed T2 words, one per block.
+    :param r1: FSM register R1 before the first block.
+    :param r2: FSM register R2 before the first block.
+    :param r3: FSM register R3 before the first block.
+    :return: Tuple (blocks, r1, r2, r3): the keystream blocks as 128-bit integers and the FSM after them.
+    """
+    blocks = [0] * len(t1)
+    for i in range(len(t1)):
+        blocks[i] = _add32x4(t1[i], r1) ^ r2
+        r1, r2, r3 = _sigma128(_add32x4(t2[i] ^ r3, r2)), _aes_round128(r1), _aes_round128(r2)
+    return blocks, r1, r2, r3
+
+
+def lfsr_sequence_lanes(a, b, count, lanes=256):
+    """
+    Generate the FSM inputs of count blocks with NumPy: the sequence is cut into lanes
+    stretches whose start states are reached by jumping, and all stretches are stepped
+    together as rows of one array.
+    :param a: LFSR A as packed by SnowVCipher.
+    :param b: LFSR B as packed by SnowVCipher.
+    :param count: Number of blocks.
+    :param lanes: Number of stretches advanced in parallel.
+    :return: Tuple (t1, t2, a, b): uint16 arrays of shape (count, 8) with the cells of
+             T1 = B[8..15] and T2 = A[0..7] per block, and the LFSRs after the last block.
+    """
+    import numpy as np  # Only needed for this function
+    from snowV_Lanes import SnowVLanes
+
+    stride = max(1, -(-count // lanes))  # Blocks per stretch
+    lanes = -(-count // stride) if count else 0
+    engine = SnowVLanes(lanes)
+    x = _join(a, b)
+    step = jump_matrix(stride) if lanes > 1 else None
+    for lane in range(lanes):
+        cells = np.frombuffer(x.to_bytes(64, 'little'), dtype='<u2')
+        engine.A[lane] = cells[:16]
+        engine.B[lane] = cells[16:]
+        if lane + 1 < lanes:
+            x = step.apply(x)
+
+    t1 = np.empty((lanes, stride, 8), dtype=np.uint16)
+    t2 = np.empty((lanes, stride, 8), dtype=np.uint16)
+    for i in range(stride):
+        t1[:, i] = engine.B[:, 8:]
+        t2[:, i] = engine.A[:, :8]
+        engine.lfsr_update()
+    a, b = lfsr_jump(a, b, count)
+    return t1.reshape(-1, 8)[:count], t2.reshape(-1, 8)[:count], a, b
@@ -0,0 +1,459 @@
+# Multi-lane SNOW-V: runs many independent (key, IV) streams at once with NumPy
+
+import numpy as np  # NumPy arrays hold one row of cipher state per lane
+import snowV  # Scalar implementation, for its S-Box derived T-tables and constants
+
+# AES T-tables as uint32 arrays so a whole column of state bytes is gathered at once
+_TE = [np.array(table, dtype=np.uint32) for table in (snowV._TE0, snowV._TE1, snowV._TE2, snowV._TE3)]
+
+# State byte feeding T-table k for output words 0..3 (ShiftRows folded into the gather)
+_AES_GATHER = [
+    np.array([0, 4, 8, 12]),
+    np.array([5, 9, 13, 1]),
+    np.array([10, 14, 2, 6]),
+    np.array([15, 3, 7, 11]),
+]
+
+# Sigma permutation as a fancy index over the 16 bytes of a 128-bit register
+_SIGMA = np.array(snowV.SnowVCipher.Sigma)
+
+# AEAD-mode initial values of cells B[0..7]
+_AEAD_B_LOW = np.array([0x6C41, 0x7865, 0x6B45, 0x2064, 0x694A, 0x676E, 0x6854, 0x6D6F], dtype=np.uint16)
+
+
+def _words(cells):
+    """
+    Combine pairs of 16-bit LFSR cells into 32-bit words (cell 2*i in the low half of word i).
+    :param cells: Array of shape (N, 2*k) with dtype uint16.
+    :return: Array of shape (N, k) with dtype uint32.
+    """
+    return cells[:, 0::2].astype(np.uint32) | (cells[:, 1::2].astype(np.uint32) << 16)
+
+
+def _register_bytes(words):
+    """
+    View 128-bit registers as their 16 little-endian bytes.
+    :param words: Array of shape (N, 4) with dtype uint32.
+    :return: Array of shape (N, 16) with dtype uint8.
+    """
+    return np.ascontiguousarray(words, dtype='<u4').view(np.uint8)
+
+
+def _register_words(data):
+    """
+    Interpret 16 little-endian bytes per lane as a 128-bit register.
+    :param data: Array of shape (N, 16) with dtype uint8.
+    :return: Array of shape (N, 4) with dtype uint32.
+    """
+    return np.ascontiguousarray(data, dtype=np.uint8).view('<u4').astype(np.uint32)
+
+
+def _mul_x(v, c):
+    """
+    Multiply every 16-bit lane by x in GF(2^16) with reduction constant c.
+    :param v: Array with dtype uint16.
+    :param c: 16-bit reduction constant.
+    :return: Array with dtype uint16.
+    """
+    return (v << 1) ^ ((v >> 15) * np.uint16(c))
+
+
+def _mul_x_inv(v, d):
+    """
+    Multiply every 16-bit lane by the inverse of x in GF(2^16) with reduction constant d.
+    :param v: Array with dtype uint16.
+    :param d: 16-bit reduction constant.
+    :return: Array with dtype uint16.
+    """
+    return (v >> 1) ^ ((v & 1) * np.uint16(d))
+
+
+def _aes_round(words):
+    """
+    Perform an AES encryption round with an all-zero round key on every lane.
+    :param words: Array of shape (N, 4) with dtype uint32.
+    :return: Array of shape (N, 4) with dtype uint32.
+    """
+    s = _register_bytes(words)  # S-Box input bytes of every lane
+    return (
+        _TE[0][s[:, _AES_GATHER[0]]] ^ _TE[1][s[:, _AES_GATHER[1]]]
+        ^ _TE[2][s[:, _AES_GATHER[2]]] ^ _TE[3][s[:, _AES_GATHER[3]]]
+    )
+
+
+class SnowVLanes:
+    """
+    N independent SNOW-V ciphers whose state is stored as one array row per lane.
+    Every method advances all lanes together and matches SnowVCipher lane by lane.
+    """
+
+    def __init__(self, lanes):
+        """
+        Allocate zeroed state for the given number of lanes.
+        :param lanes: Number of independent cipher streams.
+        """
+        self.A = np.zeros((lanes, 16), dtype=np.uint16)  # LFSR A: 16 16-bit cells per lane
+        self.B = np.zeros((lanes, 16), dtype=np.uint16)  # LFSR B: 16 16-bit cells per lane
+        self.R1 = np.zeros((lanes, 4), dtype=np.uint32)  # FSM R1: 4 32-bit words per lane
+        self.R2 = np.zeros((lanes, 4), dtype=np.uint32)  # FSM R2: 4 32-bit words per lane
+        self.R3 = np.zeros((lanes, 4), dtype=np.uint32)  # FSM R3: 4 32-bit words per lane
+
+    @property
+    def lanes(self):
+        """
+        Number of lanes.
+        """
+        return self.A.shape[0]
+
+    def fsm_update(self):
+        """
+        Update the FSM registers R1, R2 and R3 of every lane.
+        """
+        R1temp = self.R1  # Keep the current R1 for the R2 update
+        T2 = _words(self.A[:, :8])  # Low half of LFSR A as four 32-bit words
+        # R1 = Sigma((T2 ^ R3) + R2), with Sigma applied as a byte gather
+        self.R1 = _register_words(_register_bytes((T2 ^ self.R3) + self.R2)[:, _SIGMA])
+        self.R3 = _aes_round(self.R2)  # AES round on R2 with zero round key
+        self.R2 = _aes_round(R1temp)  # AES round on the previous R1 with zero round key
+
+    def lfsr_update(self):
+        """
+        Update LFSR A and B of every lane by eight steps at once.
+        The eight feedback cells only depend on cells present before the first step.
+        """
+        A = self.A
+        B = self.B
+        u = _mul_x(A[:, :8], 0x990F) ^ A[:, 1:9] ^ _mul_x_inv(A[:, 8:], 0xCC87) ^ B[:, :8]
+        v = _mul_x(B[:, :8], 0xC963) ^ B[:, 3:11] ^ _mul_x_inv(B[:, 8:], 0xE4B1) ^ A[:, :8]
+        A[:, :8] = A[:, 8:]  # Shift both registers down by eight cells
+        B[:, :8] = B[:, 8:]
+        A[:, 8:] = u  # Append the feedback cells
+        B[:, 8:] = v
+
+    def keystream(self):
+        """
+        Generate one 16-byte keystream block for every lane and advance the state.
+        :return: Array of shape (N, 16) with dtype uint8.
+        """
+        # z = (T1 + R1) ^ R2, where T1 is the high half of LFSR B
+        z = _register_bytes((_words(self.B[:, 8:]) + self.R1) ^ self.R2)
+        self.fsm_update()
+        self.lfsr_update()
+        return z
+
+    def keyiv_setup(self, keys, ivs, is_aead_mode=False):
+        """
+        Initialize every lane with its own key and IV.
+        :param keys: Array of shape (N, 32), or a single 32-byte key shared by all lanes.
+        :param ivs: Array of shape (N, 16), or a single 16-byte IV shared by all lanes.
+        :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+        """
+        n = self.lanes
+        keys = np.ascontiguousarray(np.broadcast_to(np.asarray(keys, dtype=np.uint8), (n, 32)))
+        ivs = np.ascontiguousarray(np.broadcast_to(np.asarray(ivs, dtype=np.uint8), (n, 16)))
+
+        # Same layout as SnowVCipher: IV and first key half in A, zeros and second key half in B
+        self.A[:, :8] = ivs.view('<u2')
+        self.A[:, 8:] = keys[:, :16].view('<u2')
+        self.B[:, :8] = _AEAD_B_LOW if is_aead_mode else 0
+        self.B[:, 8:] = keys[:, 16:].view('<u2')
+
+        # Reset FSM states to zero
+        self.R1 = np.zeros((n, 4), dtype=np.uint32)
+        self.R2 = np.zeros((n, 4), dtype=np.uint32)
+        self.R3 = np.zeros((n, 4), dtype=np.uint32)
+
+        for i in range(16):
+            z = self.keystream()
+            self.A[:, 8:] ^= z.view('<u2')  # Feed z back into the high half of LFSR A
+            if i == 14:
+                self.R1 ^= _register_words(keys[:, :16])  # Mask R1 with the first key half
+            if i == 15:
+                self.R1 ^= _register_words(keys[:, 16:])  # Mask R1 with the second key half
+
+    def generate_keystream(self, nbytes):
+        """
+        Generate the next nbytes of keystream for every lane.
+        :param nbytes: Number of keystream bytes per lane.
+        :return: Array of shape (N, nbytes) with dtype uint8.
+        """
+        blocks = -(-nbytes // 16)  # Round up to whole blocks
+        out = np.empty((self.lanes, blocks * 16), dtype=np.uint8)
+        for k in range(blocks):
+            out[:, 16*k:16*k + 16] = self.keystream()
+        return out[:, :nbytes]
+
+    def encrypt(self, data):
+        """
+        Encrypt one equal-length message per lane.
+        :param data: Array-like of shape (N, L) with dtype uint8.
+        :return: Array of shape (N, L) with dtype uint8.
+        """
+        data = np.asarray(data, dtype=np.uint8)
+        return data ^ self.generate_keystream(data.shape[1])
+
+
+def keystream_lanes(keys, ivs, nbytes, is_aead_mode=False):
+    """
+    Generate nbytes of keystream for each of N (key, IV) pairs.
+    :param keys: Array of shape (N, 32), or a single 32-byte key shared by all lanes.
+    :param ivs: Array of shape (N, 16), or a single 16-byte IV shared by all lanes.
+    :param nbytes: Number of keystream bytes per lane.
+    :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+    :return: Array of shape (N, nbytes) with dtype uint8.
+    """
+    keys = np.asarray(keys, dtype=np.uint8)
+    ivs = np.asarray(ivs, dtype=np.uint8)
+    lanes = max(keys.shape[0] if keys.ndim == 2 else 1, ivs.shape[0] if ivs.ndim == 2 else 1)
+    engine = SnowVLanes(lanes)
+    engine.keyiv_setup(keys, ivs, is_aead_mode)
+    return engine.generate_keystream(nbytes)
+
+
+class SessionTable:
+    """
+    Cipher contexts for many concurrent sessions, stored as one array per register and
+    indexed by session id, instead of one SnowVCipher object per session.
+    The register arrays are views into a single (capacity, 112) byte array laid out like
+    the native state serialization, so a batch is gathered and scattered with one index.
+    Ids of removed sessions are reused through a free list, and the arrays double in size
+    when they run out, so adding and removing a session is O(1) amortized.
+    Batch calls advance or encrypt any subset of sessions at once: with the native core in
+    one C call over the packed states, otherwise with the NumPy lane engine. Like
+    SnowVCipher.encrypt_into, every call uses whole keystream blocks per session and
+    discards the unused tail of the last one.
+    """
+
+    def __init__(self, capacity=1024, native=None):
+        """
+        :param capacity: Number of sessions to allocate room for up front.
+        :param native: Whether batch calls use the native core; None uses it when it is built.
+        """
+        capacity = max(1, capacity)
+        self.states = np.zeros((capacity, snowV._STATE_BYTES), dtype=np.uint8)  # One state per row
+        self._bind_registers()
+        self.aead = np.zeros(capacity, dtype=bool)  # AEAD flag of each session
+        self.active = np.zeros(capacity, dtype=bool)  # Whether the id is in use
+        self._free = list(range(capacity - 1, -1, -1))  # Free ids, the lowest on top
+        self.native = snowV._snowv is not None if native is None else bool(native)
+        if self.native and snowV._snowv is None:
+            raise ValueError("the native core is not built")
+
+    def _bind_registers(self):
+        """
+        Point the register arrays at their columns of the state rows.
+        """
+        self.A = self.states[:, 0:32].view('<u2')  # LFSR A: 16 16-bit cells per session
+        self.B = self.states[:, 32:64].view('<u2')  # LFSR B: 16 16-bit cells per session
+        self.R1 = self.states[:, 64:80].view('<u4')  # FSM R1: 4 32-bit words per session
+        self.R2 = self.states[:, 80:96].view('<u4')  # FSM R2: 4 32-bit words per session
+        self.R3 = self.states[:, 96:112].view('<u4')  # FSM R3: 4 32-bit words per session
+
+    @property
+    def capacity(self):
+        """
+        Number of sessions the arrays currently hold room for.
+        """
+        return self.states.shape[0]
+
+    def __len__(self):
+        return self.capacity - len(self._free)
+
+    def _grow(self):
+        """
+        Double the capacity, keeping the existing rows.
+        """
+        old = self.capacity
+        for name in ('states', 'aead', 'active'):
+            array = getattr(self, name)
+            grown = np.zeros((2 * old,) + array.shape[1:], dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        self._bind_registers()
+        self._free.extend(range(2 * old - 1, old - 1, -1))
+
+    def _allocate(self):
+        """
+        :return: A free session id, marked active.
+        """
+        if not self._free:
+            self._grow()
+        sid = self._free.pop()
+        self.active[sid] = True
+        return sid
+
+    def _load_state(self, sid, state, is_aead_mode):
+        """
+        Store a serialized cipher state (SnowVCipher._state_bytes layout) in row sid.
+        """
+        self.states[sid] = np.frombuffer(state, dtype=np.uint8, count=snowV._STATE_BYTES)
+        self.aead[sid] = is_aead_mode
+
+    def add(self, key, iv, is_aead_mode=False):
+        """
+        Add a session initialized for key and IV.
+        :param key: Byte sequence representing the encryption key.
+        :param iv: Byte sequence representing the initialization vector.
+        :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+        :return: Session id.
+        """
+        cipher = snowV.SnowVCipher()
+        cipher.keyiv_setup(key, iv, is_aead_mode)
+        return self.add_cipher(cipher)
+
+    def add_cipher(self, cipher):
+        """
+        Add a session that continues from the current state of a cipher.
+        :param cipher: SnowVCipher after keyiv_setup; it is not modified.
+        :return: Session id.
+        """
+        sid = self._allocate()
+        self._load_state(sid, cipher._state_bytes(), cipher.is_aead_mode)
+        return sid
+
+    def add_state(self, blob, offset=0):
+        """
+        Add a session from a SnowVCipher.export_state blob, e.g. handed over by another process.
+        :return: Session id.
+        """
+        return self.add_cipher(snowV.SnowVCipher.from_state(blob, offset))
+
+    def remove(self, sid):
+        """
+        Remove a session; its state is wiped and its id becomes free for reuse.
+        :param sid: Session id.
+        """
+        if not 0 <= sid < self.capacity or not self.active[sid]:
+            raise KeyError(f"no session {sid}")
+        self.states[sid] = 0
+        self.aead[sid] = False
+        self.active[sid] = False
+        self._free.append(sid)
+
+    def cipher(self, sid):
+        """
+        :return: New SnowVCipher with a copy of the state of session sid.
+        """
+        cipher = snowV.SnowVCipher()
+        self._ids([sid])
+        cipher._load_state_bytes(self.states[sid].tobytes())
+        cipher.is_aead_mode = bool(self.aead[sid])
+        return cipher
+
+    def export_state(self, sid):
+        """
+        :return: SnowVCipher.export_state blob of session sid.
+        """
+        return self.cipher(sid).export_state()
+
+    def _ids(self, ids):
+        """
+        Check a batch of session ids.
+        :return: The ids as an int64 array.
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if ids.size and (ids.min() < 0 or ids.max() >= self.capacity or not self.active[ids].all()):
+            raise KeyError("batch contains an unknown session id")
+        if np.unique(ids).size != ids.size:
+            raise ValueError("batch contains a session id twice")
+        return ids
+
+    def _run_lanes(self, ids, blocks, keystream=True):
+        """
+        Generate blocks[i] keystream blocks for session ids[i] with the NumPy lane engine.
+        Sessions are sorted by block count, so the ones still running are always a prefix.
+        :return: Tuple (order, keystream): the permutation applied to ids, and an array of
+                 shape (len(ids), 16 * max(blocks)) in that order (None if not requested).
+        """
+        order = np.argsort(-blocks, kind='stable')
+        ids = ids[order]
+        blocks = blocks[order]
+        lanes = SnowVLanes(0)
+        A, B, R1, R2, R3 = self.A[ids], self.B[ids], self.R1[ids], self.R2[ids], self.R3[ids]
+        steps = int(blocks[0]) if ids.size else 0
+        out = np.empty((ids.size, 16 * steps), dtype=np.uint8) if keystream else None
+        running = ids.size
+        for step in range(steps):
+            while blocks[running - 1] <= step:
+                running -= 1
+            lanes.A, lanes.B = A[:running], B[:running]  # Views: the LFSR update writes through
+            lanes.R1, lanes.R2, lanes.R3 = R1[:running], R2[:running], R3[:running]
+            z = lanes.keystream()
+            R1[:running], R2[:running], R3[:running] = lanes.R1, lanes.R2, lanes.R3
+            if out is not None:
+                out[:running, 16 * step:16 * step + 16] = z
+        self.A[ids], self.B[ids], self.R1[ids], self.R2[ids], self.R3[ids] = A, B, R1, R2, R3
+        return order, out
+
+    def encrypt_into(self, ids, srcs, dsts):
+        """
+        Encrypt (or decrypt) srcs[i] into dsts[i] with session ids[i], for a batch of
+        distinct sessions in one call.
+        :param ids: Sequence or array of session ids.
+        :param srcs: Sequence of source buffers, one per id.
+        :param dsts: Sequence of writable buffers, each at least as long as its source.
+        """
+        ids = self._ids(ids)
+        if not ids.size == len(srcs) == len(dsts):
+            raise ValueError("ids, srcs and dsts must have the same length")
+        if self.native:
+            states = self.states[ids]
+            snowV._snowv.encrypt_into_packed(states, srcs, dsts)
+            self.states[ids] = states
+            return
+        lengths = np.fromiter((memoryview(src).nbytes for src in srcs), dtype=np.int64, count=ids.size)
+        views = [memoryview(dst).cast('B') for dst in dsts]
+        for view, length in zip(views, lengths):
+            if len(view) < length:
+                raise ValueError(f"destination buffer too small: {len(view)} < {length} bytes")
+        order, keystream = self._run_lanes(ids, -(-lengths // 16))
+        for row, i in enumerate(order):
+            length = int(lengths[i])
+            views[i][:length] = (np.frombuffer(srcs[i], dtype=np.uint8, count=length) ^ keystream[row, :length]).data
+
+    def encrypt(self, ids, payloads):
+        """
+        Encrypt (or decrypt) payloads[i] with session ids[i], for a batch of distinct sessions.
+        :return: List of output bytes, in the order of payloads.
+        """
+        outs = [bytearray(len(payload)) for payload in payloads]
+        self.encrypt_into(ids, payloads, outs)
+        return [bytes(out) for out in outs]
+
+    def keystream(self, ids, nbytes):
+        """
+        Generate the next nbytes of keystream for each session in ids.
+        :return: Array of shape (len(ids), nbytes) with dtype uint8, one row per id.
+        """
+        ids = self._ids(ids)
+        out = np.empty((ids.size, nbytes), dtype=np.uint8)
+        if self.native:
+            states = self.states[ids]
+            snowV._snowv.keystream_into_packed(states, list(out))
+            self.states[ids] = states
+            return out
+        order, keystream = self._run_lanes(ids, np.full(ids.size, -(-nbytes // 16), dtype=np.int64))
+        out[order] = keystream[:, :nbytes]
+        return out
+
+    def advance(self, ids, blocks):
+        """
+        Skip keystream blocks for a batch of sessions.
+        :param ids: Sequence or array of session ids.
+        :param blocks: Number of blocks, one for all sessions or one per id.
+        """
+        ids = self._ids(ids)
+        blocks = np.broadcast_to(np.asarray(blocks, dtype=np.int64), ids.shape)
+        if blocks.size and blocks.min() < 0:
+            raise ValueError("cannot advance by a negative number of blocks")
+        if self.native:
+            states = self.states[ids]
+            remaining = blocks * 16
+            scratch = memoryview(bytearray(min(int(remaining.max(initial=0)), snowV._SKIP_CHUNK)))
+            while remaining.any():  # Every session shares the scratch buffer; the keystream is discarded
+                step = np.minimum(remaining, len(scratch))
+                snowV._snowv.keystream_into_packed(states, [scratch[:n] for n in step.tolist()])
+                remaining = remaining - step
+            self.states[ids] = states
+            return
+        self._run_lanes(ids, blocks, keystream=False)
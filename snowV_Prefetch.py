@@ -0,0 +1,238 @@
+# Keystream prefetching: a worker thread keeps a ring buffer of keystream ahead of the consumer,
+# so that encrypting a packet is only an XOR against bytes that are already there
+
+import collections
+import threading
+import time
+
+DEFAULT_CAPACITY = 1 << 20  # 1 MiB ring buffer
+DEFAULT_CHUNK_SIZE = 16 * 1024  # Keystream generated per worker step
+
+
+class SnowVPrefetcher:
+    """
+    Keystream source backed by a ring buffer that a worker thread refills.
+    The worker starts refilling when the buffered keystream drops to the low watermark and
+    stops at the high watermark. A consumer asking for more than is buffered waits for the
+    worker; such underruns are counted so that the buffer can be sized from stats().
+    This pays off most with the pure-Python core, whose per-packet FSM and LFSR work moves to
+    the worker; the native core already encrypts small packets in a few microseconds inline.
+    """
+
+    def __init__(self, cipher, capacity=DEFAULT_CAPACITY, low_watermark=None, high_watermark=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, start=True):
+        """
+        :param cipher: SnowVCipher after keyiv_setup; the prefetcher takes it over.
+        :param capacity: Ring buffer size in bytes, a multiple of 16.
+        :param low_watermark: Buffered bytes at or below which refilling starts (default capacity / 4).
+        :param high_watermark: Buffered bytes at which refilling stops (default capacity).
+        :param chunk_size: Keystream bytes generated per worker step, a multiple of 16.
+        :param start: Whether to start the worker thread right away.
+        """
+        if capacity <= 0 or capacity % 16 or chunk_size <= 0 or chunk_size % 16:
+            raise ValueError("capacity and chunk size must be positive multiples of 16")
+        high_watermark = capacity if high_watermark is None else high_watermark
+        low_watermark = capacity // 4 if low_watermark is None else low_watermark
+        if not 0 <= low_watermark < high_watermark <= capacity or high_watermark < 16:
+            raise ValueError("watermarks must satisfy 0 <= low < high <= capacity, with high >= 16")
+        self.cipher = cipher
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.chunk_size = chunk_size
+        self._ring = bytearray(capacity)
+        self._produced = 0  # Keystream bytes written to the ring so far (write index)
+        self._consumed = 0  # Keystream bytes handed out so far (read index)
+        self._marks = collections.deque()  # (offset, cipher registers) at the start of each unconsumed chunk
+        self._waiting = 0  # Consumers blocked on an empty buffer
+        self._refilling = False
+        self._closed = False
+        self._error = None  # Exception that stopped the worker
+        self._cond = threading.Condition(threading.Lock())
+        self._thread = None
+        # Underrun statistics
+        self.underruns = 0  # Requests that found too little keystream buffered
+        self.underrun_bytes = 0  # Bytes those requests had to wait for
+        self.underrun_wait = 0.0  # Seconds spent waiting in total
+        self.min_fill = capacity  # Lowest number of buffered bytes seen by a request
+        if start:
+            self.start()
+
+    def start(self):
+        """
+        Start the worker thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snowv-prefetch', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """
+        Worker loop: refill the ring from the low up to the high watermark, in chunk_size steps.
+        """
+        ring = memoryview(self._ring)
+        try:
+            while True:
+                with self._cond:
+                    while True:
+                        if self._closed:
+                            return
+                        fill = self._produced - self._consumed
+                        if not self._refilling and (fill <= self.low_watermark or self._waiting):
+                            self._refilling = True
+                        if self._refilling:
+                            # Whole blocks only, so that the keystream continues without gaps
+                            amount = min(self.chunk_size, self.high_watermark - fill) // 16 * 16
+                            if amount > 0:
+                                break
+                            self._refilling = False
+                        self._cond.wait()
+                    start = self._produced % self.capacity
+                amount = min(amount, self.capacity - start)  # Stop at the end of the ring, wrap next step
+                mark = (self._produced, self.cipher._state_bytes())  # Only the worker advances _produced
+                # Bytes [produced, produced + amount) are free: the consumer only reads below produced
+                self.cipher.keystream_into(ring[start:start + amount])
+                with self._cond:
+                    marks = self._marks
+                    marks.append(mark)
+                    while len(marks) > 1 and marks[1][0] <= self._consumed:
+                        marks.popleft()  # Chunks used up entirely are never rewound to
+                    self._produced += amount
+                    self._cond.notify_all()
+        except BaseException as error:
+            with self._cond:
+                self._error = error
+                self._cond.notify_all()
+
+    def _take(self, length):
+        """
+        Hand out the next length keystream bytes, waiting for the worker if too few are buffered.
+        :return: bytearray of length bytes.
+        """
+        with self._cond:
+            if self._closed:
+                raise ValueError("prefetcher is closed")
+            fill = self._produced - self._consumed
+            self.min_fill = min(self.min_fill, fill)
+            start = self._consumed % self.capacity
+            if fill >= length and start + length <= self.capacity:
+                # Common case: one contiguous piece of the ring
+                self._consumed += length
+                out = self._ring[start:start + length]
+            else:
+                if fill < length:
+                    self.underruns += 1
+                    self.underrun_bytes += length - fill
+                out = bytearray()
+                while len(out) < length:
+                    fill = self._produced - self._consumed
+                    if fill == 0:
+                        if self._error is not None:
+                            raise RuntimeError("keystream prefetch worker failed") from self._error
+                        if self._closed:
+                            raise ValueError("prefetcher was closed while waiting for keystream")
+                        if self._thread is None:
+                            raise RuntimeError("prefetcher was not started")
+                        started = time.perf_counter()
+                        self._waiting += 1
+                        self._cond.notify_all()
+                        self._cond.wait()
+                        self._waiting -= 1
+                        self.underrun_wait += time.perf_counter() - started
+                        continue
+                    start = self._consumed % self.capacity
+                    n = min(length - len(out), fill, self.capacity - start)
+                    out += self._ring[start:start + n]
+                    self._consumed += n
+            if self._produced - self._consumed <= self.low_watermark:
+                self._cond.notify_all()  # Wake the worker to refill
+        return out
+
+    def keystream(self, length):
+        """
+        :return: The next length bytes of keystream.
+        """
+        return bytes(self._take(length))
+
+    def encrypt_into(self, src, dst):
+        """
+        Encrypt (or decrypt) src into the writable buffer dst with the next len(src) keystream bytes.
+        :return: Number of bytes written to dst.
+        """
+        dst = memoryview(dst).cast('B')
+        length = memoryview(src).nbytes
+        if len(dst) < length:
+            raise ValueError(f"destination buffer too small: {len(dst)} < {length} bytes")
+        dst[:length] = self.encrypt(src)
+        return length
+
+    def encrypt(self, data):
+        """
+        Encrypt (or decrypt) data with the next len(data) keystream bytes.
+        :return: Bytes of the same length as data.
+        """
+        length = memoryview(data).nbytes
+        keystream = self._take(length)
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(keystream, 'little')).to_bytes(length, 'little')
+
+    @property
+    def position(self):
+        """
+        Keystream bytes handed out so far.
+        """
+        return self._consumed
+
+    def stats(self):
+        """
+        :return: Dict with the buffer configuration, fill level and underrun statistics.
+        """
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'low_watermark': self.low_watermark,
+                'high_watermark': self.high_watermark,
+                'buffered': self._produced - self._consumed,
+                'produced': self._produced,
+                'consumed': self._consumed,
+                'underruns': self.underruns,
+                'underrun_bytes': self.underrun_bytes,
+                'underrun_wait': self.underrun_wait,
+                'min_fill': self.min_fill,
+            }
+
+    def close(self):
+        """
+        Stop the worker thread; buffered keystream is discarded.
+        The cipher is rewound to the block holding position, of which position % 16 bytes
+        have been handed out, so that it can be used on its own again.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._error is None:
+            self._rewind()
+
+    def _rewind(self):
+        """
+        Move the cipher back from the produced position to the block holding the consumed one.
+        """
+        end = self._consumed // 16 * 16
+        while self._marks and self._marks[-1][0] > end:
+            self._marks.pop()
+        if not self._marks or end == self._produced:
+            return
+        offset, state = self._marks[-1]
+        self.cipher._load_state_bytes(state)
+        skip = end - offset  # Less than a chunk: regenerate it into a scratch buffer
+        if skip:
+            self.cipher.keystream_into(bytearray(skip))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
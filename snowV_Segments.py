@@ -0,0 +1,389 @@
+# Segmented SNOW-V container: the input is split into fixed-size segments, each with its own IV,
+# so that segments can be encrypted and decrypted in parallel or on their own
+
+import mmap  # Files are mapped instead of read so that workers share them without copies
+import os
+import struct
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory  # In-memory data handed to worker processes
+
+import snowV
+
+DEFAULT_SEGMENT_SIZE = 1 << 20  # 1 MiB per segment
+
+_MAGIC = b'SNVS'
+_VERSION = 2  # Version 1 derived segment IVs by adding the index to the whole 128-bit IV
+_NONCE_SIZE = 12  # Bytes of the base IV kept in every segment IV; the rest counts segments
+_MAX_SEGMENTS = 1 << 32
+_FLAG_AEAD = 0x01  # Segments were initialized in AEAD mode
+# Magic, version, flags, reserved, segment size, segment count, payload length, base IV
+_HEADER = struct.Struct('<4sBBHIIQ16s')
+_ENTRY = struct.Struct('<QQ')  # Segment table entry: offset in the container, length
+
+SegmentedHeader = namedtuple(
+    'SegmentedHeader', ['segment_size', 'segment_count', 'length', 'base_iv', 'is_aead_mode', 'table', 'version'])
+
+
+def segment_iv(base_iv, index, version=_VERSION):
+    """
+    Derive the IV of a segment: the 12-byte nonce at the start of the base IV followed by the
+    segment index as a 32-bit big-endian counter. Containers under one key therefore only
+    share keystream if their nonces are equal, however close the nonces are.
+    Version 1 containers added the index to the whole base IV as a 128-bit counter instead.
+    :param base_iv: 16-byte IV stored in the container header.
+    :param index: Segment index, counting from 0.
+    :param version: Container format version.
+    :return: 16-byte IV of the segment.
+    """
+    if version == 1:
+        counter = (int.from_bytes(bytes(base_iv), 'big') + index) % (1 << 128)
+        return counter.to_bytes(16, 'big')
+    if not 0 <= index < _MAX_SEGMENTS:
+        raise ValueError("segment index out of range")
+    return bytes(base_iv[:_NONCE_SIZE]) + index.to_bytes(16 - _NONCE_SIZE, 'big')
+
+
+def _base_iv(iv):
+    """
+    Build the base IV of a new container.
+    :param iv: 12-byte nonce, 16-byte IV whose last 4 bytes (the segment counter) are zero,
+               or None for a random nonce.
+    :return: 16-byte base IV.
+    """
+    if iv is None:
+        return os.urandom(_NONCE_SIZE) + bytes(16 - _NONCE_SIZE)
+    iv = bytes(iv)
+    if len(iv) == _NONCE_SIZE:
+        return iv + bytes(16 - _NONCE_SIZE)
+    if len(iv) != 16:
+        raise ValueError(f"iv must be a 12-byte nonce or 16 bytes, got {len(iv)}")
+    if any(iv[_NONCE_SIZE:]):
+        raise ValueError("the last 4 bytes of a 16-byte base IV hold the segment counter and must be zero")
+    return iv
+
+
+def _header_size(segment_count):
+    """
+    :return: Size in bytes of the header and segment table for segment_count segments.
+    """
+    return _HEADER.size + segment_count * _ENTRY.size
+
+
+def _segments(base_iv, length, segment_size):
+    """
+    Split a payload into segments for encryption.
+    :param base_iv: 16-byte base IV of the container.
+    :param length: Payload length in bytes.
+    :param segment_size: Size of every segment but the last.
+    :return: List of (IV, source offset, destination offset, length), offsets relative to the payload start.
+    """
+    return [(segment_iv(base_iv, i), offset, offset, min(segment_size, length - offset))
+            for i, offset in enumerate(range(0, length, segment_size))]
+
+
+def _table_segments(header):
+    """
+    List the segments of a parsed container as its segment table places them.
+    :param header: SegmentedHeader from read_header.
+    :return: List of (IV, source offset, destination offset, length): source offsets are
+             relative to the payload area of the container, destination offsets to the plaintext.
+    """
+    base = _header_size(header.segment_count)
+    segments = []
+    position = 0  # The plaintext is the segments in table order
+    for index, (offset, length) in enumerate(header.table):
+        segments.append((segment_iv(header.base_iv, index, header.version), offset - base, position, length))
+        position += length
+    return segments
+
+
+def _pack_header(base_iv, length, segment_size, is_aead_mode):
+    """
+    Build the header and segment table of a container.
+    :return: Header bytes; the payload follows directly.
+    """
+    if not 0 < segment_size < 1 << 32:
+        raise ValueError("segment size must be between 1 byte and 4 GiB")
+    count = -(-length // segment_size)
+    if count > _MAX_SEGMENTS:
+        raise ValueError("too many segments; use a larger segment size")
+    base = _header_size(count)  # Payload offset in the container
+    flags = _FLAG_AEAD if is_aead_mode else 0
+    header = bytearray(_HEADER.pack(_MAGIC, _VERSION, flags, 0, segment_size, count, length, base_iv))
+    for offset in range(0, length, segment_size):
+        header += _ENTRY.pack(base + offset, min(segment_size, length - offset))
+    return bytes(header)
+
+
+def read_header(data):
+    """
+    Parse and check the header and segment table at the start of a container.
+    :param data: Bytes-like object starting with at least the header and the segment table.
+    :return: SegmentedHeader; its table lists (offset, length) of every segment.
+    """
+    data = memoryview(data).cast('B')
+    if len(data) < _HEADER.size:
+        raise ValueError("truncated segmented container header")
+    magic, version, flags, _, segment_size, count, length, base_iv = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("not a segmented SNOW-V container")
+    if version not in (1, _VERSION):
+        raise ValueError(f"unsupported segmented container version {version}")
+    if segment_size == 0:
+        raise ValueError("malformed segmented container header: segment size is 0")
+    if len(data) < _header_size(count):
+        raise ValueError("truncated segment table")
+    table = [_ENTRY.unpack_from(data, _HEADER.size + i * _ENTRY.size) for i in range(count)]
+    if sum(size for _, size in table) != length:
+        raise ValueError("segment table does not add up to the payload length")
+    base = _header_size(count)
+    if any(offset < base or offset + size > base + length for offset, size in table):
+        raise ValueError("segment table entry lies outside the payload")
+    return SegmentedHeader(segment_size, count, length, base_iv, bool(flags & _FLAG_AEAD), table, version)
+
+
+def _crypt_range(key, is_aead_mode, segments, src, dst):
+    """
+    Encrypt (or decrypt) a run of segments from src into dst with one cipher context.
+    :param segments: List of (IV, source offset, destination offset, length).
+    :param src: Buffer holding the input payload.
+    :param dst: Writable buffer for the output payload (may be src).
+    """
+    schedule = snowV.bind_key(key, is_aead_mode)  # The key is parsed once per run
+    cipher = snowV.SnowVCipher()
+    for iv, src_offset, dst_offset, length in segments:
+        schedule.setup(cipher, iv)
+        cipher.encrypt_into(src[src_offset:src_offset + length], dst[dst_offset:dst_offset + length])
+
+
+class _Region:
+    """
+    A payload region reopened inside a worker process, as a memoryview.
+    A region reference is (kind, name, base, length): kind 'shm' names a SharedMemory block,
+    kind 'file' a file path; base is the payload offset in it.
+    """
+
+    def __init__(self, ref, writable):
+        self.ref = ref
+        self.writable = writable
+
+    def __enter__(self):
+        kind, name, base, length = self.ref
+        if kind == 'shm':
+            self._handle = shared_memory.SharedMemory(name=name)
+            buffer = self._handle.buf
+        else:
+            self._file = open(name, 'r+b' if self.writable else 'rb')
+            self._handle = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+            buffer = self._handle
+        self._view = memoryview(buffer)[base:base + length]
+        return self._view
+
+    def __exit__(self, *exc_info):
+        self._view.release()  # Views must go before the mapping can be closed
+        self._handle.close()
+        if self.ref[0] == 'file':
+            self._file.close()
+
+
+def _process_worker(key, is_aead_mode, segments, src_ref, dst_ref):
+    """
+    Worker process entry point: map both regions and run _crypt_range on them.
+    Only the region references cross the process boundary, never the data.
+    """
+    with _Region(src_ref, False) as src, _Region(dst_ref, True) as dst:
+        _crypt_range(key, is_aead_mode, segments, src, dst)
+
+
+def _jobs(jobs):
+    """
+    :return: Number of workers to use, defaulting to the number of CPUs.
+    """
+    return max(1, jobs if jobs is not None else os.cpu_count() or 1)
+
+
+def _groups(segments, count):
+    """
+    Split segments into at most count runs of consecutive segments.
+    """
+    size = -(-len(segments) // count)
+    return [segments[i:i + size] for i in range(0, len(segments), size)]
+
+
+def _crypt(key, is_aead_mode, segments, src, dst, jobs, src_ref=None, dst_ref=None):
+    """
+    Encrypt (or decrypt) all segments of a payload, in parallel when jobs allows it.
+    With the native core, threads share src and dst directly (bulk work releases the GIL).
+    Otherwise worker processes reopen the payload: through src_ref and dst_ref for files,
+    or through a SharedMemory copy for in-memory buffers.
+    :param segments: List of (IV, source offset, destination offset, length).
+    :param src: Buffer holding the input payload.
+    :param dst: Writable buffer for the output payload.
+    :param jobs: Number of workers; None for one per CPU.
+    """
+    jobs = _jobs(jobs)
+    if jobs == 1 or len(segments) < 2:
+        _crypt_range(key, is_aead_mode, segments, src, dst)
+        return
+    groups = _groups(segments, jobs * 4)  # A few runs per worker to even out the load
+
+    if snowV._snowv is not None:
+        with ThreadPoolExecutor(jobs) as pool:
+            for future in [pool.submit(_crypt_range, key, is_aead_mode, group, src, dst) for group in groups]:
+                future.result()
+        return
+
+    shm = None
+    if src_ref is None or dst_ref is None:
+        # Copy the payload once into shared memory and work on it in place, or into a second
+        # area after it when the segment table moves segments around
+        in_place = all(src_offset == dst_offset for _, src_offset, dst_offset, _ in segments)
+        size = max(len(src), len(dst))
+        shm = shared_memory.SharedMemory(create=True, size=size if in_place else 2 * size)
+        shm.buf[:len(src)] = src
+        src_ref = ('shm', shm.name, 0, len(src))
+        dst_ref = ('shm', shm.name, 0 if in_place else size, len(dst))
+    try:
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [pool.submit(_process_worker, key, is_aead_mode, group, src_ref, dst_ref)
+                       for group in groups]
+            for future in futures:
+                future.result()
+        if shm is not None:
+            dst[:] = shm.buf[dst_ref[2]:dst_ref[2] + len(dst)]
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+
+def encrypt_segmented(key, iv, data, segment_size=DEFAULT_SEGMENT_SIZE, jobs=None, is_aead_mode=False):
+    """
+    Encrypt data into a segmented container.
+    :param key: Byte sequence representing the encryption key.
+    :param iv: 12-byte nonce (or 16-byte IV ending in four zero bytes) that must not repeat
+               under the key, or None for a random one; segment i uses segment_iv(iv, i).
+    :param data: Bytes-like plaintext.
+    :param segment_size: Size of every segment but the last.
+    :param jobs: Number of workers; None for one per CPU.
+    :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+    :return: Container bytes: header, segment table and ciphertext.
+    """
+    data = memoryview(data).cast('B')
+    base_iv = _base_iv(iv)
+    header = _pack_header(base_iv, len(data), segment_size, is_aead_mode)
+    out = bytearray(len(header) + len(data))
+    out[:len(header)] = header
+    _crypt(key, is_aead_mode, _segments(base_iv, len(data), segment_size), data, memoryview(out)[len(header):], jobs)
+    return bytes(out)
+
+
+def decrypt_segmented(key, container, jobs=None):
+    """
+    Decrypt a whole segmented container.
+    :param key: Byte sequence representing the encryption key.
+    :param container: Bytes-like container from encrypt_segmented or encrypt_file.
+    :param jobs: Number of workers; None for one per CPU.
+    :return: Plaintext bytes.
+    """
+    container = memoryview(container).cast('B')
+    header = read_header(container)
+    base = _header_size(header.segment_count)
+    if len(container) < base + header.length:
+        raise ValueError("truncated segmented container payload")
+    out = bytearray(header.length)
+    _crypt(key, header.is_aead_mode, _table_segments(header), container[base:base + header.length],
+           memoryview(out), jobs)
+    return bytes(out)
+
+
+def decrypt_segment(key, container, index):
+    """
+    Decrypt a single segment without touching the others.
+    :param key: Byte sequence representing the encryption key.
+    :param container: Bytes-like container, or at least its header, table and that segment.
+    :param index: Segment index, counting from 0.
+    :return: Plaintext bytes of the segment.
+    """
+    container = memoryview(container).cast('B')
+    header = read_header(container)
+    if not 0 <= index < len(header.table):
+        raise ValueError("segment index out of range")
+    offset, length = header.table[index]
+    if len(container) < offset + length:
+        raise ValueError("truncated segmented container payload")
+    cipher = snowV.bind_key(key, header.is_aead_mode).new_cipher(segment_iv(header.base_iv, index, header.version))
+    return cipher.encrypt(container[offset:offset + length])
+
+
+def _crypt_file(key, is_aead_mode, segments, src_path, src_base, dst_path, dst_base, length, jobs):
+    """
+    Encrypt (or decrypt) a payload between two files through memory maps.
+    The destination file must already have its final size.
+    """
+    if length == 0:
+        return  # Empty files cannot be mapped
+    src_ref = ('file', src_path, src_base, length)
+    dst_ref = ('file', dst_path, dst_base, length)
+    if _jobs(jobs) > 1 and snowV._snowv is None and len(segments) > 1:
+        _crypt(key, is_aead_mode, segments, None, None, jobs, src_ref, dst_ref)
+        return
+    with _Region(src_ref, False) as src, _Region(dst_ref, True) as dst:
+        _crypt(key, is_aead_mode, segments, src, dst, jobs)
+
+
+def _check_paths(src_path, dst_path):
+    """
+    Reject a destination that is the source file: it is truncated before the source is read.
+    """
+    if os.path.exists(dst_path) and os.path.samefile(src_path, dst_path):
+        raise ValueError("source and destination are the same file")
+
+
+def encrypt_file(key, iv, src_path, dst_path, segment_size=DEFAULT_SEGMENT_SIZE, jobs=None, is_aead_mode=False):
+    """
+    Encrypt the file at src_path into a segmented container at dst_path.
+    :param key: Byte sequence representing the encryption key.
+    :param iv: 12-byte nonce (or 16-byte IV ending in four zero bytes) that must not repeat
+               under the key, or None for a random one; segment i uses segment_iv(iv, i).
+    :param src_path: Path of the plaintext file.
+    :param dst_path: Path of the container file to create (overwritten if present).
+    :param segment_size: Size of every segment but the last.
+    :param jobs: Number of workers; None for one per CPU.
+    :param is_aead_mode: Boolean flag indicating if AEAD mode is used.
+    :return: Payload length in bytes.
+    """
+    _check_paths(src_path, dst_path)
+    length = os.path.getsize(src_path)
+    base_iv = _base_iv(iv)
+    header = _pack_header(base_iv, length, segment_size, is_aead_mode)
+    with open(dst_path, 'wb') as dst:
+        dst.write(header)
+        dst.truncate(len(header) + length)  # Workers write into the mapped payload area
+    _crypt_file(key, is_aead_mode, _segments(base_iv, length, segment_size),
+                src_path, 0, dst_path, len(header), length, jobs)
+    return length
+
+
+def decrypt_file(key, src_path, dst_path, jobs=None):
+    """
+    Decrypt the segmented container at src_path into dst_path.
+    :param key: Byte sequence representing the encryption key.
+    :param src_path: Path of the container file.
+    :param dst_path: Path of the plaintext file to create (overwritten if present).
+    :param jobs: Number of workers; None for one per CPU.
+    :return: Payload length in bytes.
+    """
+    _check_paths(src_path, dst_path)
+    with open(src_path, 'rb') as src:
+        start = src.read(_HEADER.size)
+        count = _HEADER.unpack_from(start)[5] if len(start) == _HEADER.size else 0
+        header = read_header(start + src.read(count * _ENTRY.size))
+    base = _header_size(header.segment_count)
+    if os.path.getsize(src_path) < base + header.length:
+        raise ValueError("truncated segmented container payload")
+    with open(dst_path, 'wb') as dst:
+        dst.truncate(header.length)
+    _crypt_file(key, header.is_aead_mode, _table_segments(header), src_path, base, dst_path, 0, header.length, jobs)
+    return header.length
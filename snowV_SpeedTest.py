@@ -1,9 +1,38 @@
 # snowvSpeedTest.py
+#
+# Benchmark suite for every SNOW-V backend:
+#
+#     python snowV_SpeedTest.py                         # all cases, table on stdout
+#     python snowV_SpeedTest.py --json results.json     # also save the results
+#     python snowV_SpeedTest.py --compare results.json  # flag regressions against a saved run
 
-import time
+import argparse
+import contextlib
+import json
 import os
-import statistics  # Import statistics module for computing mean and standard deviation
-from snowV import SnowVCipher
+import platform
+import sys
+import time
+
+import snowV
+from snowV import SnowVCipher, SnowVGCM, bind_key
+
+try:
+    import snowV_Lanes  # Multi-lane engine, needs NumPy
+except ImportError:
+    snowV_Lanes = None
+
+# Fixed key and IV for consistency across tests
+KEY = bytes(range(32))  # 000102...1f
+IV = bytes(range(32, 48))  # 202122...2f
+
+DEFAULT_SIZES = [16, 64, 256, 1024, 4096, 16384, 65536, 1 << 20, 16 << 20, 64 << 20]
+AEAD_SIZES = [16, 1024, 65536]
+BATCH_PACKETS = 256  # Packets per encrypt_many call
+BATCH_PACKET_SIZE = 64
+LANES = 1024  # Streams per multi-lane call
+LANES_BYTES = 64
+CASES = ['aes', 'setup', 'keystream', 'encrypt', 'aead', 'batch', 'lanes']
 
 def generate_random_bytes(size_in_bytes):
     """
@@ -14,87 +43,383 @@ def generate_random_bytes(size_in_bytes):
     """
     return os.urandom(size_in_bytes)
 
-def format_time(elapsed_time):
+def reference_aes_enc_round(state, roundKey):
+    """
+    Byte-wise AES encryption round, as SnowVCipher.aes_enc_round computed it before
+    the T-table version. Kept as the baseline for benchmark_aes_round.
+
+    :param state: List of four 32-bit integers representing the FSM state.
+    :param roundKey: List of four 32-bit integers representing the round key.
+    :return: List of four 32-bit integers after the AES round.
     """
-    Formats the elapsed time into milliseconds with three decimal places.
+    sb = [0]*16  # Substitute bytes array
+    for i in range(4):
+        for j in range(4):
+            sb[i*4 + j] = SnowVCipher.SBox[(state[i] >> (j*8)) & 0xFF]
+
+    result = [0]*4
+    for j in range(4):
+        # ShiftRows-like permutation on substituted bytes
+        w = (
+            (sb[(j*4 + 0) % 16] << 24) |
+            (sb[(j*4 + 5) % 16] << 0) |
+            (sb[(j*4 + 10) % 16] << 8) |
+            (sb[(j*4 + 15) % 16] << 16)
+        ) & 0xFFFFFFFF
+
+        # MixColumns-like transformation
+        t = ((w << 16) | (w >> 16)) & 0xFFFFFFFF
+        t ^= ((w << 1) & 0xFEFEFEFE)
+        t ^= (((w >> 7) & 0x01010101) * 0x1B)
+        t &= 0xFFFFFFFF
 
-    :param elapsed_time: Time elapsed in seconds.
-    :return: A string representing the time in milliseconds.
+        result[j] = (roundKey[j] ^ w ^ t ^ ((t << 8) | (t >> 24))) & 0xFFFFFFFF
+    return result
+
+def benchmark_aes_round(rounds=100000):
     """
-    return f"{elapsed_time * 1000:.3f} ms"
+    Compare the byte-wise reference AES round against the T-table rounds of SnowVCipher.
 
-def main():
-    # Initialize SNOW-V instance
+    :param rounds: Number of AES rounds to time for each variant.
+    :return: List of result records (see _record), one per variant.
+    """
     cipher = SnowVCipher()
+    zero_key = [0]*4
+    states = [list(int.from_bytes(os.urandom(4), 'little') for _ in range(4)) for _ in range(256)]
+
+    # All variants must agree before their speed is worth comparing
+    for state in states:
+        expected = reference_aes_enc_round(state, zero_key)
+        assert cipher.aes_enc_round(state, zero_key) == expected
+        assert cipher.aes_enc_round_zero(state) == expected
 
-    # Define fixed key and IV for consistency across tests
-    key_hex = (
-        '000102030405060708090a0b0c0d0e0f'
-        '101112131415161718191a1b1c1d1e1f'
-    )  # 32 bytes key (256 bits)
-    iv_hex = '202122232425262728292a2b2c2d2e2f'  # 16 bytes IV (128 bits)
-
-    # Convert hex strings to bytes
-    key = hexstr_to_bytes(key_hex)
-    iv = hexstr_to_bytes(iv_hex)
-
-    # Setup key and IV in the cipher
-    cipher.keyiv_setup(list(key), list(iv))
-
-    # Define plaintext sizes in bits and their corresponding byte sizes
-    plaintext_sizes = {
-        '256 bits': 32,    # 32 bytes
-        '1024 bits': 128,  # 128 bytes
-        '8192 bits': 1024  # 1024 bytes
+    variants = {
+        'reference': lambda s: reference_aes_enc_round(s, zero_key),
+        't-table': lambda s: cipher.aes_enc_round(s, zero_key),
+        't-table-zero-key': cipher.aes_enc_round_zero,
     }
 
-    # Number of iterations for each test to obtain average time
-    iterations = 1000
+    results = []
+    for label, round_fn in variants.items():
+        state = states[0]
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            state = round_fn(state)  # Chain rounds so each depends on the previous one
+        elapsed = time.perf_counter() - start_time
+        results.append(_record('aes', label, 16, rounds, [elapsed]))
+    return results
 
-    print("SNOW-V Speed Test")
-    print("================\n")
-    print(f"Number of Iterations per Test: {iterations}\n")
-    print(f"Keys and IV are fixed for all tests.\n")
+def cpu_hz():
+    """
+    Nominal CPU clock rate, used to convert times into cycles per byte.
+
+    :return: Clock rate in Hz from /proc/cpuinfo, or None if unknown.
+    """
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('cpu MHz'):
+                    return float(line.split(':')[1]) * 1e6
+    except OSError:
+        pass
+    return None
+
+def available_backends():
+    """
+    :return: Names of the backends that can run here: 'python' always, 'native' when the
+             _snowv extension is built, 'lanes' when NumPy is installed.
+    """
+    backends = ['python']
+    if snowV._snowv is not None:
+        backends.append('native')
+    if snowV_Lanes is not None:
+        backends.append('lanes')
+    return backends
+
+@contextlib.contextmanager
+def use_backend(backend):
+    """
+    Route SnowVCipher, SnowVGCM and bind_key through one backend for the duration of the block.
+    'python' hides the native core; 'native' and 'lanes' leave the module as it is.
+
+    :param backend: Backend name from available_backends().
+    """
+    saved = snowV._snowv, SnowVCipher._native
+    if backend == 'python':
+        snowV._snowv = None
+        SnowVCipher._native = None
+    try:
+        yield
+    finally:
+        snowV._snowv, SnowVCipher._native = saved
+
+def percentile(sorted_values, fraction):
+    """
+    :param sorted_values: Non-empty list of values in ascending order.
+    :param fraction: Percentile as a fraction, e.g. 0.99.
+    :return: The nearest-rank percentile.
+    """
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def _record(case, backend, size, ops_per_call, times, hz=None):
+    """
+    Build a result record from per-call times.
+
+    :param case: Benchmark case name.
+    :param backend: Backend name.
+    :param size: Bytes processed per operation.
+    :param ops_per_call: Operations covered by one timed call.
+    :param times: List of per-call times in seconds.
+    :param hz: CPU clock rate for cycles per byte, or None.
+    :return: Dict with ops/s, MB/s, cycles per byte and per-operation latency percentiles.
+    """
+    times = sorted(times)
+    total = sum(times)
+    ops = ops_per_call * len(times)
+    seconds_per_byte = total / (ops * size) if size else None
+    return {
+        'case': case,
+        'backend': backend,
+        'size': size,
+        'samples': len(times),
+        'ops_per_s': ops / total,
+        'mb_per_s': ops * size / total / 1e6,
+        'cycles_per_byte': seconds_per_byte * hz if hz and seconds_per_byte else None,
+        'p50_us': percentile(times, 0.50) / ops_per_call * 1e6,
+        'p90_us': percentile(times, 0.90) / ops_per_call * 1e6,
+        'p99_us': percentile(times, 0.99) / ops_per_call * 1e6,
+    }
+
+def measure(fn, min_time, max_calls=100000, min_calls=3):
+    """
+    Call fn repeatedly, timing every call, until min_time seconds have been spent.
+
+    :param fn: Callable without arguments.
+    :param min_time: Target total time in seconds.
+    :param max_calls: Upper bound on the number of calls.
+    :param min_calls: Lower bound on the number of calls.
+    :return: List of per-call times in seconds.
+    """
+    fn()  # Warm-up run (caches, lazily built tables)
+    times = []
+    total = 0.0
+    while len(times) < max_calls and (total < min_time or len(times) < min_calls):
+        start_time = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start_time
+        times.append(elapsed)
+        total += elapsed
+    return times
+
+def bench_setup(backend, min_time, hz):
+    """
+    Time keyiv_setup on a reused cipher object.
+    """
+    cipher = SnowVCipher()
+    times = measure(lambda: cipher.keyiv_setup(KEY, IV), min_time)
+    return [_record('setup', backend, 0, 1, times, hz)]
+
+def bench_keystream(backend, min_time, hz):
+    """
+    Time the generation of single 16-byte keystream blocks.
+    """
+    cipher = SnowVCipher()
+    cipher.keyiv_setup(KEY, IV)
+    times = measure(lambda: cipher.generate_keystream(16), min_time)
+    return [_record('keystream', backend, 16, 1, times, hz)]
 
-    for size_label, size_bytes in plaintext_sizes.items():
-        # Generate random plaintext of the specified size
-        plaintext = generate_random_bytes(size_bytes)
+def bench_encrypt(backend, min_time, hz, sizes, max_call_time):
+    """
+    Time encrypt_into on one keyed cipher for every size. Sizes whose single call is
+    estimated to exceed max_call_time seconds are skipped.
+    """
+    cipher = SnowVCipher()
+    cipher.keyiv_setup(KEY, IV)
+    results = []
+    rate = None  # Bytes per second seen at the previous size
+    for size in sizes:
+        if rate is not None and size / rate > max_call_time:
+            print(f"  skipping encrypt {size} B on {backend}: ~{size / rate:.0f} s per call", file=sys.stderr)
+            continue
+        plaintext = generate_random_bytes(size)
+        ciphertext = bytearray(size)
+        times = measure(lambda: cipher.encrypt_into(plaintext, ciphertext), min_time)
+        results.append(_record('encrypt', backend, size, 1, times, hz))
+        rate = results[-1]['mb_per_s'] * 1e6
+    return results
 
-        # Warm-up run (optional but can help with more consistent timing)
-        ciphertext = cipher.encrypt(plaintext)
+def bench_aead(backend, min_time, hz, sizes):
+    """
+    Time one-shot SNOW-V-GCM sealing, setup included, for every size.
+    """
+    results = []
+    for size in sizes:
+        plaintext = generate_random_bytes(size)
+        aad = bytes(16)
+        times = measure(lambda: SnowVGCM.seal(KEY, IV, aad, plaintext), min_time)
+        results.append(_record('aead', backend, size, 1, times, hz))
+    return results
 
-        # List to store individual encryption times
-        encryption_times = []
+def bench_batch(backend, min_time, hz):
+    """
+    Time encrypt_many on a bound key: one setup per packet, BATCH_PACKETS packets per call.
+    """
+    schedule = bind_key(KEY)
+    ivs = [generate_random_bytes(16) for _ in range(BATCH_PACKETS)]
+    payloads = [generate_random_bytes(BATCH_PACKET_SIZE) for _ in range(BATCH_PACKETS)]
+    times = measure(lambda: schedule.encrypt_many(ivs, payloads), min_time)
+    return [_record('batch', backend, BATCH_PACKET_SIZE, BATCH_PACKETS, times, hz)]
 
-        # Start timing for each encryption operation
-        for _ in range(iterations):
-            start_time = time.perf_counter()  # Start time for this iteration
-            ciphertext = cipher.encrypt(plaintext)  # Perform encryption
-            end_time = time.perf_counter()  # End time for this iteration
-            iteration_time = end_time - start_time  # Calculate elapsed time
-            encryption_times.append(iteration_time)  # Store the time
+def bench_lanes(min_time, hz):
+    """
+    Time multi-lane keystream generation: LANES streams of one key with different IVs per call.
+    """
+    np = snowV_Lanes.np
+    key = np.frombuffer(KEY, dtype=np.uint8)
+    ivs = np.frombuffer(generate_random_bytes(16 * LANES), dtype=np.uint8).reshape(LANES, 16)
+    times = measure(lambda: snowV_Lanes.keystream_lanes(key, ivs, LANES_BYTES), min_time)
+    return [_record('lanes', 'lanes', LANES_BYTES, LANES, times, hz)]
 
-        # Calculate statistics
-        average_time = statistics.mean(encryption_times)  # Average encryption time
-        min_time = min(encryption_times)  # Minimum encryption time using built-in min
-        max_time = max(encryption_times)  # Maximum encryption time using built-in max
-        std_dev = statistics.stdev(encryption_times)  # Standard deviation
+def run_suite(backends, cases, sizes, min_time, max_call_time, hz):
+    """
+    Run the selected cases on the selected backends.
 
-        # Print results
-        print(f"Plaintext Size: {size_label} ({size_bytes} bytes)")
-        print(f"Average Encryption Time over {iterations} iterations: {format_time(average_time)}")
-        print(f"Minimum Encryption Time: {format_time(min_time)}")
-        print(f"Maximum Encryption Time: {format_time(max_time)}")
-        print(f"Standard Deviation: {format_time(std_dev)}\n")
+    :return: List of result records.
+    """
+    results = []
+    if 'aes' in cases:
+        results += benchmark_aes_round()
+    for backend in backends:
+        if backend == 'lanes':
+            if 'lanes' in cases:
+                results += bench_lanes(min_time, hz)
+            continue
+        with use_backend(backend):
+            if 'setup' in cases:
+                results += bench_setup(backend, min_time, hz)
+            if 'keystream' in cases:
+                results += bench_keystream(backend, min_time, hz)
+            if 'encrypt' in cases:
+                results += bench_encrypt(backend, min_time, hz, sizes, max_call_time)
+            if 'aead' in cases:
+                results += bench_aead(backend, min_time, hz, [s for s in AEAD_SIZES if s <= max(sizes)])
+            if 'batch' in cases:
+                results += bench_batch(backend, min_time, hz)
+    return results
 
-def hexstr_to_bytes(hexstr):
+def metadata(hz):
+    """
+    :return: Dict describing the machine and build the results were taken on.
     """
-    Converts a hexadecimal string to bytes.
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpu_hz': hz,
+        'native_backend': snowV._snowv.backend() if snowV._snowv is not None else None,
+    }
 
-    :param hexstr: A string containing hexadecimal characters, possibly separated by spaces.
-    :return: A bytes object.
+def _key(result):
+    """
+    :return: Identity of a result record across runs.
     """
-    return bytes.fromhex(hexstr.replace(" ", "").replace("\n", ""))
+    return result['case'], result['backend'], result['size']
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline run.
+
+    :param results: Result records of this run.
+    :param baseline: Result records of the saved run.
+    :param threshold: Relative slowdown in ops/s above which a case counts as a regression.
+    :return: List of (result, baseline result, ratio) for every regression.
+    """
+    saved = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = saved.get(_key(result))
+        if before is None:
+            continue
+        ratio = result['ops_per_s'] / before['ops_per_s']
+        result['baseline_ratio'] = ratio
+        if ratio < 1.0 - threshold:
+            regressions.append((result, before, ratio))
+    return regressions
+
+def format_size(size):
+    """
+    :return: size in bytes as a short human-readable string.
+    """
+    for unit, scale in (('MiB', 1 << 20), ('KiB', 1 << 10)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale} {unit}"
+    return f"{size} B"
+
+def print_results(results):
+    """
+    Print result records as a table.
+    """
+    print(f"{'case':<10} {'backend':<18} {'size':>8} {'ops/s':>12} {'MB/s':>10} {'cyc/B':>9} "
+          f"{'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'vs base':>8}")
+    for r in results:
+        cycles = f"{r['cycles_per_byte']:.1f}" if r['cycles_per_byte'] else '-'
+        ratio = f"{r['baseline_ratio']:.2f}x" if 'baseline_ratio' in r else ''
+        print(f"{r['case']:<10} {r['backend']:<18} {format_size(r['size']):>8} {r['ops_per_s']:>12,.0f} "
+              f"{r['mb_per_s']:>10.2f} {cycles:>9} {r['p50_us']:>10.2f} {r['p90_us']:>10.2f} "
+              f"{r['p99_us']:>10.2f} {ratio:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SNOW-V benchmark suite')
+    parser.add_argument('--backends', default=','.join(available_backends()),
+                        help='comma-separated backends (default: all available)')
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated cases (default: all)')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated encrypt sizes in bytes')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds spent per case (default: 0.2)')
+    parser.add_argument('--max-call-time', type=float, default=5.0,
+                        help='skip sizes whose single call would take longer (default: 5 s)')
+    parser.add_argument('--ghz', type=float, help='CPU clock for cycles per byte (default: from /proc/cpuinfo)')
+    parser.add_argument('--json', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative ops/s drop reported as a regression (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    backends = [b for b in args.backends.split(',') if b]
+    unknown = set(backends) - set(available_backends())
+    if unknown:
+        parser.error(f"backend(s) not available here: {', '.join(sorted(unknown))}")
+    cases = [c for c in args.cases.split(',') if c]
+    if set(cases) - set(CASES):
+        parser.error(f"unknown case(s); choose from {', '.join(CASES)}")
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    hz = args.ghz * 1e9 if args.ghz else cpu_hz()
+
+    results = run_suite(backends, cases, sizes, args.min_time, args.max_call_time, hz)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file)['results'], args.threshold)
+
+    print("SNOW-V Speed Test")
+    print("================\n")
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump({'meta': metadata(hz), 'results': results}, out, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for result, before, ratio in regressions:
+            print(f"  {result['case']} {result['backend']} {format_size(result['size'])}: "
+                  f"{before['ops_per_s']:,.0f} -> {result['ops_per_s']:,.0f} ops/s ({ratio:.2f}x)")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
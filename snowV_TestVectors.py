@@ -29,122 +29,122 @@ def plaintext_to_hex(plaintext):
     """
     return plaintext.encode('utf-8').hex()  # Encode the string to UTF-8 bytes and convert to hex
 
+# Define a list of test vectors, each containing key, IV, expected init_z, and expected keystream z
+TEST_VECTORS = [
+    {
+        'key': (
+            '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 '
+            '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00'
+        ),  # 32-byte key in hexadecimal
+        'iv': '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00',  # 16-byte IV in hexadecimal
+        'init_z': [
+            '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00',
+            '63 63 63 63 63 63 63 63 63 63 63 63 63 63 63 63',
+            'a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5',
+            'ea ea ea ea eb eb eb eb eb eb eb eb eb eb eb eb',
+            '55 f7 f7 c2 e8 e8 dd 4a e8 dd 4a e8 dd 4a e8 e8',
+            'c7 2a 23 bf e8 93 73 30 23 bc 66 ec 94 d2 eb b2',
+            'a7 dd ca f3 13 87 61 02 6e ad f4 2b 54 e3 ef cf',
+            '6a 67 62 3e 6f 8a f9 79 1e cd 81 83 c5 86 8e 3a',
+            '45 10 1e 83 a2 c6 dd eb 40 86 38 2d ac fb 3b 65',
+            '3c c4 df 56 ec bf c1 06 6d ac 02 c5 0a 68 3c fe',
+            '0c cb e1 de 2e 41 af da 70 98 d5 60 19 20 06 98',
+            '53 cd 98 69 c7 78 ca de d7 db 45 9b 6f 45 8b 10',
+            '8d 94 0b e5 9f bd b1 61 c1 21 fc 29 7a 3d 0a 15',
+            '26 13 2c 14 9e af 12 cc d3 2f 35 76 f6 43 68 94',
+            '0e 75 be 09 54 18 1e f5 8a 60 a9 a9 54 3a 05 ff',
+            'dc 77 a4 97 23 eb 65 6a e1 8f 28 2c f1 de 1d 00',
+        ],  # Expected initialization z-values for 16 rounds
+        'z': [
+            '69 ca 6d af 9a e3 b7 2d b1 34 a8 5a 83 7e 41 9d',
+            'ec 08 aa d3 9d 7b 0f 00 9b 60 b2 8c 53 43 00 ed',
+            '84 ab f5 94 fb 08 a7 f1 f3 a2 df 18 e6 17 68 3b',
+            '48 1f a3 78 07 9d cf 04 db 53 b5 d6 29 a9 eb 9d',
+            '03 1c 15 9d cc d0 a5 0c 4d 5d bf 51 15 d8 70 39',
+            'c0 d0 3c a1 37 0c 19 40 03 47 a0 b4 d2 e9 db e5',
+            'cb ca 60 82 14 a2 65 82 cf 68 09 16 b3 45 13 21',
+            '95 4f df 30 84 af 02 f6 a8 e2 48 1d e6 bf 82 79',
+        ]  # Expected keystream z-values for 8 blocks
+    },
+    {
+        'key': (
+            'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff '
+            'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff'
+        ),  # 32-byte key in hexadecimal
+        'iv': 'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff',  # 16-byte IV in hexadecimal
+        'init_z': [
+            'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff',
+            'd3 07 d2 07 d3 07 d2 07 d3 07 2d f8 2e f8 2d f8',
+            '65 f6 62 f6 65 f6 62 f6 65 f6 62 f6 65 f6 62 f6',
+            'fe 86 fe 86 f5 2d f2 2d 31 96 d7 54 6a e8 6a e8',
+            '8b d8 8a a5 c8 29 c6 26 7c 51 37 97 bf 9a c8 7c',
+            '21 c0 4a 14 e4 1c 34 95 d0 9c 96 e5 48 60 89 81',
+            '7c ce 64 29 1a cf 8f 4a 06 ca 55 65 3f c4 93 97',
+            '0a f9 1c 75 0f d3 80 e3 48 6b ff e5 c7 bb e3 d4',
+            '89 60 89 a2 e6 f0 7c 2c 92 ed 62 ed 9d 43 61 98',
+            'ff 04 bf 72 41 c0 7f 6b 17 fd 90 c8 8a 61 bf ca',
+            '97 88 78 33 20 08 2f f6 f9 34 45 18 6e 71 bc bc',
+            '7e 17 b4 ff 42 3a 2e 2c c7 c5 0f 84 5d 9b b3 ee',
+            '32 40 8c 85 58 e0 d2 7e f5 a3 a8 d7 63 32 25 dc',
+            'a2 93 73 c3 48 2b 3f 1a d3 3b b4 57 a3 0d 7f e4',
+            '72 e0 95 5b 9a 83 3a 3f db 98 68 56 35 80 b4 b0',
+            '94 9f be 85 a4 e5 35 7f bf 75 e9 86 4d 2c 7b a1',
+        ],  # Expected initialization z-values for 16 rounds
+        'z': [
+            '30 76 09 fb 10 10 12 54 4b c1 75 e3 17 fb 25 ff',
+            '33 0d 0d e2 5a f6 aa d1 05 05 b8 9b 1e 09 a8 ec',
+            'dd 46 72 cc bb 98 c7 f2 c4 e2 4a f5 27 28 36 c8',
+            '7c c7 3a 81 76 b3 9c e9 30 3b 3e 76 4e 9b e3 e7',
+            '48 f7 65 1a 7c 7e 81 3f d5 24 90 23 1e 56 f7 c1',
+            '44 e4 38 e7 77 11 a6 b0 ba fb 60 45 0c 62 d7 d9',
+            'b9 24 1d 12 44 fc b4 9d a1 e5 2b 80 13 de cd d4',
+            '86 04 ff fc 62 67 6e 70 3b 3a b8 49 cb a6 ea 09',
+        ]  # Expected keystream z-values for 8 blocks
+    },
+    {
+        'key': (
+            '50 51 52 53 54 55 56 57 58 59 5a 5b 5c 5d 5e 5f '
+            '0a 1a 2a 3a 4a 5a 6a 7a 8a 9a aa ba ca da ea fa'
+        ),  # 32-byte key in hexadecimal
+        'iv': '01 23 45 67 89 ab cd ef fe dc ba 98 76 54 32 10',  # 16-byte IV in hexadecimal
+        'init_z': [
+            '0a 1a 2a 3a 4a 5a 6a 7a 8a 9a aa ba ca da ea fa',
+            '66 d4 2d 92 ac 52 b6 44 63 3c c3 71 c3 91 c6 24',
+            'a2 d7 ea be 3f 04 8e 50 00 b1 7b 74 2f 34 5e 49',
+            '96 a7 34 ed fd 07 46 9d c8 f9 a2 91 fc 13 76 73',
+            '58 c8 70 73 d8 a2 a1 bd 03 e7 a1 4c c7 b7 db 89',
+            '7e 86 eb 71 d6 dc 00 99 d1 31 e3 1b 54 c5 3e f8',
+            'a8 ca ff 06 0d c0 9e 67 cc 95 62 16 17 19 8c f2',
+            'c0 99 3a 55 f3 e2 d7 8d 6a f7 e1 57 0f a1 63 02',
+            '39 8f a0 7e ab a2 73 89 94 f9 ac 3e 8e b1 ff 64',
+            '15 32 31 6a 42 5c 12 a6 39 ce 79 cb 30 43 47 1e',
+            '2e 7a 44 fd ad 23 77 5a f1 61 1c ca 5b b2 1e 95',
+            '93 69 c8 20 a9 37 d5 c8 b6 7a df 84 45 5e 13 c3',
+            'c1 0f 8d b5 fb 37 08 31 11 d1 c8 44 6e a2 ac 9e',
+            '13 ac 34 20 7b 01 b7 ab d3 57 02 a1 ed 98 9b dc',
+            '0b 15 43 a4 74 26 2c 76 a3 e2 73 57 28 4b dc 67',
+            '7b 79 91 96 cf 6b 76 27 f8 dd a1 89 bb af dc 93',
+        ],  # Expected initialization z-values for 16 rounds
+        'z': [
+            'aa 81 ea fb 8b 86 16 ce 3e 5c e2 22 24 61 c5 0a',
+            '6a b4 48 77 56 de 4b d3 1c 90 4f 3d 97 8a fe 56',
+            '33 4f 10 dd df 2b 95 31 76 9a 71 05 0b e4 38 5f',
+            'c2 b6 19 2c 7a 85 7b e8 b4 fc 28 b7 09 f0 8f 11',
+            'f2 06 49 e2 ee f2 49 80 f8 6c 4c 11 36 41 fe d2',
+            'f3 f6 fa 2b 91 95 12 06 b8 01 db 15 46 65 17 a6',
+            '33 0a dd a6 b3 5b 26 5e fd 72 2e 86 77 b4 8b fc',
+            '15 b4 41 18 de 52 d0 73 b0 ad 0f e7 59 4d 62 91',
+        ]  # Expected keystream z-values for 8 blocks
+    }
+]
+
 def test_snowv_with_init_z():
     """
     Test the SnowVCipher implementation against predefined test vectors.
     Verifies both initialization z-values and keystream z-values.
     """
-    # Define a list of test vectors, each containing key, IV, expected init_z, and expected keystream z
-    test_vectors = [
-        {
-            'key': (
-                '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 '
-                '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00'
-            ),  # 32-byte key in hexadecimal
-            'iv': '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00',  # 16-byte IV in hexadecimal
-            'init_z': [
-                '00 00 00 00 00 00 00 00 00 00 00 00 00 00 00 00',
-                '63 63 63 63 63 63 63 63 63 63 63 63 63 63 63 63',
-                'a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5 a5',
-                'ea ea ea ea eb eb eb eb eb eb eb eb eb eb eb eb',
-                '55 f7 f7 c2 e8 e8 dd 4a e8 dd 4a e8 dd 4a e8 e8',
-                'c7 2a 23 bf e8 93 73 30 23 bc 66 ec 94 d2 eb b2',
-                'a7 dd ca f3 13 87 61 02 6e ad f4 2b 54 e3 ef cf',
-                '6a 67 62 3e 6f 8a f9 79 1e cd 81 83 c5 86 8e 3a',
-                '45 10 1e 83 a2 c6 dd eb 40 86 38 2d ac fb 3b 65',
-                '3c c4 df 56 ec bf c1 06 6d ac 02 c5 0a 68 3c fe',
-                '0c cb e1 de 2e 41 af da 70 98 d5 60 19 20 06 98',
-                '53 cd 98 69 c7 78 ca de d7 db 45 9b 6f 45 8b 10',
-                '8d 94 0b e5 9f bd b1 61 c1 21 fc 29 7a 3d 0a 15',
-                '26 13 2c 14 9e af 12 cc d3 2f 35 76 f6 43 68 94',
-                '0e 75 be 09 54 18 1e f5 8a 60 a9 a9 54 3a 05 ff',
-                'dc 77 a4 97 23 eb 65 6a e1 8f 28 2c f1 de 1d 00',
-            ],  # Expected initialization z-values for 16 rounds
-            'z': [
-                '69 ca 6d af 9a e3 b7 2d b1 34 a8 5a 83 7e 41 9d',
-                'ec 08 aa d3 9d 7b 0f 00 9b 60 b2 8c 53 43 00 ed',
-                '84 ab f5 94 fb 08 a7 f1 f3 a2 df 18 e6 17 68 3b',
-                '48 1f a3 78 07 9d cf 04 db 53 b5 d6 29 a9 eb 9d',
-                '03 1c 15 9d cc d0 a5 0c 4d 5d bf 51 15 d8 70 39',
-                'c0 d0 3c a1 37 0c 19 40 03 47 a0 b4 d2 e9 db e5',
-                'cb ca 60 82 14 a2 65 82 cf 68 09 16 b3 45 13 21',
-                '95 4f df 30 84 af 02 f6 a8 e2 48 1d e6 bf 82 79',
-            ]  # Expected keystream z-values for 8 blocks
-        },
-        {
-            'key': (
-                'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff '
-                'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff'
-            ),  # 32-byte key in hexadecimal
-            'iv': 'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff',  # 16-byte IV in hexadecimal
-            'init_z': [
-                'ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff ff',
-                'd3 07 d2 07 d3 07 d2 07 d3 07 2d f8 2e f8 2d f8',
-                '65 f6 62 f6 65 f6 62 f6 65 f6 62 f6 65 f6 62 f6',
-                'fe 86 fe 86 f5 2d f2 2d 31 96 d7 54 6a e8 6a e8',
-                '8b d8 8a a5 c8 29 c6 26 7c 51 37 97 bf 9a c8 7c',
-                '21 c0 4a 14 e4 1c 34 95 d0 9c 96 e5 48 60 89 81',
-                '7c ce 64 29 1a cf 8f 4a 06 ca 55 65 3f c4 93 97',
-                '0a f9 1c 75 0f d3 80 e3 48 6b ff e5 c7 bb e3 d4',
-                '89 60 89 a2 e6 f0 7c 2c 92 ed 62 ed 9d 43 61 98',
-                'ff 04 bf 72 41 c0 7f 6b 17 fd 90 c8 8a 61 bf ca',
-                '97 88 78 33 20 08 2f f6 f9 34 45 18 6e 71 bc bc',
-                '7e 17 b4 ff 42 3a 2e 2c c7 c5 0f 84 5d 9b b3 ee',
-                '32 40 8c 85 58 e0 d2 7e f5 a3 a8 d7 63 32 25 dc',
-                'a2 93 73 c3 48 2b 3f 1a d3 3b b4 57 a3 0d 7f e4',
-                '72 e0 95 5b 9a 83 3a 3f db 98 68 56 35 80 b4 b0',
-                '94 9f be 85 a4 e5 35 7f bf 75 e9 86 4d 2c 7b a1',
-            ],  # Expected initialization z-values for 16 rounds
-            'z': [
-                '30 76 09 fb 10 10 12 54 4b c1 75 e3 17 fb 25 ff',
-                '33 0d 0d e2 5a f6 aa d1 05 05 b8 9b 1e 09 a8 ec',
-                'dd 46 72 cc bb 98 c7 f2 c4 e2 4a f5 27 28 36 c8',
-                '7c c7 3a 81 76 b3 9c e9 30 3b 3e 76 4e 9b e3 e7',
-                '48 f7 65 1a 7c 7e 81 3f d5 24 90 23 1e 56 f7 c1',
-                '44 e4 38 e7 77 11 a6 b0 ba fb 60 45 0c 62 d7 d9',
-                'b9 24 1d 12 44 fc b4 9d a1 e5 2b 80 13 de cd d4',
-                '86 04 ff fc 62 67 6e 70 3b 3a b8 49 cb a6 ea 09',
-            ]  # Expected keystream z-values for 8 blocks
-        },
-        {
-            'key': (
-                '50 51 52 53 54 55 56 57 58 59 5a 5b 5c 5d 5e 5f '
-                '0a 1a 2a 3a 4a 5a 6a 7a 8a 9a aa ba ca da ea fa'
-            ),  # 32-byte key in hexadecimal
-            'iv': '01 23 45 67 89 ab cd ef fe dc ba 98 76 54 32 10',  # 16-byte IV in hexadecimal
-            'init_z': [
-                '0a 1a 2a 3a 4a 5a 6a 7a 8a 9a aa ba ca da ea fa',
-                '66 d4 2d 92 ac 52 b6 44 63 3c c3 71 c3 91 c6 24',
-                'a2 d7 ea be 3f 04 8e 50 00 b1 7b 74 2f 34 5e 49',
-                '96 a7 34 ed fd 07 46 9d c8 f9 a2 91 fc 13 76 73',
-                '58 c8 70 73 d8 a2 a1 bd 03 e7 a1 4c c7 b7 db 89',
-                '7e 86 eb 71 d6 dc 00 99 d1 31 e3 1b 54 c5 3e f8',
-                'a8 ca ff 06 0d c0 9e 67 cc 95 62 16 17 19 8c f2',
-                'c0 99 3a 55 f3 e2 d7 8d 6a f7 e1 57 0f a1 63 02',
-                '39 8f a0 7e ab a2 73 89 94 f9 ac 3e 8e b1 ff 64',
-                '15 32 31 6a 42 5c 12 a6 39 ce 79 cb 30 43 47 1e',
-                '2e 7a 44 fd ad 23 77 5a f1 61 1c ca 5b b2 1e 95',
-                '93 69 c8 20 a9 37 d5 c8 b6 7a df 84 45 5e 13 c3',
-                'c1 0f 8d b5 fb 37 08 31 11 d1 c8 44 6e a2 ac 9e',
-                '13 ac 34 20 7b 01 b7 ab d3 57 02 a1 ed 98 9b dc',
-                '0b 15 43 a4 74 26 2c 76 a3 e2 73 57 28 4b dc 67',
-                '7b 79 91 96 cf 6b 76 27 f8 dd a1 89 bb af dc 93',
-            ],  # Expected initialization z-values for 16 rounds
-            'z': [
-                'aa 81 ea fb 8b 86 16 ce 3e 5c e2 22 24 61 c5 0a',
-                '6a b4 48 77 56 de 4b d3 1c 90 4f 3d 97 8a fe 56',
-                '33 4f 10 dd df 2b 95 31 76 9a 71 05 0b e4 38 5f',
-                'c2 b6 19 2c 7a 85 7b e8 b4 fc 28 b7 09 f0 8f 11',
-                'f2 06 49 e2 ee f2 49 80 f8 6c 4c 11 36 41 fe d2',
-                'f3 f6 fa 2b 91 95 12 06 b8 01 db 15 46 65 17 a6',
-                '33 0a dd a6 b3 5b 26 5e fd 72 2e 86 77 b4 8b fc',
-                '15 b4 41 18 de 52 d0 73 b0 ad 0f e7 59 4d 62 91',
-            ]  # Expected keystream z-values for 8 blocks
-        }
-    ]
-    
     # Iterate over each test vector and perform verification
-    for idx, vector in enumerate(test_vectors):
+    for idx, vector in enumerate(TEST_VECTORS):
         print(f"== SNOW-V test vector #{idx+1}:")  # Print the test vector number
         
         # Convert hexadecimal key and IV strings to bytes
@@ -152,7 +152,7 @@ def test_snowv_with_init_z():
         iv = hexstr_to_bytes(vector['iv'])
         
         # Initialize the SnowVCipher instance
-        snowv = SnowVCipher()
+        snowv = SnowVCipher(record_init_z=True)
         snowv.keyiv_setup(list(key), list(iv))  # Setup key and IV
         
         # Verify initialization z-values
@@ -184,11 +184,817 @@ def test_snowv_with_init_z():
                 sys.exit(1)  # Exit the program with an error
         print("Keystream z values match the test vectors.")  # Confirmation message
         print()  # Add a newline for readability
+
+    # Short or long keys and IVs are rejected, not padded or truncated
+    key, iv = hexstr_to_bytes(TEST_VECTORS[1]['key']), hexstr_to_bytes(TEST_VECTORS[1]['iv'])
+    for bad_key, bad_iv in ((key, iv[:12]), (key[:16], iv), (key + b'\0', iv)):
+        for snowv in (SnowVCipher(), SnowVCipher(record_init_z=True)):
+            try:
+                snowv.keyiv_setup(bad_key, bad_iv)
+                print(f"Setup accepted a {len(bad_key)}-byte key and {len(bad_iv)}-byte IV.")
+                sys.exit(1)
+            except ValueError:
+                pass
     
     print("All test vectors passed.\n")  # Final success message
 
+def test_snowv_buffers():
+    """
+    Check encrypt_into and keystream_into against keystream blocks generated one at a time,
+    in place and out of place, for lengths around the block size and the _XOR_CHUNK size,
+    and check that a destination buffer that is too small is rejected.
+    """
+    from snowV import PySnowVCipher
+
+    vector = TEST_VECTORS[1]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])
+    reference = PySnowVCipher()
+    reference.keyiv_setup(key, iv)
+    blocks = [reference._keystream_block().to_bytes(16, 'little') for _ in range(600)]
+    keystream = b''.join(blocks)
+
+    classes = [PySnowVCipher] + ([SnowVCipher] if SnowVCipher._native is not None else [])
+    for cipher_class in classes:
+        for length in (0, 1, 15, 16, 17, 4095, 4096, 4097, 8225):
+            src = bytes(i % 251 for i in range(length))
+            expected = bytes(a ^ b for a, b in zip(src, keystream))
+            next_block = blocks[-(-length // 16)]  # Whole blocks are used, the tail is discarded
+            ciphers = []
+            for _ in range(3):
+                cipher = cipher_class()
+                cipher.keyiv_setup(key, iv)
+                ciphers.append(cipher)
+            dst = bytearray(length + 3)  # Larger destinations are fine; the extra bytes stay untouched
+            in_place = bytearray(src)
+            stream = bytearray(length)
+            ok = ciphers[0].encrypt_into(src, dst) == length and dst == expected + bytes(3)
+            ok = ok and ciphers[1].encrypt_into(in_place, in_place) == length and in_place == expected
+            ok = ok and ciphers[2].keystream_into(stream) == length and stream == keystream[:length]
+            for cipher in ciphers:
+                follow = bytearray(16)
+                cipher.keystream_into(follow)
+                ok = ok and follow == next_block
+            if length:
+                try:
+                    ciphers[0].encrypt_into(src, bytearray(length - 1))
+                    ok = False
+                except ValueError:
+                    pass
+            if not ok:
+                print(f"Buffer API mismatch ({cipher_class.__name__}, {length} bytes).")
+                sys.exit(1)
+    print("\nencrypt_into and keystream_into match the keystream blocks.")
+
+
+def test_snowv_stream():
+    """
+    Check that SnowVStream output does not depend on how the input is split across calls,
+    and round-trip data through iter_encrypt and open_encrypted.
+    """
+    import io
+    from snowV import PySnowVCipher, SnowVStream
+
+    vector = TEST_VECTORS[0]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])
+    reference = PySnowVCipher()
+    reference.keyiv_setup(key, iv)
+    keystream = b''.join(reference._keystream_block().to_bytes(16, 'little') for _ in range(320))
+    data = bytes(i % 251 for i in range(5000))
+    expected = bytes(a ^ b for a, b in zip(data, keystream))
+
+    def split(sizes):
+        # Cut data into pieces of the given sizes, repeated until it is used up
+        chunks, offset, i = [], 0, 0
+        while offset < len(data):
+            chunks.append(data[offset:offset + sizes[i % len(sizes)]])
+            offset += sizes[i % len(sizes)]
+            i += 1
+        return chunks
+
+    ok = True
+    for sizes in ([5000], [1], [15, 17], [16, 0, 33, 1], [7, 4096, 3], [1000, 999, 1]):
+        chunks = split(sizes)
+        stream = SnowVStream(key, iv)
+        ok = ok and b''.join(stream.update(chunk) for chunk in chunks) == expected and stream.position == len(data)
+        stream = SnowVStream(key, iv)
+        in_place = []
+        for chunk in chunks:
+            buffer = bytearray(chunk)
+            stream.update_into(buffer, buffer)
+            in_place.append(bytes(buffer))
+        ok = ok and b''.join(in_place) == expected
+        ok = ok and b''.join(SnowVStream(key, iv).iter_encrypt(iter(chunks))) == expected
+
+    # Through file objects: write plaintext in odd pieces, read it back in other pieces
+    container = io.BytesIO()
+    with SnowVStream(key, iv).open_encrypted(container, closefd=False) as writer:
+        for chunk in split([33, 500, 2]):
+            writer.write(chunk)
+    ok = ok and container.getvalue() == expected
+    reader = SnowVStream(key, iv).open_encrypted(io.BytesIO(container.getvalue()))
+    pieces = []
+    while True:
+        piece = reader.read(77)
+        if not piece:
+            break
+        pieces.append(piece)
+    reader.close()
+    ok = ok and b''.join(pieces) == data
+
+    stream = SnowVStream(key, iv)
+    stream.update(data[:10])
+    stream.finalize()
+    try:
+        stream.update(data[10:20])
+        ok = False
+    except ValueError:
+        pass
+    if not ok:
+        print("SnowVStream output depends on how the input is split.")
+        sys.exit(1)
+    print("\nSnowVStream output is independent of how the input is split.")
+
+
+def test_snowv_native():
+    """
+    Run the test vectors through the native core (keystream after initialization only).
+    Skipped when the _snowv extension has not been built.
+    """
+    if SnowVCipher._native is None:
+        print("Native core not built, skipping native test.\n")
+        return
+
+    for idx, vector in enumerate(TEST_VECTORS):
+        snowv = SnowVCipher()  # Without init z recording, setup and bulk keystream run natively
+        snowv.keyiv_setup(hexstr_to_bytes(vector['key']), hexstr_to_bytes(vector['iv']))
+        expected_bytes = hexstr_to_bytes(' '.join(vector['z']))  # All keystream blocks of this vector
+        actual_bytes = snowv.generate_keystream(len(expected_bytes))
+        if actual_bytes != expected_bytes:
+            print(f"Native keystream mismatch in test vector #{idx+1}.")
+            sys.exit(1)
+    print("Native keystream matches the test vectors.\n")
+
+def test_snowv_gcm():
+    """
+    Check SNOW-V-GCM against known answers, with the native GHASH and the pure-Python one,
+    and round-trip a message, one-shot and streamed.
+    """
+    import snowV
+    from snowV import SnowVGCM
+
+    # Vectors from the SNOW-V-GCM appendix of the SNOW-V paper: (key, IV, AAD, plaintext, ciphertext and tag)
+    key_1 = '50 51 52 53 54 55 56 57 58 59 5a 5b 5c 5d 5e 5f 0a 1a 2a 3a 4a 5a 6a 7a 8a 9a aa ba ca da ea fa'
+    iv_1 = '01 23 45 67 89 ab cd ef fe dc ba 98 76 54 32 10'
+    zero_key, zero_iv = '00' * 32, '00' * 16
+    digits = '30 31 32 33 34 35 36 37 38 39'  # '0123456789'
+    gcm_vectors = [
+        (zero_key, zero_iv, '', '', '02 9a 62 4c da a4 d4 6c b9 a0 ef 40 46 95 6c 9f'),
+        (zero_key, zero_iv, digits + ' 61 62 63 64 65 66', '',
+         '5a 5a a5 fb d6 35 ef 1a e1 29 61 42 03 e1 03 84'),
+        (key_1, iv_1, '', '', 'fc 7c ac 57 4c 49 fe ae 61 50 31 5b 96 85 42 4c'),
+        (key_1, iv_1, digits + ' 61 62 63 64 65 66', digits,
+         'dd 7e 01 b2 b4 24 a2 ef 82 50 0a 34 2f 37 a0 d6 9e be a2 9e 86 27 19 91 b1 72'),
+    ]
+    saved = snowV._snowv, SnowVCipher._native
+    try:
+        for native in (True, False):  # Native GHASH when built, then the pure-Python Shoup table
+            if not native:
+                snowV._snowv = None
+                SnowVCipher._native = None
+            for idx, (key, iv, aad, plaintext, expected) in enumerate(gcm_vectors):
+                sealed = SnowVGCM.seal(hexstr_to_bytes(key), hexstr_to_bytes(iv), hexstr_to_bytes(aad),
+                                       hexstr_to_bytes(plaintext))
+                if sealed != hexstr_to_bytes(expected):
+                    print(f"SNOW-V-GCM mismatch in vector #{idx+1} (native core: {native and saved[0] is not None}).")
+                    print(f"Expected: {expected}")
+                    print(f"Actual  : {' '.join(f'{b:02x}' for b in sealed)}")
+                    sys.exit(1)
+    finally:
+        snowV._snowv, SnowVCipher._native = saved
+
+    vector = TEST_VECTORS[2]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])
+    aad = b'SNOW-V-GCM associated data'
+    plaintext = b'The quick brown fox jumps over the lazy dog'
+    sealed = SnowVGCM.seal(key, iv, aad, plaintext)
+
+    streamed = SnowVGCM(key, iv)  # The same message fed in pieces must give the same output
+    streamed.update_aad(aad[:5])
+    streamed.update_aad(aad[5:])
+    streamed_sealed = streamed.encrypt(plaintext[:17]) + streamed.encrypt(plaintext[17:]) + streamed.finalize()
+    if streamed_sealed != sealed or SnowVGCM.open(key, iv, aad, sealed) != plaintext:
+        print("SNOW-V-GCM round trip failed.")
+        sys.exit(1)
+
+    # A finished context refuses further calls instead of absorbing a second length block
+    for call in (streamed.finalize, lambda: streamed.verify(sealed[-16:]), lambda: streamed.update_aad(aad)):
+        try:
+            call()
+            print("SNOW-V-GCM context accepted a call after finalize().")
+            sys.exit(1)
+        except ValueError:
+            pass
+
+    tampered = bytearray(sealed)
+    tampered[0] ^= 1
+    try:
+        SnowVGCM.open(key, iv, aad, bytes(tampered))
+    except ValueError:
+        print("SNOW-V-GCM tags match and tampering is detected.\n")
+        return
+    print("SNOW-V-GCM accepted a tampered ciphertext.")
+    sys.exit(1)
+
+def test_snowv_seek():
+    """
+    Seek a stream backwards and forwards through a checkpoint index, to the end, and far
+    ahead without an index; check that a failed seek leaves a SnowVFile where it was.
+    """
+    import io
+    from snowV import SnowVStream, SnowVCheckpoints
+
+    vector = TEST_VECTORS[0]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])
+    data = bytes(i % 251 for i in range(5000))
+    ciphertext = SnowVStream(key, iv).update(data)
+
+    stream = SnowVStream(key, iv)
+    checkpoints = stream.track_checkpoints(interval=4)  # A checkpoint every 64 bytes
+    ok = stream.update(ciphertext) == data
+    for offset, length in ((100, 100), (3, 61), (3000, 1500), (64, 64), (4999, 1), (5000, 0)):
+        ok = ok and stream.seek(offset) == offset and stream.update(ciphertext[offset:offset + length]) \
+            == data[offset:offset + length]
+    restored = SnowVStream(key, iv)  # Index stored next to the ciphertext and loaded again
+    restored.track_checkpoints(checkpoints=SnowVCheckpoints.from_bytes(checkpoints.to_bytes()))
+    restored.seek(1234)
+    ok = ok and restored.update(ciphertext[1234:2000]) == data[1234:2000]
+
+    # Without an index: forward skips span several scratch chunks, backward seeks fail
+    far = 70000 * 16 + 5
+    reference = SnowVStream(key, iv)
+    reference.update(bytes(far))
+    stream = SnowVStream(key, iv)
+    stream.seek(far)
+    ok = ok and stream.update(bytes(40)) == reference.update(bytes(40))
+
+    wrapper = SnowVStream(key, iv).open_encrypted(io.BytesIO(ciphertext))
+    first = wrapper.read(100)
+    try:
+        wrapper.seek(10)
+        ok = False
+    except ValueError:
+        pass
+    wrapper.seek(200, io.SEEK_CUR)
+    ok = ok and first == data[:100] and wrapper.tell() == 300 and wrapper.read(50) == data[300:350]
+    if not ok:
+        print("Stream seek mismatch.")
+        sys.exit(1)
+    print("\nStream seeks continue the keystream at the right offset.")
+
+
+def test_snowv_setup_cache():
+    """
+    Check SnowVSetupCache hits, misses and LRU eviction, that ciphers served from the cache
+    do not share state with the cached entry, and SnowVCipher.clone/restore.
+    """
+    from snowV import SnowVSetupCache
+
+    key = hexstr_to_bytes(TEST_VECTORS[1]['key'])
+    ivs = [bytes([i]) * 16 for i in range(3)]
+
+    def fresh_keystream(iv, length, is_aead_mode=False):
+        cipher = SnowVCipher()
+        cipher.keyiv_setup(key, iv, is_aead_mode)
+        return cipher.generate_keystream(length)
+
+    cache = SnowVSetupCache(maxsize=2)
+    first = cache.new_cipher(key, ivs[0])  # Miss
+    ok = first.generate_keystream(64) == fresh_keystream(ivs[0], 64)
+    second = cache.new_cipher(key, ivs[0])  # Hit; advancing first must not have moved the entry
+    ok = ok and second.generate_keystream(64) == fresh_keystream(ivs[0], 64)
+    third = cache.new_cipher(key, ivs[0])  # Hit; nor must advancing second
+    ok = ok and third.generate_keystream(32) == fresh_keystream(ivs[0], 32)
+    ok = ok and cache.stats() == {'hits': 2, 'misses': 1, 'size': 1, 'maxsize': 2}
+
+    cache.new_cipher(key, ivs[1])  # Miss
+    cache.new_cipher(key, ivs[0])  # Hit, so ivs[1] becomes the least recently used
+    cache.new_cipher(key, ivs[2])  # Miss, evicts ivs[1]
+    cache.new_cipher(key, ivs[0])  # Still cached
+    aead = cache.new_cipher(key, ivs[0], is_aead_mode=True)  # The mode is part of the cache key
+    ok = ok and aead.generate_keystream(32) == fresh_keystream(ivs[0], 32, is_aead_mode=True)
+    ok = ok and cache.stats() == {'hits': 4, 'misses': 4, 'size': 2, 'maxsize': 2}
+    cache.new_cipher(key, ivs[1])  # Evicted earlier, so a miss again
+    ok = ok and cache.misses == 5 and len(cache) == 2
+
+    # clone continues like the original; restore rewinds to a saved state
+    cipher = SnowVCipher()
+    cipher.keyiv_setup(key, ivs[2])
+    cipher.generate_keystream(48)
+    saved = cipher.clone()
+    ahead = cipher.generate_keystream(80)
+    ok = ok and saved.generate_keystream(80) == ahead == fresh_keystream(ivs[2], 128)[48:]
+    rewound = SnowVCipher()
+    rewound.keyiv_setup(key, ivs[0])
+    checkpoint = cipher.clone()
+    rewound.restore(checkpoint)
+    ok = ok and rewound.generate_keystream(32) == cipher.generate_keystream(32) \
+        and checkpoint.generate_keystream(32) == fresh_keystream(ivs[2], 160)[128:]
+    if not ok:
+        print("Setup cache or clone/restore mismatch.")
+        sys.exit(1)
+    print("\nSetup cache and clone/restore reproduce fresh setups.")
+
+
+def test_snowv_key_schedule():
+    """
+    Check that a bound key gives the same packets as a full keyiv_setup per IV.
+    """
+    from snowV import PySnowVCipher, bind_key
+
+    for vector in TEST_VECTORS:
+        key = hexstr_to_bytes(vector['key'])
+        ivs = [hexstr_to_bytes(vector['iv'])] + [bytes([i]) * 16 for i in range(3)]
+        payloads = [bytes(range(n)) for n in (0, 1, 16, 40)]
+        for is_aead_mode in (False, True):
+            expected = []
+            for iv, payload in zip(ivs, payloads):
+                cipher = PySnowVCipher()
+                cipher.keyiv_setup(key, iv, is_aead_mode)
+                expected.append(cipher.encrypt(payload))
+            schedule = bind_key(key, is_aead_mode)
+            pure = [schedule.setup(PySnowVCipher(), iv).encrypt(p) for iv, p in zip(ivs, payloads)]
+            if schedule.encrypt_many(ivs, payloads) != expected or pure != expected:
+                print(f"Bound key output mismatch (AEAD mode: {is_aead_mode}).")
+                sys.exit(1)
+    for cipher in (PySnowVCipher(), SnowVCipher()):
+        try:
+            bind_key(key).setup(cipher, b'x' * 12)  # A short IV must not be zero-padded
+            print("Bound key setup accepted a 12-byte IV.")
+            sys.exit(1)
+        except ValueError:
+            pass
+    print("\nBound key schedule matches per-packet setup.")
+
+
+def test_snowv_segments():
+    """
+    Check the segmented container against per-segment ciphers and round-trip it.
+    """
+    import os
+    import struct
+    import tempfile
+    from snowV import PySnowVCipher
+    from snowV_Segments import decrypt_file, decrypt_segment, decrypt_segmented, encrypt_file, encrypt_segmented, \
+        read_header, segment_iv
+
+    vector = TEST_VECTORS[1]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])[:12]  # Nonce; the segment counter fills the last 4 IV bytes
+    plaintext = bytes(i % 251 for i in range(1000))
+    container = encrypt_segmented(key, iv, plaintext, segment_size=300, jobs=2)
+
+    expected = b''
+    for index, offset in enumerate(range(0, len(plaintext), 300)):
+        cipher = PySnowVCipher()
+        cipher.keyiv_setup(key, segment_iv(iv, index))
+        expected += cipher.encrypt(plaintext[offset:offset + 300])
+    if not container.endswith(expected):
+        print("Segmented container ciphertext mismatch.")
+        sys.exit(1)
+    if decrypt_segmented(key, container, jobs=2) != plaintext or decrypt_segment(key, container, 3) != plaintext[900:]:
+        print("Segmented container round trip failed.")
+        sys.exit(1)
+    for bad_index in (-1, 4):
+        try:
+            decrypt_segment(key, container, bad_index)
+            print(f"Segment index {bad_index} was accepted.")
+            sys.exit(1)
+        except ValueError:
+            pass
+
+    # Adjacent nonces never share a segment IV, and IVs with a non-zero counter are rejected
+    neighbour = iv[:11] + bytes([iv[11] ^ 1])
+    if {segment_iv(iv, i) for i in range(100)} & {segment_iv(neighbour, i) for i in range(100)}:
+        print("Segment IVs of adjacent nonces overlap.")
+        sys.exit(1)
+    for bad_iv in (iv + b'\0\0\0\1', iv[:8]):
+        try:
+            encrypt_segmented(key, bad_iv, plaintext)
+            print("Segmented container accepted an unsuitable base IV.")
+            sys.exit(1)
+        except ValueError:
+            pass
+
+    # Decryption follows the segment table: swap the first two segments in the payload and the table
+    header = read_header(container)
+    (first, size), (second, _) = header.table[:2]
+    moved = bytearray(container)
+    moved[first:first + size], moved[second:second + size] = container[second:second + size], container[first:first + size]
+    table_start = len(container) - header.length - 16 * header.segment_count  # Entries of 16 bytes each
+    struct.pack_into('<QQQQ', moved, table_start, second, size, first, size)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'moved.snvs')
+        with open(path, 'wb') as container_file:
+            container_file.write(moved)
+        decrypt_file(key, path, path + '.out', jobs=2)
+        with open(path + '.out', 'rb') as plaintext_file:
+            from_file = plaintext_file.read()
+        for same_file in (lambda: encrypt_file(key, iv, path, path), lambda: decrypt_file(key, path, path)):
+            try:
+                same_file()  # Would truncate the input before reading it
+                print("Segmented file functions accepted the input file as output.")
+                sys.exit(1)
+            except ValueError:
+                pass
+    malformed = bytearray(container)
+    malformed[8:12] = bytes(4)  # Segment size 0
+    try:
+        read_header(malformed)
+        from_file = None
+    except ValueError:
+        pass
+    if decrypt_segmented(key, moved, jobs=2) != plaintext or from_file != plaintext:
+        print("Segmented container decryption ignores the segment table.")
+        sys.exit(1)
+    print("\nSegmented container matches per-segment encryption.")
+
+
+def test_snowv_async():
+    """
+    Send mixed small and offloaded writes over a socket pair and decrypt them on the other end.
+    """
+    import asyncio
+    import socket
+    from snowV import SnowVStream
+    from snowV_Async import SnowVStreamReader, SnowVStreamWriter, wrap_streams
+
+    vector = TEST_VECTORS[0]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])
+    messages = [bytes([n % 256]) * n for n in (1, 5000, 17, 3000, 40)]
+    payload = b''.join(messages)
+
+    async def exchange():
+        left, right = socket.socketpair()
+        left_streams = await asyncio.open_connection(sock=left)
+        right_streams = await asyncio.open_connection(sock=right)
+        _, writer = wrap_streams(*left_streams, key, iv[::-1], iv, offload_threshold=1024)
+        reader, _ = wrap_streams(*right_streams, key, iv, iv[::-1], offload_threshold=1024)
+        for message in messages:
+            writer.write(message)
+        await writer.drain()
+        writer.close()
+        received = await reader.readexactly(len(payload))
+        right_streams[1].close()
+        return received, writer.stream.position
+
+    async def exchange_prefetched():
+        # Both streams start 5 bytes in, so the writer first uses up keystream left in its stream
+        left, right = socket.socketpair()
+        _, left_writer = await asyncio.open_connection(sock=left)
+        right_reader, right_writer = await asyncio.open_connection(sock=right)
+        streams = [SnowVStream(key, iv), SnowVStream(key, iv)]
+        for stream in streams:
+            stream.update(bytes(5))
+        writer = SnowVStreamWriter(left_writer, streams[0], offload_threshold=1024, prefetch=4096)
+        reader = SnowVStreamReader(right_reader, streams[1], offload_threshold=1024)
+        for message in messages:
+            writer.write(message)
+        await writer.drain()
+        writer.close()
+        received = await reader.readexactly(len(payload))
+        right_writer.close()
+        # The writer's stream can be handed off after close, mid-block
+        handed_off = SnowVStream.from_state(writer.stream.export_state())
+        if handed_off.update(bytes(40)) != streams[1].update(bytes(40)):
+            received = None
+        return received, writer.stream.position - 5
+
+    for run in (exchange, exchange_prefetched):
+        received, position = asyncio.run(run())
+        if received != payload or position != len(payload):
+            print(f"asyncio stream round trip failed ({run.__name__}).")
+            sys.exit(1)
+
+    # Prefetched blocks would be missing from a checkpoint index, so such streams are refused
+    tracked = SnowVStream(key, iv)
+    tracked.track_checkpoints(interval=4)
+    try:
+        SnowVStreamWriter(None, tracked, prefetch=4096)
+        print("Prefetching writer accepted a stream with a checkpoint index.")
+        sys.exit(1)
+    except ValueError:
+        pass
+    print("\nasyncio streams round-trip mixed inline and offloaded writes.")
+
+
+def test_snowv_prefetch():
+    """
+    Check that prefetched keystream continues without gaps across ring wraps and underruns.
+    """
+    from snowV import SnowVCipher
+    from snowV_Prefetch import SnowVPrefetcher
+
+    vector = TEST_VECTORS[2]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])
+    reference = SnowVCipher()
+    reference.keyiv_setup(key, iv)
+    expected = reference.generate_keystream(1000)
+
+    cipher = SnowVCipher()
+    cipher.keyiv_setup(key, iv)
+    # A tiny ring forces wraps, refills from odd fill levels and underruns
+    with SnowVPrefetcher(cipher, capacity=96, low_watermark=20, high_watermark=90, chunk_size=32) as prefetcher:
+        keystream = b''.join(prefetcher.keystream(n) for n in (1, 15, 33, 100, 7, 844))
+        stats = prefetcher.stats()
+    if keystream != expected or stats['consumed'] != 1000 or stats['underruns'] == 0:
+        print("Prefetched keystream mismatch.")
+        sys.exit(1)
+
+    # After close() the cipher continues at the block holding the last byte handed out
+    cipher = SnowVCipher()
+    cipher.keyiv_setup(key, iv)
+    with SnowVPrefetcher(cipher, capacity=256, chunk_size=64) as prefetcher:
+        prefetcher.keystream(100)
+    if cipher.generate_keystream(48) != expected[96:144]:
+        print("Prefetcher did not rewind the cipher on close().")
+        sys.exit(1)
+
+    # close() while a consumer waits on an empty buffer must wake it with an error
+    import threading
+    import time
+    gate = threading.Event()
+
+    class StalledCipher:
+        def keystream_into(self, buffer):
+            gate.wait()  # Keep the worker busy until the consumer has given up
+
+        def _state_bytes(self):
+            return b''
+
+        def _load_state_bytes(self, state):
+            pass
+
+    prefetcher = SnowVPrefetcher(StalledCipher(), capacity=64, chunk_size=16)
+    errors = []
+
+    def consume():
+        try:
+            prefetcher.keystream(32)
+        except ValueError as error:
+            errors.append(error)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    while not prefetcher._waiting:
+        time.sleep(0.001)
+    closer = threading.Thread(target=prefetcher.close)
+    closer.start()
+    consumer.join(5)
+    gate.set()
+    closer.join()
+    if consumer.is_alive() or not errors:
+        print("Prefetcher consumer was not woken by close().")
+        sys.exit(1)
+    print("\nPrefetched keystream matches the cipher.")
+
+
+def test_snowv_instrumentation():
+    """
+    Check the instrumentation counters and that the original methods come back afterwards.
+    """
+    from snowV import SnowVCipher, instrumentation
+
+    vector = TEST_VECTORS[0]
+    key = hexstr_to_bytes(vector['key'])
+    iv = hexstr_to_bytes(vector['iv'])
+    original = SnowVCipher.encrypt_into
+    with instrumentation.region(timing=True) as report:
+        cipher = SnowVCipher()
+        cipher.keyiv_setup(key, iv)
+        ciphertext = cipher.encrypt(bytes(100))
+        cipher.generate_keystream(20)
+        SnowVCipher(record_init_z=True).keyiv_setup(key, iv)  # Recorded initialization rounds are not output
+    counters = report.counters
+    expected = {'setups': 2, 'blocks': 9, 'bytes_encrypted': 100, 'bytes_keystream': 20, 'keyiv_setup_calls': 2}
+    if any(counters[name] != value for name, value in expected.items()) or ciphertext[:16] != hexstr_to_bytes(vector['z'][0]):
+        print(f"Instrumentation counters mismatch: {counters}")
+        sys.exit(1)
+    if instrumentation.mode is not None or SnowVCipher.encrypt_into is not original:
+        print("Instrumentation was not switched off after the region.")
+        sys.exit(1)
+    print("\nInstrumentation counts setups, blocks and bytes.")
+
+
+def test_snowv_lfsr():
+    """
+    Check the LFSR jump-ahead against stepping, and the keystream of the decoupled LFSR/FSM passes.
+    The NumPy lane split of the sequence is checked when NumPy is installed.
+    """
+    from snowV import SnowVCipher, _lfsr_step8
+    from snowV_LFSR import keystream_from_sequence, lfsr_jump, lfsr_sequence, lfsr_sequence_lanes
+
+    vector = TEST_VECTORS[0]
+    cipher = SnowVCipher()
+    cipher.keyiv_setup(hexstr_to_bytes(vector['key']), hexstr_to_bytes(vector['iv']))
+    a, b = cipher._a, cipher._b
+    for _ in range(100):
+        a, b = _lfsr_step8(a, b)
+    if lfsr_jump(cipher._a, cipher._b, 100) != (a, b):
+        print("LFSR jump-ahead mismatch.")
+        sys.exit(1)
+    t1, t2, _, _ = lfsr_sequence(cipher._a, cipher._b, len(vector['z']))
+    blocks, _, _, _ = keystream_from_sequence(t1, t2, cipher._r1, cipher._r2, cipher._r3)
+    if [block.to_bytes(16, 'little') for block in blocks] != [hexstr_to_bytes(z) for z in vector['z']]:
+        print("Keystream from the precomputed LFSR sequence mismatch.")
+        sys.exit(1)
+
+    try:
+        import numpy as np
+    except ImportError:
+        print("NumPy not available, skipping lane-split LFSR sequence test.")
+        np = None
+    if np is not None:
+        def cells(words):
+            # Packed 128-bit words as rows of eight 16-bit cells, as lfsr_sequence_lanes returns them
+            return np.frombuffer(b''.join(word.to_bytes(16, 'little') for word in words), dtype='<u2').reshape(-1, 8)
+
+        # Counts that do not split evenly into the lanes, fewer blocks than lanes, and none at all
+        for count, lanes in ((0, 4), (1, 4), (3, 4), (37, 4), (100, 7), (64, 256)):
+            t1, t2, a, b = lfsr_sequence(cipher._a, cipher._b, count)
+            l1, l2, la, lb = lfsr_sequence_lanes(cipher._a, cipher._b, count, lanes)
+            if l1.shape != (count, 8) or not (np.array_equal(l1, cells(t1)) and np.array_equal(l2, cells(t2))) \
+                    or (la, lb) != (a, b):
+                print(f"Lane-split LFSR sequence mismatch ({count} blocks, {lanes} lanes).")
+                sys.exit(1)
+    print("\nLFSR jump-ahead and sequence generation match stepping.")
+
+
+def test_snowv_multi_buffer():
+    """
+    Encrypt streams of mixed lengths in one call and compare with one stream at a time.
+    With the native core, every multi-buffer kernel this CPU supports is checked.
+    """
+    from snowV import PySnowVCipher, encrypt_into_many, keystream_into_many
+
+    key = hexstr_to_bytes(TEST_VECTORS[1]['key'])
+    lengths = [0, 5, 16, 33, 64, 100, 257, 1000, 16, 48, 7, 500]
+    ivs = [bytes([i]) * 16 for i in range(len(lengths))]
+    srcs = [bytes(i % 251 for i in range(length)) for length in lengths]
+    expected = []
+    for iv, src in zip(ivs, srcs):
+        reference = PySnowVCipher()
+        reference.keyiv_setup(key, iv)
+        expected.append(reference.encrypt(src))
+
+    backends = [None]  # encrypt_into_many with the default kernel, or pure Python without the native core
+    if SnowVCipher._native is not None:
+        backends += ['portable', 'aesni-x2', 'vaes-x4']
+    for backend in backends:
+        ciphers = []
+        for iv in ivs:
+            cipher = SnowVCipher()
+            cipher.keyiv_setup(key, iv)
+            ciphers.append(cipher)
+        dsts = [bytearray(length) for length in lengths]
+        if backend is None:
+            encrypt_into_many(ciphers, srcs, dsts)
+        else:
+            states = [cipher._state_bytes() for cipher in ciphers]
+            try:
+                SnowVCipher._native.encrypt_into_many(states, srcs, dsts, backend=backend)
+            except ValueError:
+                continue  # Kernel not supported on this CPU
+        if [bytes(dst) for dst in dsts] != expected:
+            print(f"Multi-buffer encryption mismatch (backend {backend or 'default'}).")
+            sys.exit(1)
+
+    # The same cipher twice would give both buffers the same keystream
+    for call in (lambda: encrypt_into_many([ciphers[0]] * 2, srcs[:2], [bytearray(8), bytearray(8)]),
+                 lambda: keystream_into_many([ciphers[0]] * 2, [bytearray(8), bytearray(8)])):
+        try:
+            call()
+            print("Multi-buffer call accepted the same cipher twice.")
+            sys.exit(1)
+        except ValueError:
+            pass
+    print("\nMulti-buffer encryption matches one stream at a time.")
+
+
+def test_snowv_state_blob():
+    """
+    Hand a stream over mid-block through an exported state blob and through pickle.
+    """
+    import pickle
+    from snowV import PySnowVCipher, SnowVStream, STATE_BLOB_SIZE
+
+    vector = TEST_VECTORS[2]
+    expected = hexstr_to_bytes(' '.join(vector['z']))
+    stream = SnowVStream(hexstr_to_bytes(vector['key']), hexstr_to_bytes(vector['iv']))
+    first = stream.update(bytes(21))  # Leaves 11 bytes of keystream over from the second block
+    blob = stream.export_state()
+    moved = SnowVStream.from_state(blob, cipher_class=PySnowVCipher)  # Native and pure blobs are interchangeable
+    copied = pickle.loads(pickle.dumps(stream))
+    rest = len(expected) - len(first)
+    if len(blob) != STATE_BLOB_SIZE or first + moved.update(bytes(rest)) != expected \
+            or first + copied.update(bytes(rest)) != expected:
+        print("Stream state handoff mismatch.")
+        sys.exit(1)
+    print("\nExported stream state continues the keystream.")
+
+
+def test_snowv_lanes():
+    """
+    Run all test vectors at once through the NumPy multi-lane engine, one vector per lane.
+    Skipped when NumPy is not installed.
+    """
+    try:
+        import numpy as np
+        from snowV_Lanes import keystream_lanes
+    except ImportError:
+        print("NumPy not available, skipping multi-lane test.\n")
+        return
+
+    keys = np.array([list(hexstr_to_bytes(vector['key'])) for vector in TEST_VECTORS], dtype=np.uint8)
+    ivs = np.array([list(hexstr_to_bytes(vector['iv'])) for vector in TEST_VECTORS], dtype=np.uint8)
+    keystreams = keystream_lanes(keys, ivs, 16 * len(TEST_VECTORS[0]['z']))
+
+    for idx, vector in enumerate(TEST_VECTORS):
+        expected_bytes = hexstr_to_bytes(' '.join(vector['z']))  # All keystream blocks of this vector
+        actual_bytes = keystreams[idx].tobytes()  # Keystream of the matching lane
+        if actual_bytes != expected_bytes:
+            print(f"Multi-lane keystream mismatch in lane {idx}.")
+            sys.exit(1)
+    print("Multi-lane keystream matches the test vectors.\n")
+
+
+def test_snowv_session_table():
+    """
+    Drive a session table through adds, a removal with id reuse and batches over subsets,
+    and compare every session with its own cipher. Both batch backends are checked when
+    the native core is built. Skipped when NumPy is not installed.
+    """
+    try:
+        from snowV_Lanes import SessionTable
+    except ImportError:
+        print("NumPy not available, skipping session table test.\n")
+        return
+    from snowV import PySnowVCipher
+
+    key = hexstr_to_bytes(TEST_VECTORS[2]['key'])
+    ivs = [bytes([i]) * 16 for i in range(6)]
+    for native in ([False, True] if SnowVCipher._native is not None else [False]):
+        table = SessionTable(capacity=2, native=native)  # Small, so the table has to grow
+        sessions = {}
+        for idx, iv in enumerate(ivs):
+            reference = PySnowVCipher()
+            reference.keyiv_setup(key, iv, is_aead_mode=idx == 4)
+            sessions[table.add(key, iv, is_aead_mode=idx == 4)] = reference
+        del sessions[2]
+        table.remove(2)
+        reused = table.add_state(sessions[0].export_state())  # Takes over the freed id
+        sessions[reused] = PySnowVCipher.from_state(sessions[0].export_state())
+
+        subset = [5, reused, 1, 4]
+        payloads = [bytes(range(length)) for length in (0, 17, 48, 100)]
+        outputs = table.encrypt(subset, payloads)
+        table.advance(subset[:2], [4200, 1])  # Longer than one scratch buffer of skipped keystream
+        expected = [sessions[sid].encrypt(payload) for sid, payload in zip(subset, payloads)]
+        sessions[5].keystream_into(bytearray(4200 * 16))
+        sessions[reused].keystream_into(bytearray(16))
+        keystreams = table.keystream(sorted(sessions), 40)
+        for row, sid in enumerate(sorted(sessions)):
+            block = bytearray(40)
+            sessions[sid].keystream_into(block)
+            if keystreams[row].tobytes() != bytes(block):
+                outputs = None
+        if outputs != expected or table.export_state(4) != sessions[4].export_state():
+            print(f"Session table mismatch ({'native' if native else 'multi-lane'} backend).")
+            sys.exit(1)
+    print("Session table matches one cipher per session.\n")
 
 
 if __name__ == "__main__":
     test_snowv_with_init_z()  # Run the test vectors verification
+    test_snowv_buffers()  # Check the caller-owned buffer API
+    test_snowv_stream()  # Check incremental encryption across calls
+    test_snowv_native()  # Run the test vectors through the native core
+    test_snowv_gcm()  # Check the AEAD mode
+    test_snowv_seek()  # Check seeking through the checkpoint index
+    test_snowv_setup_cache()  # Check the key/IV setup cache and cipher snapshots
+    test_snowv_key_schedule()  # Check one key with many IVs
+    test_snowv_segments()  # Check the parallel segmented container
+    test_snowv_async()  # Check the asyncio stream wrappers
+    test_snowv_prefetch()  # Check the prefetching keystream source
+    test_snowv_instrumentation()  # Check the hot-path counters
+    test_snowv_lfsr()  # Check the LFSR jump-ahead
+    test_snowv_multi_buffer()  # Check the multi-buffer kernels
+    test_snowv_state_blob()  # Check the exported stream state
+    test_snowv_lanes()  # Run the test vectors through the multi-lane engine
+    test_snowv_session_table()  # Check batches over a session table
 
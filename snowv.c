@@ -1,7 +1,32 @@
 // SNOW-V 32-bit Reference Implementation (Windows-Compatible High-Resolution Timing)
+// Define SNOWV_NO_MAIN to use this file as a library (the Python extension does).
 #include <stdint.h>
 #include <stdlib.h>
 #include <string.h>  // For memcpy
+
+// AES-NI path: compiled on x86 with GCC/Clang/MSVC, selected at runtime with CPUID
+#if (defined(__x86_64__) || defined(__i386__) || defined(_M_X64) || defined(_M_IX86)) && !defined(SNOWV_NO_AESNI)
+#define SNOWV_HAVE_AESNI 1
+#include <immintrin.h>
+#if defined(_MSC_VER)
+#include <intrin.h>  // For __cpuid
+#define SNOWV_TARGET_AESNI
+#else
+#include <cpuid.h>   // For __get_cpuid
+#define SNOWV_TARGET_AESNI __attribute__((target("aes,sse4.1")))
+#endif
+// VAES/AVX2 multi-buffer path: two streams per 256-bit register (GCC 8+, Clang 6+, MSVC 2019+)
+#if !defined(SNOWV_NO_VAES) && (defined(_MSC_VER) || defined(__clang__) || (defined(__GNUC__) && __GNUC__ >= 8))
+#define SNOWV_HAVE_VAES 1
+#if defined(_MSC_VER)
+#define SNOWV_TARGET_VAES
+#else
+#define SNOWV_TARGET_VAES __attribute__((target("avx2,vaes,aes")))
+#endif
+#endif
+#endif
+
+#ifndef SNOWV_NO_MAIN
 #include <stdio.h>   // For printf
 #include <math.h>    // For sqrt
 
@@ -10,10 +35,12 @@
 #else
 #include <time.h>    // For clock_gettime, struct timespec
 #endif
+#endif
 
 typedef uint8_t u8;
 typedef uint16_t u16;
 typedef uint32_t u32;
+typedef uint64_t u64;
 
 u8 SBox[256] = {
     0x63, 0x7C, 0x77, 0x7B, 0xF2, 0x6B, 0x6F, 0xC5,
@@ -58,10 +85,19 @@ u8 Sigma[16] = {0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15};
 struct SnowV32 {
     u16 A[16], B[16];     // LFSR
     u32 R1[4], R2[4], R3[4]; // FSM
-    u32 AesKey1[4];
-    u32 AesKey2[4];
 };
 
+// GHASH multiplication tables for one hash key H (Shoup's 4-bit method)
+struct GHashKey {
+    u64 HL[16], HH[16];  // Low and high halves of i*H for every 4-bit i
+};
+
+// Serialized state: A, B as little-endian u16, then R1, R2, R3 as little-endian u32
+#define SNOWV_STATE_BYTES 112
+
+// The FSM's AES rounds use an all-zero round key
+static const u32 ZeroKey[4] = {0, 0, 0, 0};
+
 // Function prototypes
 void aes_enc_round(struct SnowV32* ctx, u32* result, u32* state, u32* roundKey);
 u16 mul_x(u16 v, u16 c);
@@ -71,6 +107,23 @@ void fsm_update(struct SnowV32* ctx);
 void lfsr_update(struct SnowV32* ctx);
 void keystream(struct SnowV32* ctx, u8* z);
 void keyiv_setup(struct SnowV32* ctx, u8* key, u8* iv, int is_aead_mode);
+void snowv_encrypt(struct SnowV32* ctx, const u8* in, u8* out, size_t len);
+void snowv_keystream_bytes(struct SnowV32* ctx, u8* out, size_t len);
+void snowv_get_state(const struct SnowV32* ctx, u8* state);
+void snowv_set_state(struct SnowV32* ctx, const u8* state);
+int snowv_has_aesni(void);
+const char* snowv_backend(void);
+int snowv_multi_supported(int kernel);
+const char* snowv_multi_backend(void);
+void snowv_encrypt_xN_with(int kernel, struct SnowV32* const ctxs[], const u8* const ins[], u8* const outs[],
+                           const size_t lens[], size_t n);
+void snowv_encrypt_xN(struct SnowV32* const ctxs[], const u8* const ins[], u8* const outs[],
+                      const size_t lens[], size_t n);
+void snowv_keystream_xN(struct SnowV32* const ctxs[], u8* const outs[], const size_t lens[], size_t n);
+void ghash_init_key(struct GHashKey* key, const u8* h);
+void ghash_update(const struct GHashKey* key, u8* x, const u8* data, size_t len);
+void snowv_gcm_crypt(const u8* key, const u8* iv, const u8* aad, size_t aad_len,
+                     const u8* in, u8* out, size_t len, int encrypt, u8* tag);
 
 void aes_enc_round(struct SnowV32* ctx, u32* result, u32* state, u32* roundKey) {
     #define ROTL32(word32, offset) ((word32 << offset) | (word32 >> (32 - offset)))
@@ -125,8 +178,8 @@ void fsm_update(struct SnowV32* ctx) {
         ctx->R1[i] = (T2 ^ ctx->R3[i]) + ctx->R2[i];
     }
     permute_sigma(ctx->R1);
-    aes_enc_round(ctx, ctx->R3, ctx->R2, ctx->AesKey2);
-    aes_enc_round(ctx, ctx->R2, R1temp, ctx->AesKey1);
+    aes_enc_round(ctx, ctx->R3, ctx->R2, (u32*)ZeroKey);
+    aes_enc_round(ctx, ctx->R2, R1temp, (u32*)ZeroKey);
 }
 
 void lfsr_update(struct SnowV32* ctx) {
@@ -175,14 +228,6 @@ void keyiv_setup(struct SnowV32* ctx, u8* key, u8* iv, int is_aead_mode) {
     for (int i = 0; i < 4; i++)
         ctx->R1[i] = ctx->R2[i] = ctx->R3[i] = 0x00000000;
 
-    // Initialize AesKey1 and AesKey2
-    for (int i = 0; i < 4; i++) {
-        ctx->AesKey1[i] = MAKEU32(MAKEU16(key[4 * i + 3], key[4 * i + 2]),
-                                 MAKEU16(key[4 * i + 1], key[4 * i + 0]));
-        ctx->AesKey2[i] = MAKEU32(MAKEU16(key[4 * i + 19], key[4 * i + 18]),
-                                 MAKEU16(key[4 * i + 17], key[4 * i + 16]));
-    }
-
     for (int i = 0; i < 16; i++) {
         u8 z[16];
         keystream(ctx, z);
@@ -199,6 +244,549 @@ void keyiv_setup(struct SnowV32* ctx, u8* key, u8* iv, int is_aead_mode) {
     }
 }
 
+#ifdef SNOWV_HAVE_AESNI
+// Vectorized SNOW-V as in the design paper: each LFSR half lives in a 128-bit
+// register, the FSM rounds are AESENC with a zero key and Sigma is a byte shuffle.
+
+#define MUL_X_128(v, c) _mm_xor_si128(_mm_slli_epi16(v, 1), \
+    _mm_and_si128(_mm_srai_epi16(v, 15), _mm_set1_epi16((short)(c))))
+#define MUL_X_INV_128(v, d) _mm_xor_si128(_mm_srli_epi16(v, 1), \
+    _mm_and_si128(_mm_srai_epi16(_mm_slli_epi16(v, 15), 15), _mm_set1_epi16((short)(d))))
+
+// One keystream block of one stream held in registers: write it to out (XORed with in unless
+// in is NULL), then clock the FSM and eight LFSR steps
+#define SNOWV_BLOCK_128(alo, ahi, blo, bhi, r1, r2, r3, in, out) do { \
+        /* Keystream: z = (T1 + R1) ^ R2 with T1 = B[8..15] */ \
+        __m128i z_ = _mm_xor_si128(_mm_add_epi32(bhi, r1), r2); \
+        if ((in) != NULL) \
+            z_ = _mm_xor_si128(z_, _mm_loadu_si128((const __m128i*)(in))); \
+        _mm_storeu_si128((__m128i*)(out), z_); \
+        /* FSM: R1 = Sigma((T2 ^ R3) + R2) with T2 = A[0..7], R3 = AES(R2), R2 = AES(R1) */ \
+        __m128i t2_ = _mm_add_epi32(_mm_xor_si128(alo, r3), r2); \
+        r3 = _mm_aesenc_si128(r2, zero); \
+        r2 = _mm_aesenc_si128(r1, zero); \
+        r1 = _mm_shuffle_epi8(t2_, sigma); \
+        /* LFSR: eight steps at once, all feedback cells depend only on the current cells */ \
+        __m128i u_ = _mm_xor_si128(_mm_xor_si128(MUL_X_128(alo, 0x990F), _mm_alignr_epi8(ahi, alo, 2)), \
+                                   _mm_xor_si128(MUL_X_INV_128(ahi, 0xCC87), blo)); \
+        __m128i v_ = _mm_xor_si128(_mm_xor_si128(MUL_X_128(blo, 0xC963), _mm_alignr_epi8(bhi, blo, 6)), \
+                                   _mm_xor_si128(MUL_X_INV_128(bhi, 0xE4B1), alo)); \
+        alo = ahi; \
+        ahi = u_; \
+        blo = bhi; \
+        bhi = v_; \
+    } while (0)
+
+// Generate nblocks keystream blocks into out, XORed with in unless in is NULL
+SNOWV_TARGET_AESNI
+static void keystream_blocks_aesni(struct SnowV32* ctx, const u8* in, u8* out, size_t nblocks) {
+    const __m128i zero = _mm_setzero_si128();
+    const __m128i sigma = _mm_setr_epi8(0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15);
+    __m128i alo = _mm_loadu_si128((const __m128i*)ctx->A);
+    __m128i ahi = _mm_loadu_si128((const __m128i*)(ctx->A + 8));
+    __m128i blo = _mm_loadu_si128((const __m128i*)ctx->B);
+    __m128i bhi = _mm_loadu_si128((const __m128i*)(ctx->B + 8));
+    __m128i r1 = _mm_loadu_si128((const __m128i*)ctx->R1);
+    __m128i r2 = _mm_loadu_si128((const __m128i*)ctx->R2);
+    __m128i r3 = _mm_loadu_si128((const __m128i*)ctx->R3);
+
+    for (size_t n = 0; n < nblocks; n++)
+        SNOWV_BLOCK_128(alo, ahi, blo, bhi, r1, r2, r3, in != NULL ? in + 16 * n : NULL, out + 16 * n);
+
+    _mm_storeu_si128((__m128i*)ctx->A, alo);
+    _mm_storeu_si128((__m128i*)(ctx->A + 8), ahi);
+    _mm_storeu_si128((__m128i*)ctx->B, blo);
+    _mm_storeu_si128((__m128i*)(ctx->B + 8), bhi);
+    _mm_storeu_si128((__m128i*)ctx->R1, r1);
+    _mm_storeu_si128((__m128i*)ctx->R2, r2);
+    _mm_storeu_si128((__m128i*)ctx->R3, r3);
+}
+
+// Two independent streams interleaved block by block, so that the AESENC and LFSR chains of one
+// overlap with those of the other. More streams do not fit the 16 XMM registers and spill.
+#define SNOWV_AESNI_WAYS 2
+
+SNOWV_TARGET_AESNI
+static void keystream_blocks_aesni_x2(struct SnowV32* const* ctxs, const u8* const* ins, u8* const* outs,
+                                      size_t nblocks) {
+    const __m128i zero = _mm_setzero_si128();
+    const __m128i sigma = _mm_setr_epi8(0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15);
+    __m128i alo[SNOWV_AESNI_WAYS], ahi[SNOWV_AESNI_WAYS], blo[SNOWV_AESNI_WAYS], bhi[SNOWV_AESNI_WAYS];
+    __m128i r1[SNOWV_AESNI_WAYS], r2[SNOWV_AESNI_WAYS], r3[SNOWV_AESNI_WAYS];
+
+    for (int l = 0; l < SNOWV_AESNI_WAYS; l++) {
+        alo[l] = _mm_loadu_si128((const __m128i*)ctxs[l]->A);
+        ahi[l] = _mm_loadu_si128((const __m128i*)(ctxs[l]->A + 8));
+        blo[l] = _mm_loadu_si128((const __m128i*)ctxs[l]->B);
+        bhi[l] = _mm_loadu_si128((const __m128i*)(ctxs[l]->B + 8));
+        r1[l] = _mm_loadu_si128((const __m128i*)ctxs[l]->R1);
+        r2[l] = _mm_loadu_si128((const __m128i*)ctxs[l]->R2);
+        r3[l] = _mm_loadu_si128((const __m128i*)ctxs[l]->R3);
+    }
+    for (size_t n = 0; n < nblocks; n++)
+        for (int l = 0; l < SNOWV_AESNI_WAYS; l++)
+            SNOWV_BLOCK_128(alo[l], ahi[l], blo[l], bhi[l], r1[l], r2[l], r3[l],
+                            ins != NULL ? ins[l] + 16 * n : NULL, outs[l] + 16 * n);
+    for (int l = 0; l < SNOWV_AESNI_WAYS; l++) {
+        _mm_storeu_si128((__m128i*)ctxs[l]->A, alo[l]);
+        _mm_storeu_si128((__m128i*)(ctxs[l]->A + 8), ahi[l]);
+        _mm_storeu_si128((__m128i*)ctxs[l]->B, blo[l]);
+        _mm_storeu_si128((__m128i*)(ctxs[l]->B + 8), bhi[l]);
+        _mm_storeu_si128((__m128i*)ctxs[l]->R1, r1[l]);
+        _mm_storeu_si128((__m128i*)ctxs[l]->R2, r2[l]);
+        _mm_storeu_si128((__m128i*)ctxs[l]->R3, r3[l]);
+    }
+}
+
+#undef SNOWV_BLOCK_128
+
+#ifdef SNOWV_HAVE_VAES
+// The same round on 256-bit registers: the low lane holds one stream, the high lane another.
+// alignr, shuffle and AESENC all work within 128-bit lanes, so the code is unchanged.
+#define MUL_X_256(v, c) _mm256_xor_si256(_mm256_slli_epi16(v, 1), \
+    _mm256_and_si256(_mm256_srai_epi16(v, 15), _mm256_set1_epi16((short)(c))))
+#define MUL_X_INV_256(v, d) _mm256_xor_si256(_mm256_srli_epi16(v, 1), \
+    _mm256_and_si256(_mm256_srai_epi16(_mm256_slli_epi16(v, 15), 15), _mm256_set1_epi16((short)(d))))
+#define LOAD_PAIR(lo, hi) _mm256_inserti128_si256(_mm256_castsi128_si256( \
+    _mm_loadu_si128((const __m128i*)(lo))), _mm_loadu_si128((const __m128i*)(hi)), 1)
+#define STORE_PAIR(lo, hi, v) do { \
+        _mm_storeu_si128((__m128i*)(lo), _mm256_castsi256_si128(v)); \
+        _mm_storeu_si128((__m128i*)(hi), _mm256_extracti128_si256(v, 1)); \
+    } while (0)
+
+// Four independent streams as two register pairs; four pairs spill the 16 YMM registers
+#define SNOWV_VAES_WAYS 4
+#define SNOWV_VAES_PAIRS (SNOWV_VAES_WAYS / 2)
+
+SNOWV_TARGET_VAES
+static void keystream_blocks_vaes_x4(struct SnowV32* const* ctxs, const u8* const* ins, u8* const* outs,
+                                     size_t nblocks) {
+    const __m256i zero = _mm256_setzero_si256();
+    const __m256i sigma = _mm256_setr_epi8(0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15,
+                                           0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15);
+    __m256i alo[SNOWV_VAES_PAIRS], ahi[SNOWV_VAES_PAIRS], blo[SNOWV_VAES_PAIRS], bhi[SNOWV_VAES_PAIRS];
+    __m256i r1[SNOWV_VAES_PAIRS], r2[SNOWV_VAES_PAIRS], r3[SNOWV_VAES_PAIRS];
+
+    for (int p = 0; p < SNOWV_VAES_PAIRS; p++) {
+        const struct SnowV32* lo = ctxs[2 * p];
+        const struct SnowV32* hi = ctxs[2 * p + 1];
+        alo[p] = LOAD_PAIR(lo->A, hi->A);
+        ahi[p] = LOAD_PAIR(lo->A + 8, hi->A + 8);
+        blo[p] = LOAD_PAIR(lo->B, hi->B);
+        bhi[p] = LOAD_PAIR(lo->B + 8, hi->B + 8);
+        r1[p] = LOAD_PAIR(lo->R1, hi->R1);
+        r2[p] = LOAD_PAIR(lo->R2, hi->R2);
+        r3[p] = LOAD_PAIR(lo->R3, hi->R3);
+    }
+    for (size_t n = 0; n < nblocks; n++) {
+        for (int p = 0; p < SNOWV_VAES_PAIRS; p++) {
+            __m256i z = _mm256_xor_si256(_mm256_add_epi32(bhi[p], r1[p]), r2[p]);
+            if (ins != NULL)
+                z = _mm256_xor_si256(z, LOAD_PAIR(ins[2 * p] + 16 * n, ins[2 * p + 1] + 16 * n));
+            STORE_PAIR(outs[2 * p] + 16 * n, outs[2 * p + 1] + 16 * n, z);
+
+            __m256i t2 = _mm256_add_epi32(_mm256_xor_si256(alo[p], r3[p]), r2[p]);
+            r3[p] = _mm256_aesenc_epi128(r2[p], zero);
+            r2[p] = _mm256_aesenc_epi128(r1[p], zero);
+            r1[p] = _mm256_shuffle_epi8(t2, sigma);
+
+            __m256i u = _mm256_xor_si256(
+                _mm256_xor_si256(MUL_X_256(alo[p], 0x990F), _mm256_alignr_epi8(ahi[p], alo[p], 2)),
+                _mm256_xor_si256(MUL_X_INV_256(ahi[p], 0xCC87), blo[p]));
+            __m256i v = _mm256_xor_si256(
+                _mm256_xor_si256(MUL_X_256(blo[p], 0xC963), _mm256_alignr_epi8(bhi[p], blo[p], 6)),
+                _mm256_xor_si256(MUL_X_INV_256(bhi[p], 0xE4B1), alo[p]));
+            alo[p] = ahi[p];
+            ahi[p] = u;
+            blo[p] = bhi[p];
+            bhi[p] = v;
+        }
+    }
+    for (int p = 0; p < SNOWV_VAES_PAIRS; p++) {
+        struct SnowV32* lo = ctxs[2 * p];
+        struct SnowV32* hi = ctxs[2 * p + 1];
+        STORE_PAIR(lo->A, hi->A, alo[p]);
+        STORE_PAIR(lo->A + 8, hi->A + 8, ahi[p]);
+        STORE_PAIR(lo->B, hi->B, blo[p]);
+        STORE_PAIR(lo->B + 8, hi->B + 8, bhi[p]);
+        STORE_PAIR(lo->R1, hi->R1, r1[p]);
+        STORE_PAIR(lo->R2, hi->R2, r2[p]);
+        STORE_PAIR(lo->R3, hi->R3, r3[p]);
+    }
+}
+
+#undef MUL_X_256
+#undef MUL_X_INV_256
+#undef LOAD_PAIR
+#undef STORE_PAIR
+#undef SNOWV_VAES_PAIRS
+#endif
+
+#undef MUL_X_128
+#undef MUL_X_INV_128
+
+static int snowv_cpu_aesni = -1;  // -1 until CPUID has been queried
+
+int snowv_has_aesni(void) {
+    if (snowv_cpu_aesni < 0) {
+        unsigned int ecx;
+#if defined(_MSC_VER)
+        int info[4];
+        __cpuid(info, 1);
+        ecx = (unsigned int)info[2];
+#else
+        unsigned int eax, ebx, edx;
+        if (!__get_cpuid(1, &eax, &ebx, &ecx, &edx))
+            ecx = 0;
+#endif
+        // CPUID.1:ECX bit 25 is AES-NI, bit 19 is SSE4.1 (which implies SSSE3)
+        snowv_cpu_aesni = (ecx & (1u << 25)) && (ecx & (1u << 19));
+    }
+    return snowv_cpu_aesni;
+}
+
+#ifdef SNOWV_HAVE_VAES
+static int snowv_cpu_vaes = -1;  // -1 until CPUID has been queried
+
+static int snowv_has_vaes(void) {
+    if (snowv_cpu_vaes < 0) {
+        unsigned int ebx7 = 0, ecx7 = 0, ecx1 = 0;
+        unsigned long long xcr0 = 0;
+#if defined(_MSC_VER)
+        int info[4];
+        __cpuid(info, 1);
+        ecx1 = (unsigned int)info[2];
+        __cpuidex(info, 7, 0);
+        ebx7 = (unsigned int)info[1];
+        ecx7 = (unsigned int)info[2];
+        if (ecx1 & (1u << 27))
+            xcr0 = _xgetbv(0);
+#else
+        unsigned int eax, ebx, edx;
+        if (__get_cpuid(1, &eax, &ebx, &ecx1, &edx) && __get_cpuid_count(7, 0, &eax, &ebx7, &ecx7, &edx)
+                && (ecx1 & (1u << 27))) {
+            unsigned int lo, hi;
+            __asm__ volatile("xgetbv" : "=a"(lo), "=d"(hi) : "c"(0));
+            xcr0 = ((unsigned long long)hi << 32) | lo;
+        }
+#endif
+        // AVX2 is CPUID.7:EBX bit 5, VAES CPUID.7:ECX bit 9; the OS must save the YMM state (XCR0 bits 1, 2)
+        snowv_cpu_vaes = snowv_has_aesni() && (ebx7 & (1u << 5)) && (ecx7 & (1u << 9)) && (xcr0 & 6) == 6;
+    }
+    return snowv_cpu_vaes;
+}
+#endif
+#else
+int snowv_has_aesni(void) {
+    return 0;
+}
+#endif
+
+// Name of the keystream implementation used for bulk work on this CPU
+const char* snowv_backend(void) {
+    return snowv_has_aesni() ? "aesni" : "portable";
+}
+
+// Encrypt (or decrypt) len bytes; the unused tail of the last keystream block is discarded.
+// in and out may be the same buffer.
+void snowv_encrypt(struct SnowV32* ctx, const u8* in, u8* out, size_t len) {
+    u8 z[16];
+    size_t i = 0;
+#ifdef SNOWV_HAVE_AESNI
+    if (snowv_has_aesni()) {
+        keystream_blocks_aesni(ctx, in, out, len / 16);
+        i = len - len % 16;
+    }
+#endif
+    for (; i + 16 <= len; i += 16) {
+        keystream(ctx, z);
+        for (int j = 0; j < 16; j++)
+            out[i + j] = in[i + j] ^ z[j];
+    }
+    if (i < len) {
+        keystream(ctx, z);
+        for (size_t j = 0; i + j < len; j++)
+            out[i + j] = in[i + j] ^ z[j];
+    }
+}
+
+// Write len keystream bytes; the unused tail of the last keystream block is discarded.
+void snowv_keystream_bytes(struct SnowV32* ctx, u8* out, size_t len) {
+    u8 z[16];
+    size_t i = 0;
+#ifdef SNOWV_HAVE_AESNI
+    if (snowv_has_aesni()) {
+        keystream_blocks_aesni(ctx, NULL, out, len / 16);
+        i = len - len % 16;
+    }
+#endif
+    for (; i + 16 <= len; i += 16)
+        keystream(ctx, out + i);
+    if (i < len) {
+        keystream(ctx, z);
+        memcpy(out + i, z, len - i);
+    }
+}
+
+// Multi-buffer kernels for snowv_encrypt_xN_with, from slowest to fastest
+#define SNOWV_MULTI_PORTABLE 0  // One stream after the other
+#define SNOWV_MULTI_AESNI 1     // Two streams interleaved with AES-NI
+#define SNOWV_MULTI_VAES 2      // Four streams, two per register, with VAES/AVX2
+
+int snowv_multi_supported(int kernel) {
+    switch (kernel) {
+    case SNOWV_MULTI_PORTABLE:
+        return 1;
+#ifdef SNOWV_HAVE_AESNI
+    case SNOWV_MULTI_AESNI:
+        return snowv_has_aesni();
+#endif
+#ifdef SNOWV_HAVE_VAES
+    case SNOWV_MULTI_VAES:
+        return snowv_has_vaes();
+#endif
+    default:
+        return 0;
+    }
+}
+
+static int snowv_multi_best(void) {
+    if (snowv_multi_supported(SNOWV_MULTI_VAES))
+        return SNOWV_MULTI_VAES;
+    return snowv_multi_supported(SNOWV_MULTI_AESNI) ? SNOWV_MULTI_AESNI : SNOWV_MULTI_PORTABLE;
+}
+
+// Name of the multi-buffer kernel used by snowv_encrypt_xN on this CPU
+const char* snowv_multi_backend(void) {
+    static const char* const names[] = {"portable", "aesni-x2", "vaes-x4"};
+    return names[snowv_multi_best()];
+}
+
+// Finish one stream on its own: snowv_encrypt, or snowv_keystream_bytes when in is NULL
+static void snowv_crypt_one(struct SnowV32* ctx, const u8* in, u8* out, size_t len) {
+    if (in != NULL)
+        snowv_encrypt(ctx, in, out, len);
+    else
+        snowv_keystream_bytes(ctx, out, len);
+}
+
+// Encrypt (or decrypt) n independent streams: lens[i] bytes of ins[i] into outs[i] with ctxs[i].
+// ins may be NULL to write keystream instead. Each stream gives the same result as snowv_encrypt;
+// ins[i] and outs[i] may be the same buffer, but different streams must not overlap.
+// The kernel runs ways streams at a time; when one runs out of whole blocks, its tail is finished
+// on its own and the next waiting stream takes its place. The last streams run one by one.
+void snowv_encrypt_xN_with(int kernel, struct SnowV32* const ctxs[], const u8* const ins[], u8* const outs[],
+                           const size_t lens[], size_t n) {
+    void (*blocks)(struct SnowV32* const*, const u8* const*, u8* const*, size_t) = NULL;
+    int ways = 1;
+    struct SnowV32* slot_ctx[8];
+    const u8* slot_in[8];
+    u8* slot_out[8];
+    size_t slot_stream[8], slot_done[8];
+    size_t next = 0;
+    int active = 0;
+
+#ifdef SNOWV_HAVE_AESNI
+    if (kernel == SNOWV_MULTI_AESNI && snowv_has_aesni()) {
+        blocks = keystream_blocks_aesni_x2;
+        ways = SNOWV_AESNI_WAYS;
+    }
+#endif
+#ifdef SNOWV_HAVE_VAES
+    if (kernel == SNOWV_MULTI_VAES && snowv_has_vaes()) {
+        blocks = keystream_blocks_vaes_x4;
+        ways = SNOWV_VAES_WAYS;
+    }
+#endif
+
+    while (blocks != NULL) {
+        // Fill the free slots with streams of at least one whole block
+        while (active < ways && next < n) {
+            if (lens[next] < 16) {
+                snowv_crypt_one(ctxs[next], ins != NULL ? ins[next] : NULL, outs[next], lens[next]);
+            } else {
+                slot_stream[active] = next;
+                slot_done[active] = 0;
+                active++;
+            }
+            next++;
+        }
+        if (active < ways)
+            break;
+
+        // Run all slots for as many blocks as the shortest one has left
+        size_t nblocks = (size_t)-1;
+        for (int l = 0; l < ways; l++) {
+            size_t i = slot_stream[l], left = (lens[i] - slot_done[l]) / 16;
+            if (left < nblocks)
+                nblocks = left;
+            slot_ctx[l] = ctxs[i];
+            slot_in[l] = ins != NULL ? ins[i] + slot_done[l] : NULL;
+            slot_out[l] = outs[i] + slot_done[l];
+        }
+        blocks(slot_ctx, ins != NULL ? slot_in : NULL, slot_out, nblocks);
+
+        // Retire the streams without a whole block left
+        for (int l = 0; l < active;) {
+            size_t i = slot_stream[l];
+            slot_done[l] += 16 * nblocks;
+            if (lens[i] - slot_done[l] < 16) {
+                snowv_crypt_one(ctxs[i], ins != NULL ? ins[i] + slot_done[l] : NULL, outs[i] + slot_done[l],
+                                lens[i] - slot_done[l]);
+                active--;
+                slot_stream[l] = slot_stream[active];
+                slot_done[l] = slot_done[active];
+            } else {
+                l++;
+            }
+        }
+    }
+
+    for (int l = 0; l < active; l++) {
+        size_t i = slot_stream[l];
+        snowv_crypt_one(ctxs[i], ins != NULL ? ins[i] + slot_done[l] : NULL, outs[i] + slot_done[l],
+                        lens[i] - slot_done[l]);
+    }
+    for (; next < n; next++)
+        snowv_crypt_one(ctxs[next], ins != NULL ? ins[next] : NULL, outs[next], lens[next]);
+}
+
+void snowv_encrypt_xN(struct SnowV32* const ctxs[], const u8* const ins[], u8* const outs[],
+                      const size_t lens[], size_t n) {
+    snowv_encrypt_xN_with(snowv_multi_best(), ctxs, ins, outs, lens, n);
+}
+
+// Write lens[i] keystream bytes of ctxs[i] to outs[i] for n independent streams
+void snowv_keystream_xN(struct SnowV32* const ctxs[], u8* const outs[], const size_t lens[], size_t n) {
+    snowv_encrypt_xN_with(snowv_multi_best(), ctxs, NULL, outs, lens, n);
+}
+
+void snowv_get_state(const struct SnowV32* ctx, u8* state) {
+    for (int i = 0; i < 16; i++) {
+        state[2 * i] = (u8)ctx->A[i];
+        state[2 * i + 1] = (u8)(ctx->A[i] >> 8);
+        state[32 + 2 * i] = (u8)ctx->B[i];
+        state[32 + 2 * i + 1] = (u8)(ctx->B[i] >> 8);
+    }
+    for (int i = 0; i < 4; i++)
+        for (int j = 0; j < 4; j++) {
+            state[64 + 4 * i + j] = (u8)(ctx->R1[i] >> (8 * j));
+            state[80 + 4 * i + j] = (u8)(ctx->R2[i] >> (8 * j));
+            state[96 + 4 * i + j] = (u8)(ctx->R3[i] >> (8 * j));
+        }
+}
+
+#define LOADU32(p) MAKEU32(MAKEU16((p)[3], (p)[2]), MAKEU16((p)[1], (p)[0]))
+
+void snowv_set_state(struct SnowV32* ctx, const u8* state) {
+    for (int i = 0; i < 16; i++) {
+        ctx->A[i] = MAKEU16(state[2 * i + 1], state[2 * i]);
+        ctx->B[i] = MAKEU16(state[32 + 2 * i + 1], state[32 + 2 * i]);
+    }
+    for (int i = 0; i < 4; i++) {
+        ctx->R1[i] = LOADU32(state + 64 + 4 * i);
+        ctx->R2[i] = LOADU32(state + 80 + 4 * i);
+        ctx->R3[i] = LOADU32(state + 96 + 4 * i);
+    }
+}
+
+// SNOW-V-GCM: GHASH as in GCM with H = z0, tag mask endPad = z1, payload keystream from z2
+
+static u64 load_be64(const u8* p) {
+    u64 v = 0;
+    for (int i = 0; i < 8; i++)
+        v = (v << 8) | p[i];
+    return v;
+}
+
+static void store_be64(u8* p, u64 v) {
+    for (int i = 7; i >= 0; i--) {
+        p[i] = (u8)v;
+        v >>= 8;
+    }
+}
+
+// Reduction of the four bits shifted out by a 4-bit shift, in the top 16 bits of the high half
+static const u64 GHashLast4[16] = {
+    0x0000, 0x1c20, 0x3840, 0x2460, 0x7080, 0x6ca0, 0x48c0, 0x54e0,
+    0xe100, 0xfd20, 0xd940, 0xc560, 0x9180, 0x8da0, 0xa9c0, 0xb5e0
+};
+
+void ghash_init_key(struct GHashKey* key, const u8* h) {
+    u64 vh = load_be64(h), vl = load_be64(h + 8);
+    key->HH[0] = key->HL[0] = 0;
+    key->HH[8] = vh;  // The 4-bit value 8 is the polynomial 1
+    key->HL[8] = vl;
+    for (int i = 4; i > 0; i >>= 1) {  // 4, 2, 1 are H*x, H*x^2, H*x^3
+        u64 t = (vl & 1) * 0xe100000000000000ULL;
+        vl = (vh << 63) | (vl >> 1);
+        vh = (vh >> 1) ^ t;
+        key->HH[i] = vh;
+        key->HL[i] = vl;
+    }
+    for (int i = 2; i <= 8; i *= 2)  // Every other entry is a sum of powers of two
+        for (int j = 1; j < i; j++) {
+            key->HH[i + j] = key->HH[i] ^ key->HH[j];
+            key->HL[i + j] = key->HL[i] ^ key->HL[j];
+        }
+}
+
+// x = x * H, one nibble at a time from the last byte to the first
+static void ghash_mult(const struct GHashKey* key, u8* x) {
+    u64 zh = 0, zl = 0;
+    for (int i = 15; i >= 0; i--) {
+        for (int half = 0; half < 2; half++) {
+            u8 nibble = half ? (x[i] >> 4) : (x[i] & 0x0f);
+            u8 rem = (u8)(zl & 0x0f);
+            zl = (zh << 60) | (zl >> 4);
+            zh = (zh >> 4) ^ (GHashLast4[rem] << 48);
+            zh ^= key->HH[nibble];
+            zl ^= key->HL[nibble];
+        }
+    }
+    store_be64(x, zh);
+    store_be64(x + 8, zl);
+}
+
+// Absorb len bytes into the running hash x; a trailing partial block is zero-padded
+void ghash_update(const struct GHashKey* key, u8* x, const u8* data, size_t len) {
+    while (len > 0) {
+        size_t n = len < 16 ? len : 16;
+        for (size_t i = 0; i < n; i++)
+            x[i] ^= data[i];
+        ghash_mult(key, x);
+        data += n;
+        len -= n;
+    }
+}
+
+void snowv_gcm_crypt(const u8* key, const u8* iv, const u8* aad, size_t aad_len,
+                     const u8* in, u8* out, size_t len, int encrypt, u8* tag) {
+    struct SnowV32 ctx;
+    struct GHashKey hkey;
+    u8 h[16], end_pad[16], x[16] = {0}, lengths[16];
+
+    keyiv_setup(&ctx, (u8*)key, (u8*)iv, 1);
+    keystream(&ctx, h);
+    keystream(&ctx, end_pad);
+    ghash_init_key(&hkey, h);
+
+    ghash_update(&hkey, x, aad, aad_len);
+    if (encrypt) {
+        snowv_encrypt(&ctx, in, out, len);
+        ghash_update(&hkey, x, out, len);
+    } else {
+        ghash_update(&hkey, x, in, len);  // Hash the ciphertext before it may be overwritten
+        snowv_encrypt(&ctx, in, out, len);
+    }
+    store_be64(lengths, (u64)aad_len * 8);
+    store_be64(lengths + 8, (u64)len * 8);
+    ghash_update(&hkey, x, lengths, 16);
+    for (int i = 0; i < 16; i++)
+        tag[i] = x[i] ^ end_pad[i];
+}
+
+#ifndef SNOWV_NO_MAIN
 void measure_encryption_time(size_t data_size_bits) {
     size_t data_size_bytes = data_size_bits / 8;
     u8 key[32] = {0};
@@ -206,7 +794,6 @@ void measure_encryption_time(size_t data_size_bits) {
     struct SnowV32 cipher;
     u8* plaintext = (u8*)malloc(data_size_bytes);
     u8* ciphertext = (u8*)malloc(data_size_bytes);
-    u8 keystream_block[16]; // Fixed size since keystream produces 16 bytes at a time
 
     if (!plaintext || !ciphertext) {
         printf("Memory allocation failed\n");
@@ -241,21 +828,8 @@ void measure_encryption_time(size_t data_size_bits) {
         clock_gettime(CLOCK_MONOTONIC, &start_time);
         #endif
 
-        size_t bytes_encrypted = 0;
-        while (bytes_encrypted < data_size_bytes) {
-            size_t bytes_to_encrypt = data_size_bytes - bytes_encrypted;
-            if (bytes_to_encrypt > 16)
-                bytes_to_encrypt = 16;
-
-            keystream(&cipher, keystream_block);
-
-            // XOR plaintext with keystream to produce ciphertext
-            for (size_t i = 0; i < bytes_to_encrypt; i++) {
-                ciphertext[bytes_encrypted + i] = plaintext[bytes_encrypted + i] ^ keystream_block[i];
-            }
-
-            bytes_encrypted += bytes_to_encrypt;
-        }
+        // XOR plaintext with keystream to produce ciphertext (AES-NI path when available)
+        snowv_encrypt(&cipher, plaintext, ciphertext, data_size_bytes);
 
         #ifdef _WIN32
         QueryPerformanceCounter(&end_time);
@@ -295,6 +869,8 @@ void measure_encryption_time(size_t data_size_bits) {
 }
 
 int main() {
+    printf("Keystream backend: %s\n\n", snowv_backend());
+
     // Measure encryption time for different data sizes
     measure_encryption_time(256);    // 256 bits
     measure_encryption_time(1024);   // 1024 bits
@@ -302,3 +878,4 @@ int main() {
 
     return 0;
 }
+#endif